@@ -1,11 +1,22 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 from astropy.table import Table
 from astroquery.gaia import Gaia
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import crossmatch
+import startable
+
+# Локальный срез gaiadr3.gaia_source (ra, dec, parallax, parallax_error, phot_g_mean_mag).
+# Если файл есть — матчим у себя через KD-дерево вместо загрузки таблицы на сервер Gaia.
+GAIA_LOCAL_FILE = 'gaia_local.parquet'
+MATCH_RADIUS_ARCSEC = 2
+
 # 1. Загружаем ваш файл
 input_file = 'final_universal_map.csv'
-df = pd.read_csv(input_file)
+df = startable.read(input_file)
 
 # Проверяем, что координаты имеют числовой формат (защита от ошибок)
 df['RA'] = pd.to_numeric(df['RA'], errors='coerce')
@@ -15,10 +26,6 @@ df['Dec'] = pd.to_numeric(df['Dec'], errors='coerce')
 # Нам нужны только имя и координаты, чтобы не гонять лишний трафик
 upload_df = df[['Star', 'RA', 'Dec']].dropna()
 
-# Конвертируем pandas DataFrame в формат astropy Table (требование astroquery)
-upload_table = Table.from_pandas(upload_df)
-
-print(f"Отправляем {len(upload_table)} объектов на сервер Gaia для Cross-match...")
 
 # 3. Пишем ADQL запрос с использованием JOIN
 # tap_upload.my_table - это наша временно загруженная таблица
@@ -39,23 +46,36 @@ JOIN gaiadr3.gaia_source AS gaia
 
 # 4. Выполняем асинхронный запрос (надежнее для больших объемов)
 # Сервер сам сопоставит наши координаты со своей базой
-try:
-    job = Gaia.launch_job_async(
-        query=query,
-        upload_resource=upload_table,
-        upload_table_name="my_table"
-    )
-
-    # Получаем результаты
-    results = job.get_results()
-    print(f"Успех! Найдено совпадений в Gaia: {len(results)}")
-
-    # Конвертируем ответ обратно в pandas DataFrame
-    df_gaia = results.to_pandas()
-
-except Exception as e:
-    print(f"Ошибка при запросе к Gaia: {e}")
-    exit()
+if os.path.exists(GAIA_LOCAL_FILE):
+    print(f"Cross-match {len(upload_df)} объектов с локальной копией Gaia ({GAIA_LOCAL_FILE})...")
+    gaia_ref = crossmatch.load_reference(GAIA_LOCAL_FILE, columns=['ra', 'dec', 'parallax',
+                                                                   'parallax_error', 'phot_g_mean_mag'])
+    # Все звезды в радиусе, из них самая яркая — то же правило, что и в шаге 5
+    df_gaia = crossmatch.crossmatch(upload_df, gaia_ref, MATCH_RADIUS_ARCSEC,
+                                    ra_col='RA', dec_col='Dec', keep='brightest', mag_col='phot_g_mean_mag')
+    df_gaia = df_gaia.rename(columns={'parallax': 'gaia_parallax', 'parallax_error': 'gaia_plx_error'})
+    print(f"Успех! Найдено совпадений в Gaia: {len(df_gaia)}")
+else:
+    # Конвертируем pandas DataFrame в формат astropy Table (требование astroquery)
+    upload_table = Table.from_pandas(upload_df)
+    print(f"Отправляем {len(upload_table)} объектов на сервер Gaia для Cross-match...")
+    try:
+        job = Gaia.launch_job_async(
+            query=query,
+            upload_resource=upload_table,
+            upload_table_name="my_table"
+        )
+
+        # Получаем результаты
+        results = job.get_results()
+        print(f"Успех! Найдено совпадений в Gaia: {len(results)}")
+
+        # Конвертируем ответ обратно в pandas DataFrame
+        df_gaia = results.to_pandas()
+
+    except Exception as e:
+        print(f"Ошибка при запросе к Gaia: {e}")
+        exit()
 
 # 5. Обработка результатов из Gaia
 # Иногда в радиус 2 секунд попадает несколько звезд (оптические двойные).
@@ -80,7 +100,7 @@ final_df['Gaia_Dist_Calc'] = final_df['Gaia_Dist_Calc'].round(2)
 
 # 8. Сохраняем итоговый результат
 output_file = 'candidates_list.csv'
-final_df.to_csv(output_file, index=False)
+startable.write(final_df, output_file)
 
 print(f"\nГотово! Результат сохранен в файл '{output_file}'.")
 print("Сравните ваши расчеты 'Calc_Dist' с новыми 'Gaia_Dist_Calc'!")
\ No newline at end of file
@@ -1,8 +1,68 @@
 import numpy as np
 
+import periodogram
+import lc_fits
+import period_cache
+
+# Двухэтапный поиск (грубая сетка по baseline + уточнение пиков) вместо полной сетки
+ADAPTIVE_SEARCH = True
+
 def process_lightcurve(lc):
-    return lc.remove_nans().normalize().remove_outliers(sigma=5)
+    """
+    Очистка за один проход (lc_fits.clean): NaN, флаги качества, нормировка, выбросы > 5 sigma.
+    lc — LightCurve или словарь массивов из lc_fits.read / lc_store. Возвращает {'time', 'flux'}.
+    """
+    if isinstance(lc, dict) and lc.get('clean'):
+        return lc
+    if isinstance(lc, dict):
+        return lc_fits.clean(lc['time'], lc['flux'], lc.get('quality'), lc.get('bitmask', 0))
+    time, flux = _lc_arrays(lc)
+    return lc_fits.clean(time, flux)
+
+def _lc_arrays(lc):
+    # LightCurve -> простые массивы (time в сутках, flux без маски); словарь массивов — как есть
+    if isinstance(lc, dict):
+        return lc['time'], lc['flux']
+    flux = lc.flux.filled(np.nan) if hasattr(lc.flux, 'filled') else lc.flux
+    return np.asarray(lc.time.value, dtype=np.float64), np.asarray(getattr(flux, 'value', flux), dtype=np.float64)
+
+def _search(time, flux, minimum_period, maximum_period, top_k, min_power, adaptive):
+    if adaptive:
+        pg = periodogram.adaptive_search(time, flux, minimum_period, maximum_period,
+                                         top_k=top_k, min_power=min_power)
+        pg['period'] = 1.0 / pg['frequency']
+        return pg
+
+    frequency, power = periodogram.lombscargle(time, flux, minimum_period, maximum_period)
+    peaks = periodogram.top_peaks(power, top_k)
+    return {
+        'frequency': frequency,
+        'period': 1.0 / frequency,
+        'power': power,
+        'peak_periods': 1.0 / frequency[peaks],
+        'peak_powers': power[peaks],
+    }
+
+def find_period(lc, minimum_period=0.1, maximum_period=50, top_k=3, min_power=None, adaptive=ADAPTIVE_SEARCH,
+                cache=None):
+    """
+    Возвращает (период, спектр, мощность). min_power — порог отбраковки из main.py:
+    если грубый спектр заведомо ниже него, точный поиск не делается (мощность все равно < порога).
+    cache — файл period_cache (SQLite) для результатов; None — считать всегда.
+    В результате из кэша нет frequency/power, если period_cache.STORE_SPECTRUM выключен.
+    """
+    time, flux = _lc_arrays(lc)
+    if not cache:
+        pg = _search(time, flux, minimum_period, maximum_period, top_k, min_power, adaptive)
+        return pg['peak_periods'][0], pg, pg['peak_powers'][0]
 
-def find_period(lc):
-    pg = lc.to_periodogram(method='lombscargle', minimum_period=0.1, maximum_period=50)
-    return pg.period_at_max_power.value, pg, pg.max_power.value
\ No newline at end of file
+    key, params = period_cache.key(time, flux, minimum_period=minimum_period, maximum_period=maximum_period,
+                                   top_k=top_k, min_power=min_power, adaptive=adaptive,
+                                   oversample=periodogram.OVERSAMPLE_FACTOR,
+                                   coarse_oversample=periodogram.COARSE_OVERSAMPLE,
+                                   refine_peaks=periodogram.REFINE_PEAKS)
+    pg = period_cache.load(key, cache)
+    if pg is None:
+        pg = _search(time, flux, minimum_period, maximum_period, top_k, min_power, adaptive)
+        period_cache.save(key, params, pg, len(time), cache)
+    return pg['peak_periods'][0], pg, pg['peak_powers'][0]
@@ -1,25 +1,103 @@
+import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from pl_relations import (CEPHEID_WESENHEIT_JK, CEPHEID_WESENHEIT_VI, WESENHEIT_R_JK, WESENHEIT_R_VI,
+                          RR_LYRAE_K, RR_LYRAE_MV, RR_LYRAE_V_OFFSET, pl_magnitude, modulus_distance)
+
+# Коэффициенты зависимостей — в common/pl_relations.py, общие для скалярных и векторных функций.
+# Коды методов для векторных версий (METHOD_NAMES[code] -> имя как в скалярных функциях)
+METHOD_NONE, METHOD_CEP_IR, METHOD_CEP_OPT, METHOD_RR_K, METHOD_RR_V = 0, 1, 2, 3, 4
+METHOD_NAMES = np.array(["---", "Cepheid(IR)", "Cepheid(Opt)", "RR_Lyrae(K)", "RR_Lyrae(V)"])
+
 def calculate_gaia_distance(plx):
     return 1000.0 / plx if plx and plx > 0 else None
 
 def calculate_cepheid_distance(P, V, I, J, K):
     # 1. Инфракрасный (самый точный)
     if not np.isnan(J) and not np.isnan(K):
-        W = K - 0.69 * (J - K)
-        M_W = -3.284 * (np.log10(P) - 1.0) - 5.588
-        return 10**((W - M_W + 5)/5), "Cepheid(IR)"
+        W = K - WESENHEIT_R_JK * (J - K)
+        M_W = pl_magnitude(P, CEPHEID_WESENHEIT_JK)
+        return modulus_distance(W, M_W), "Cepheid(IR)"
     # 2. Оптический
     if not np.isnan(V) and not np.isnan(I):
-        W = I - 1.55 * (V - I)
-        M_W = -3.31 * (np.log10(P) - 1.0) - 5.80
-        return 10**((W - M_W + 5)/5), "Cepheid(Opt)"
+        W = I - WESENHEIT_R_VI * (V - I)
+        M_W = pl_magnitude(P, CEPHEID_WESENHEIT_VI)
+        return modulus_distance(W, M_W), "Cepheid(Opt)"
     return None, None
 
 def calculate_rr_lyrae_distance(P, V, K):
     if not np.isnan(K):
-        M_k = -2.33 * np.log10(P) - 0.93
-        return 10**((K - M_k + 5)/5), "RR_Lyrae(K)"
+        M_k = pl_magnitude(P, RR_LYRAE_K)
+        return modulus_distance(K, M_k), "RR_Lyrae(K)"
     if not np.isnan(V):
-        return 10**((V - 0.6 + 5 - 0.5)/5), "RR_Lyrae(V)"
-    return None, None
\ No newline at end of file
+        return modulus_distance(V - RR_LYRAE_V_OFFSET, RR_LYRAE_MV), "RR_Lyrae(V)"
+    return None, None
+
+
+# --- Векторные версии: целые колонки за один вызов ---
+
+def _column(x):
+    # Скаляр, список или колонка pandas -> float64; None превращается в NaN
+    return np.asarray(x, dtype=np.float64)
+
+def gaia_distance_array(plx):
+    """1000 / parallax, NaN там, где параллакса нет или он <= 0."""
+    plx = _column(plx)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(plx > 0, 1000.0 / plx, np.nan)
+
+def cepheid_distance_array(P, V, I, J, K):
+    """Расстояния Цефеид: ИК-метод там, где есть J и K, иначе оптический. Возвращает (dist, method_code)."""
+    P, V, I, J, K = map(_column, (P, V, I, J, K))
+    P = np.where(P > 0, P, np.nan)
+
+    ir = ~np.isnan(J) & ~np.isnan(K)
+    opt = ~ir & ~np.isnan(V) & ~np.isnan(I)
+
+    W = np.where(ir, K - WESENHEIT_R_JK * (J - K), I - WESENHEIT_R_VI * (V - I))
+    M_W = np.where(ir, pl_magnitude(P, CEPHEID_WESENHEIT_JK), pl_magnitude(P, CEPHEID_WESENHEIT_VI))
+
+    dist = np.where(ir | opt, modulus_distance(W, M_W), np.nan)
+    method = np.select([ir, opt], [METHOD_CEP_IR, METHOD_CEP_OPT], METHOD_NONE)
+    return dist, method
+
+def rr_lyrae_distance_array(P, V, K):
+    """Расстояния RR Лир: по K, если есть, иначе по V. Возвращает (dist, method_code)."""
+    P, V, K = map(_column, (P, V, K))
+    P = np.where(P > 0, P, np.nan)
+
+    by_k = ~np.isnan(K)
+    by_v = ~by_k & ~np.isnan(V)
+
+    M_k = pl_magnitude(P, RR_LYRAE_K)
+    dist = np.select([by_k, by_v], [modulus_distance(K, M_k), modulus_distance(V - RR_LYRAE_V_OFFSET, RR_LYRAE_MV)],
+                     np.nan)
+    method = np.select([by_k, by_v], [METHOD_RR_K, METHOD_RR_V], METHOD_NONE)
+    return dist, method
+
+def variable_star_distance_array(P, V, I, J, K, cepheid_min_period=1.0):
+    """
+    Расстояние для смешанной выборки: P > cepheid_min_period — Цефеида, иначе RR Лира
+    (то же правило, что в main.py). Возвращает (dist, method_code); NaN / METHOD_NONE,
+    если для звезды не хватает фотометрии.
+    """
+    P = _column(P)
+    cep_dist, cep_method = cepheid_distance_array(P, V, I, J, K)
+    rr_dist, rr_method = rr_lyrae_distance_array(P, V, K)
+    is_cep = P > cepheid_min_period
+    return np.where(is_cep, cep_dist, rr_dist), np.where(is_cep, cep_method, rr_method)
+
+def extinction_status_array(dist_calc, d_gaia, dust_limit=0.5, anomaly_limit=-0.3):
+    """Av = mu_calc - mu_gaia и статус (DUST FOUND / ANOMALY / Clean / No Gaia) для колонок."""
+    dist_calc, d_gaia = _column(dist_calc), _column(d_gaia)
+    has_gaia = d_gaia > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        av = np.where(has_gaia, 5 * np.log10(dist_calc) - 5 * np.log10(d_gaia), 0.0)
+    status = np.select(
+        [~has_gaia, av > dust_limit, av < anomaly_limit],
+        ["No Gaia", "DUST FOUND", "ANOMALY"],
+        "Clean"
+    )
+    return av, status
@@ -0,0 +1,52 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import extinction_grid
+import startable
+
+# Сборка 3D-сетки поглощения по результатам main.py: положение звезды — по Gaia_Dist,
+# значение — Dust_Av. Дальше карты и поправки спрашивают сетку через
+# extinction_grid.load_grid(GRID_DIR) + query_xyz / query_lbd, не перечитывая таблицу звезд.
+# Для V4/V5 то же самое: value_col='rel_error', ra_col='ra', dec_col='dec', dist_col='dist_ref'.
+INPUT_FILE = "universal_map_large.csv"
+GRID_DIR = "extinction_grid"
+VOXEL_SIZE_PC = 200.0
+SMOOTH_SIGMA = 1.0
+MAX_DISTANCE_PC = 5000.0   # сетка — куб +-MAX_DISTANCE_PC вокруг Солнца; звезды дальше в нее не попадают
+
+
+def build_extinction_grid(input_file=INPUT_FILE, grid_dir=GRID_DIR, value_col='Dust_Av',
+                          ra_col='RA', dec_col='Dec', dist_col='Gaia_Dist',
+                          voxel_size=VOXEL_SIZE_PC, smooth_sigma=SMOOTH_SIGMA, max_distance=MAX_DISTANCE_PC):
+    if not startable.exists(input_file):
+        print(f"Файл {input_file} не найден!")
+        return None
+
+    df = startable.read(input_file, columns=[ra_col, dec_col, dist_col, value_col])
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    filled_cols = {col: int(df[col].notna().sum()) for col in df.columns}
+    df = df[np.isfinite(df.to_numpy(dtype=np.float64)).all(axis=1) & (df[dist_col] > 0)]
+    if df.empty:
+        print(f"В {input_file} нет звезд с координатами, {dist_col} > 0 и {value_col} — сетка не построена "
+              f"(заполнено строк по колонкам: {filled_cols})")
+        return None
+
+    grid = extinction_grid.build_from_table(df, value_col, ra_col, dec_col, dist_col,
+                                            cache_path=input_file, voxel_size=voxel_size,
+                                            extent=((-max_distance, max_distance),) * 3,
+                                            smooth_sigma=smooth_sigma)
+    extinction_grid.save_grid(grid, grid_dir, source=os.path.abspath(input_file), value=value_col)
+
+    filled = np.isfinite(grid['mean']).sum()
+    print(f"Сетка {grid['mean'].shape} по {voxel_size:.0f} пк: {int(grid['count'].sum())} звезд, "
+          f"заполнено вокселей {filled} из {grid['mean'].size}, вне сетки (дальше {max_distance:.0f} пк) "
+          f"{grid['outside']}. Сохранено в {grid_dir}/")
+    return grid
+
+
+if __name__ == "__main__":
+    build_extinction_grid()
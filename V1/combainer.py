@@ -1,8 +1,13 @@
+import os
+import sys
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import startable
+
 # 1. Загружаем файлы
-df_my = pd.read_csv('my_stars_with_distance.csv')
-df_map = pd.read_csv('universal_map_large.csv')
+df_my = startable.read('my_stars_with_distance.csv')
+df_map = startable.read('universal_map_large.csv')
 
 # 2. Приводим колонки первого файла к стандарту второго
 # Переименовываем: name -> Star, ra -> RA, dec -> Dec
@@ -39,7 +44,7 @@ existing_cols = [c for c in final_columns if c in merged.columns]
 df_final = merged[existing_cols]
 
 # 6. Сохраняем результат
-df_final.to_csv('final_universal_map.csv', index=False)
+startable.write(df_final, 'final_universal_map.csv')
 
 print("Ура! Данные успешно объединены.")
 print(f"Файл 'final_universal_map.csv' готов. Найдено совпадений: {merged['Method'].notna().sum()}")
\ No newline at end of file
@@ -1,28 +1,127 @@
+import json
 import lightkurve as lk
+import numpy as np
 from astropy.coordinates import SkyCoord
+from astropy.time import Time
 import astropy.units as u
 
+import lc_cache
+import metrics
+import simbad_meta
 
-def download_lightcurve(ra, dec, radius_arcsec=10):
-    """Скачивание данных TESS/Kepler по координатам."""
+
+def get_star_metadata(star, ra, dec, service=None):
+    """
+    Метаданные одной звезды из SIMBAD (V, I, J, K, параллакс) или None.
+    Для списка звезд используйте simbad_meta.resolve — один пакетный запрос вместо запроса на звезду;
+    здесь тот же путь для одной звезды, ответ берется из общего кэша.
+    """
+    return simbad_meta.resolve([{'name': star, 'ra': ra, 'dec': dec}], service=service).get(str(star))
+
+
+def _search(coord, ra, dec, radius_arcsec, mission, archive):
+    """lk.search_lightcurve с кэшем: пустой ответ тоже запоминаем, чтобы не спрашивать MAST повторно."""
+    with metrics.timer('search'):
+        key = lc_cache.search_key(ra, dec, radius_arcsec, mission)
+        table = lc_cache.load_search(key)
+        if table is not None:
+            return archive.SearchResult(table)
+
+        search = archive.search_lightcurve(coord, radius=radius_arcsec, mission=mission)
+        lc_cache.save_search(key, search.table)
+        return search
+
+
+def _product_id(search):
+    for col in ('productFilename', 'obs_id'):
+        if col in search.table.colnames:
+            return search.table[col][0]
+    return 0
+
+
+def _plain(q):
+    # MaskedQuantity -> обычный массив с NaN на месте маски
+    if hasattr(q, 'filled'):
+        q = q.filled(np.nan)
+    return np.asarray(q.value, dtype=np.float64)
+
+
+def _plain_meta(meta):
+    # Из заголовка берем только простые значения (TELESCOP, SECTOR, FLUX_ORIGIN ...) — они ложатся в JSON
+    out = {}
+    for name, value in meta.items():
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, (str, bool, int, float)):
+            out[str(name)] = value
+    return out
+
+
+def _lc_to_arrays(lc):
+    flux = lc.flux
+    arrays = {
+        'time': np.asarray(lc.time.value, dtype=np.float64),
+        'time_format': np.array(lc.time.format),
+        'time_scale': np.array(lc.time.scale),
+        'flux': _plain(flux),
+        'flux_err': _plain(lc.flux_err),
+        'flux_unit': np.array(flux.unit.to_string() if flux.unit else ''),
+        'meta': np.array(json.dumps(_plain_meta(lc.meta))),
+    }
+    if 'quality' in lc.colnames:
+        quality = lc['quality']
+        arrays['quality'] = np.asarray(quality.filled(0) if hasattr(quality, 'filled') else quality, dtype=np.int32)
+    return arrays
+
+
+def _arrays_to_lc(arrays):
+    # quality и meta есть только у записей, сохраненных после их добавления в кэш
+    unit = u.Unit(str(arrays['flux_unit'])) if str(arrays['flux_unit']) else u.dimensionless_unscaled
+    time = Time(arrays['time'], format=str(arrays['time_format']), scale=str(arrays['time_scale']))
+    lc = lk.LightCurve(time=time, flux=arrays['flux'] * unit, flux_err=arrays['flux_err'] * unit)
+    if 'quality' in arrays:
+        lc['quality'] = arrays['quality']
+    if 'meta' in arrays:
+        lc.meta.update(json.loads(str(arrays['meta'])))
+    return lc
+
+
+def download_lightcurve(ra, dec, radius_arcsec=10, archive=None):
+    """
+    Скачивание данных TESS/Kepler по координатам.
+    archive — источник с интерфейсом lightkurve (search_lightcurve, SearchResult);
+    по умолчанию сам lightkurve, т.е. MAST. Для бенчмарков подставляется локальный заменитель.
+    """
+    archive = archive or lk
     try:
         # Создаем объект координат
         coord = SkyCoord(ra=ra, dec=dec, unit=(u.deg, u.deg), frame='icrs')
 
         # 1. Сначала ищем в TESS (он покрывает больше ваших звезд)
         # Убираем жесткую привязку к автору 'SPOC', чтобы найти данные QLP (из FFI)
-        search = lk.search_lightcurve(coord, radius=radius_arcsec, mission='TESS')
+        mission = 'TESS'
+        search = _search(coord, ra, dec, radius_arcsec, mission, archive)
 
         if len(search) == 0:
             # 2. Если в TESS нет, пробуем Kepler
-            search = lk.search_lightcurve(coord, radius=radius_arcsec, mission='Kepler')
+            mission = 'Kepler'
+            search = _search(coord, ra, dec, radius_arcsec, mission, archive)
 
         if len(search) == 0:
             return None
 
-        # Берем самый длинный кусок данных (обычно там меньше шума)
-        best_lc = search[0].download()
-        return best_lc
+        with metrics.timer('download'):
+            # 3. Кривая из локального кэша, если мы ее уже качали
+            key = lc_cache.product_key(ra, dec, mission, _product_id(search))
+            arrays = lc_cache.load_lightcurve(key)
+            if arrays is not None:
+                return _arrays_to_lc(arrays)
+
+            # Берем самый длинный кусок данных (обычно там меньше шума)
+            best_lc = search[0].download()
+            if best_lc is not None:
+                lc_cache.save_lightcurve(key, **_lc_to_arrays(best_lc))
+            return best_lc
     except Exception as e:
-        # print(f"Ошибка загрузки: {e}")
-        return None
\ No newline at end of file
+        # Ошибка уже учтена в metrics по стадии (search/download); звезда пойдет как no_lightcurve
+        return None
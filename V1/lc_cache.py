@@ -0,0 +1,169 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+import numpy as np
+
+# Локальный кэш MAST: результаты поиска и скачанные кривые блеска
+CACHE_DIR = "lc_cache"
+MAX_CACHE_BYTES = 5 * 1024 ** 3   # 5 ГБ, дальше выкидываем самые старые (LRU)
+COORD_DECIMALS = 4                # округление RA/Dec в ключе (~0.4 угл. сек.)
+EMPTY_SEARCH_TTL_DAYS = 30        # пустой ответ ("данных нет") перепроверяется через столько дней:
+                                  # MAST пополняется (новые сектора TESS, HLSP), а mtime файла — время обращения
+
+_lock = threading.Lock()
+_size_estimate = [None]
+_stats = {'search_hits': 0, 'search_misses': 0, 'search_expired': 0, 'lc_hits': 0, 'lc_misses': 0, 'evictions': 0}
+
+
+def _key(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def search_key(ra, dec, radius_arcsec, mission):
+    return _key('search', round(float(ra), COORD_DECIMALS), round(float(dec), COORD_DECIMALS),
+                float(radius_arcsec), mission)
+
+
+def product_key(ra, dec, mission, product):
+    return _key('lc', round(float(ra), COORD_DECIMALS), round(float(dec), COORD_DECIMALS),
+                mission, str(product))
+
+
+def _path(kind, key, ext):
+    # Раскладываем по подпапкам, чтобы не держать 20 тысяч файлов в одной директории
+    return os.path.join(CACHE_DIR, kind, key[:2], key + ext)
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def _touch(path):
+    # Время последнего обращения храним в mtime — по нему работает LRU
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _atomic_write(path, write_fn):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write_fn(tmp)
+    os.replace(tmp, path)
+    _account(os.path.getsize(path))
+
+
+def load_search(key, empty_ttl_days=EMPTY_SEARCH_TTL_DAYS):
+    """
+    Возвращает таблицу результатов поиска из кэша или None.
+    Пустой ответ старше empty_ttl_days (или записанный без даты) считается устаревшим — None.
+    """
+    path = _path('search', key, '.pkl')
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        _count('search_misses')
+        return None
+    # Старый формат — сама таблица, новый — {'table', 'saved_at'}
+    if isinstance(entry, dict) and 'table' in entry:
+        table, saved_at = entry['table'], entry.get('saved_at')
+    else:
+        table, saved_at = entry, None
+    if table is None or len(table) == 0:
+        if saved_at is None or time.time() - saved_at > empty_ttl_days * 86400:
+            _count('search_expired')
+            return None
+    _touch(path)
+    _count('search_hits')
+    return table
+
+
+def save_search(key, table):
+    entry = {'table': table, 'saved_at': time.time()}
+
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    _atomic_write(_path('search', key, '.pkl'), write)
+
+
+def load_lightcurve(key):
+    """Возвращает словарь массивов (time, flux, flux_err, ...) из кэша или None."""
+    path = _path('lc', key, '.npz')
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+    except (OSError, ValueError, EOFError):
+        _count('lc_misses')
+        return None
+    _touch(path)
+    _count('lc_hits')
+    return arrays
+
+
+def save_lightcurve(key, **arrays):
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+    _atomic_write(_path('lc', key, '.npz'), write)
+
+
+def _scan():
+    files = []
+    for root, _, names in os.walk(CACHE_DIR):
+        for name in names:
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    return files
+
+
+def _account(nbytes):
+    with _lock:
+        if _size_estimate[0] is None:
+            _size_estimate[0] = sum(size for _, size, _ in _scan())
+        else:
+            _size_estimate[0] += nbytes
+        over = _size_estimate[0] > MAX_CACHE_BYTES
+    if over:
+        evict()
+
+
+def evict(max_bytes=None):
+    """Удаляет самые давно использованные файлы, пока кэш не станет меньше 90% лимита."""
+    limit = int((max_bytes or MAX_CACHE_BYTES) * 0.9)
+    with _lock:
+        files = sorted(_scan())
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            _stats['evictions'] += 1
+        _size_estimate[0] = total
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats)
+
+
+def print_cache_stats():
+    s = cache_stats()
+    print(f"Кэш MAST: поиск {s['search_hits']} попаданий / {s['search_misses']} промахов "
+          f"(+{s['search_expired']} устаревших пустых), "
+          f"кривые {s['lc_hits']} / {s['lc_misses']}, вытеснено файлов: {s['evictions']}")
@@ -0,0 +1,121 @@
+import numpy as np
+from astropy.io import fits
+from lightkurve.utils import KeplerQualityFlags, TessQualityFlags
+
+# Легкое чтение FITS кривой блеска вместо lk.read: таблица открывается через memmap,
+# с диска берутся только TIME, один столбец потока и QUALITY — остальные колонки не читаются.
+# Очистка (NaN, флаги качества, нормировка, сигма-отсечение) — за один проход по массивам,
+# без промежуточных LightCurve (как было в remove_nans().normalize().remove_outliers()).
+FLUX_COLUMNS = ('PDCSAP_FLUX', 'SAP_FLUX', 'FLUX')   # как выбирает lk.read: PDCSAP, для QLP — SAP
+QUALITY_COLUMNS = ('QUALITY', 'SAP_QUALITY')
+CHUNK_ROWS = 65536                                    # строк таблицы в одном окне memmap
+OUTLIER_SIGMA = 5
+OUTLIER_MAXITERS = 5                                  # как у lk.remove_outliers (astropy sigma_clip)
+
+
+def _default_bitmask(header):
+    # Маска "default" lightkurve: у Kepler/K2 свои флаги, у TESS (SPOC, QLP) — TESS
+    telescope = str(header.get('TELESCOP', '')).upper()
+    return KeplerQualityFlags.DEFAULT_BITMASK if telescope == 'KEPLER' else TessQualityFlags.DEFAULT_BITMASK
+
+
+def _read_columns(path, hdu, columns):
+    """
+    Колонки таблицы -> массивы нужных типов. Таблица FITS хранится построчно, поэтому колонку
+    читаем окнами по CHUNK_ROWS строк: окно memmap открывается и сразу закрывается, и в памяти
+    процесса не остается весь файл (как при hdu.data, где страницы файла держатся до конца).
+    columns — [(имя, dtype), ...].
+    """
+    n_rows = hdu.header['NAXIS2']
+    out = {name: np.empty(n_rows, dtype=dtype) for name, dtype in columns}
+    if path.endswith('.gz'):
+        # Сжатый файл не отображается в память — читаем через astropy
+        for name, _ in columns:
+            out[name][:] = hdu.data.field(name)
+        return out
+
+    # columns.dtype — в порядке байт машины, а в файле FITS всегда big-endian
+    row_dtype = hdu.columns.dtype.newbyteorder('>')
+    offset = hdu.fileinfo()['datLoc']
+    for start in range(0, n_rows, CHUNK_ROWS):
+        rows = min(CHUNK_ROWS, n_rows - start)
+        block = np.memmap(path, dtype=row_dtype, mode='r', offset=offset + start * row_dtype.itemsize,
+                          shape=(rows,))
+        for name, _ in columns:
+            out[name][start:start + rows] = block[name]
+        del block
+    for name, _ in columns:
+        col = hdu.columns[name]
+        if col.bscale not in (None, 1) or col.bzero not in (None, 0):
+            out[name] = (out[name] * (col.bscale or 1) + (col.bzero or 0)).astype(out[name].dtype)
+    return out
+
+
+def read(path, flux_column=None):
+    """
+    Файл кривой блеска -> {'time', 'flux', 'quality', 'bitmask', 'flux_column'}.
+    time — float64 (в днях BTJD/BKJD, float32 там дает ошибку ~10 с), flux — float32, quality — int32.
+    flux_column — имя колонки потока; по умолчанию первая из FLUX_COLUMNS, что есть в файле.
+    """
+    with fits.open(path, memmap=True) as hdul:
+        hdu = hdul[1]
+        names = [n.upper() for n in hdu.columns.names]
+        if flux_column is None:
+            flux_column = next((c for c in FLUX_COLUMNS if c in names), None)
+            if flux_column is None:
+                raise ValueError(f"{path}: нет колонки потока ({', '.join(FLUX_COLUMNS)})")
+        quality_column = next((c for c in QUALITY_COLUMNS if c in names), None)
+
+        columns = [('TIME', np.float64), (flux_column.upper(), np.float32)]
+        if quality_column:
+            columns.append((quality_column, np.int32))
+        data = _read_columns(path, hdu, columns)
+        bitmask = _default_bitmask(hdul[0].header) if quality_column else 0
+
+    return {
+        'time': data['TIME'],
+        'flux': data[flux_column.upper()],
+        'quality': data[quality_column] if quality_column else np.zeros(len(data['TIME']), dtype=np.int32),
+        'bitmask': bitmask,
+        'flux_column': flux_column.lower(),
+    }
+
+
+def clean(time, flux, quality=None, bitmask=0, sigma=OUTLIER_SIGMA, maxiters=OUTLIER_MAXITERS):
+    """
+    Один проход: отбрасывает NaN и точки с флагами качества (quality & bitmask),
+    делит поток на медиану и итеративно отсекает выбросы дальше sigma стандартных отклонений
+    от медианы (как sigma_clip в lk.remove_outliers). Возвращает {'time', 'flux'}.
+    """
+    time = np.asarray(time)
+    flux = np.asarray(flux)
+    good = np.isfinite(time) & np.isfinite(flux)
+    if quality is not None and bitmask:
+        good &= (np.asarray(quality) & bitmask) == 0
+
+    # Единственная копия потока; дальше все на месте
+    t = time[good]
+    f = flux[good].astype(np.float32)
+    if len(f):
+        f /= np.float32(np.median(f))
+
+    keep = np.ones(len(f), dtype=bool)
+    for _ in range(maxiters):
+        kept = f[keep]
+        if len(kept) == 0:
+            break
+        center = np.median(kept)
+        spread = np.std(kept, dtype=np.float64)
+        new_keep = keep & (np.abs(f - center) <= sigma * spread)
+        if new_keep.sum() == len(kept):
+            break
+        keep = new_keep
+    if keep.all():
+        return {'time': t, 'flux': f}
+    return {'time': t[keep], 'flux': f[keep]}
+
+
+def load(path, flux_column=None):
+    """read() + clean(): сразу очищенные массивы для find_period."""
+    raw = read(path, flux_column)
+    return clean(raw['time'], raw['flux'], raw['quality'], raw['bitmask'])
@@ -0,0 +1,252 @@
+import os
+import sys
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+import periodogram
+
+# Все очищенные кривые блеска в одном хранилище вместо тысяч отдельных FITS:
+# значения лежат подряд в двух файлах (ragged array), а индекс хранит для каждой звезды
+# смещение и длину ее куска. Пакетный пересчет периодов, свертка или перерисовка графиков
+# идут по файлам последовательно через memmap, без открытия файла на каждую звезду.
+#   time.f64 — время (float64: float32 даже от t0 звезды на базе Kepler ~1500 сут дает шаг ~10 с,
+#              это сдвигает фазу коротких периодов и отпечаток period_cache)
+#   flux.f32 — нормированный поток (float32)
+#   index.parquet — star, offset, length, t0 (первая точка), added_at + метаданные из append(..., **meta)
+# Дописывание: значения пишутся в конец, индекс — атомарно после них. Если процесс упал
+# между ними, недописанный хвост просто перезапишется следующим append.
+STORE_DIR = "lc_store"
+TIME_FILE = "time.f64"
+LEGACY_TIME_FILE = "time.f32"    # старый формат: float32 от t0; open_store переписывает его в TIME_FILE
+FLUX_FILE = "flux.f32"
+INDEX_FILE = "index.parquet"
+FLUSH_EVERY = 200                # индекс сохраняется раз в столько добавлений (и при flush)
+BATCH_POINTS = 5_000_000         # точек в одной пачке batches() (~60 МБ: time float64 + flux float32)
+
+INDEX_COLUMNS = ['star', 'offset', 'length', 't0', 'added_at']
+_TIME_DTYPE = np.dtype('<f8')
+_FLUX_DTYPE = np.dtype('<f4')
+
+
+def _file(store, name):
+    return os.path.join(store['path'], name)
+
+
+def open_store(path=STORE_DIR):
+    """Открывает (или создает) хранилище. Возвращает словарь-состояние для остальных функций."""
+    os.makedirs(path, exist_ok=True)
+    index_path = os.path.join(path, INDEX_FILE)
+    if os.path.exists(index_path):
+        index = pd.read_parquet(index_path)
+    else:
+        index = pd.DataFrame(columns=INDEX_COLUMNS)
+    entries = {row['star']: row for row in index.to_dict('records')}
+    end = int((index['offset'] + index['length']).max()) if len(index) else 0
+    if os.path.exists(os.path.join(path, LEGACY_TIME_FILE)) and not os.path.exists(os.path.join(path, TIME_FILE)):
+        _upgrade_time_file(path, entries.values(), end)
+    return {'path': path, 'entries': entries, 'end': end, 'unsaved': 0}
+
+
+def _upgrade_time_file(path, entries, end):
+    # Время старого формата (float32 от t0) -> абсолютное float64; точность, потерянная при
+    # записи, не вернется, но дальше кривые хранятся и читаются единообразно
+    legacy_path = os.path.join(path, LEGACY_TIME_FILE)
+    tmp = os.path.join(path, TIME_FILE + ".tmp")
+    if end:
+        legacy = np.memmap(legacy_path, dtype='<f4', mode='r', shape=(end,))
+        time = np.memmap(tmp, dtype=_TIME_DTYPE, mode='w+', shape=(end,))
+        for entry in entries:
+            start, stop = int(entry['offset']), int(entry['offset']) + int(entry['length'])
+            time[start:stop] = float(entry['t0']) + legacy[start:stop].astype(np.float64)
+        time.flush()
+        del legacy, time
+    else:
+        open(tmp, 'wb').close()
+    os.replace(tmp, os.path.join(path, TIME_FILE))
+    os.remove(legacy_path)
+
+
+def has(store, star):
+    return str(star) in store['entries']
+
+
+def stars(store):
+    """Звезды в порядке хранения (по смещению) — в этом порядке чтение последовательное."""
+    return [e['star'] for e in sorted(store['entries'].values(), key=lambda e: e['offset'])]
+
+
+def garbage_points(store):
+    """Точки, на которые уже не ссылается индекс (перезаписанные звезды); убирает compact()."""
+    return store['end'] - sum(int(e['length']) for e in store['entries'].values())
+
+
+def _write_at(path, offset, values, dtype):
+    mode = 'r+b' if os.path.exists(path) else 'w+b'
+    with open(path, mode) as f:
+        f.seek(offset * dtype.itemsize)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+
+def append(store, star, curve, **meta):
+    """
+    Добавляет очищенную кривую {'time', 'flux'} звезды star (например, результат
+    analysis.process_lightcurve). Повторное добавление той же звезды заменяет запись в индексе.
+    meta — дополнительные колонки индекса (период, миссия, продукт ...).
+    """
+    time = np.asarray(curve['time'], dtype=np.float64)
+    flux = np.asarray(curve['flux'])
+    t0 = float(time[0]) if len(time) else 0.0
+    offset = store['end']
+
+    _write_at(_file(store, TIME_FILE), offset, time, _TIME_DTYPE)
+    _write_at(_file(store, FLUX_FILE), offset, flux, _FLUX_DTYPE)
+    store['end'] = offset + len(time)
+    store['entries'][str(star)] = {
+        'star': str(star), 'offset': offset, 'length': len(time), 't0': t0,
+        'added_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), **meta,
+    }
+    store['unsaved'] += 1
+    if store['unsaved'] >= FLUSH_EVERY:
+        flush(store)
+
+
+def flush(store):
+    """Атомарно сохраняет индекс."""
+    if not store['unsaved'] and os.path.exists(_file(store, INDEX_FILE)):
+        return
+    index = pd.DataFrame(list(store['entries'].values()))
+    index = index.reindex(columns=INDEX_COLUMNS + [c for c in index.columns if c not in INDEX_COLUMNS])
+    path = _file(store, INDEX_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    index.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    store['unsaved'] = 0
+
+
+def index(store):
+    """Индекс хранилища DataFrame'ом (в порядке хранения)."""
+    df = pd.DataFrame(list(store['entries'].values()))
+    return df.sort_values('offset').reset_index(drop=True) if len(df) else pd.DataFrame(columns=INDEX_COLUMNS)
+
+
+def _curve(time, flux):
+    # clean — кривая уже очищена, analysis.process_lightcurve ее не трогает
+    return {'time': time, 'flux': flux, 'clean': True}
+
+
+def get(store, star):
+    """Кривая одной звезды {'time' (float64), 'flux' (float32)} или None, если ее нет."""
+    entry = store['entries'].get(str(star))
+    if entry is None:
+        return None
+    return read_entry(store['path'], entry)
+
+
+def read_entry(path, entry):
+    """
+    Кривая по записи индекса (смещение, длина, t0) — без открытого хранилища.
+    Для стадии скачивания конвейера: запись кладется в задание, а чтение идет в потоке.
+    """
+    count, offset = int(entry['length']), int(entry['offset'])
+    time = np.fromfile(os.path.join(path, TIME_FILE), dtype=_TIME_DTYPE, count=count,
+                       offset=offset * _TIME_DTYPE.itemsize)
+    flux = np.fromfile(os.path.join(path, FLUX_FILE), dtype=_FLUX_DTYPE, count=count,
+                       offset=offset * _FLUX_DTYPE.itemsize)
+    return _curve(time, flux)
+
+
+def _maps(store):
+    if store['end'] == 0:
+        return None, None
+    time = np.memmap(_file(store, TIME_FILE), dtype=_TIME_DTYPE, mode='r', shape=(store['end'],))
+    flux = np.memmap(_file(store, FLUX_FILE), dtype=_FLUX_DTYPE, mode='r', shape=(store['end'],))
+    return time, flux
+
+
+def iter_curves(store, names=None):
+    """
+    (звезда, кривая) по всему хранилищу (или по списку names) в порядке хранения:
+    файлы читаются одним последовательным проходом через memmap.
+    """
+    time, flux = _maps(store)
+    if time is None:
+        return
+    wanted = None if names is None else {str(n) for n in names}
+    for entry in sorted(store['entries'].values(), key=lambda e: e['offset']):
+        if wanted is not None and entry['star'] not in wanted:
+            continue
+        start, stop = int(entry['offset']), int(entry['offset']) + int(entry['length'])
+        yield entry['star'], _curve(np.array(time[start:stop]), np.array(flux[start:stop]))
+
+
+def batches(store, names=None, max_points=BATCH_POINTS):
+    """Пачки [(звезда, кривая), ...] примерно по max_points точек — для пакетной периодограммы."""
+    batch, points = [], 0
+    for star, curve in iter_curves(store, names):
+        batch.append((star, curve))
+        points += len(curve['time'])
+        if points >= max_points:
+            yield batch
+            batch, points = [], 0
+    if batch:
+        yield batch
+
+
+def compact(store):
+    """Переписывает хранилище без мусора (старых версий перезаписанных звезд)."""
+    if garbage_points(store) == 0:
+        return store
+    tmp = open_store(store['path'] + ".compact")
+    for star, curve in iter_curves(store):
+        entry = store['entries'][star]
+        append(tmp, star, curve, **{k: v for k, v in entry.items() if k not in INDEX_COLUMNS})
+        tmp['entries'][star]['added_at'] = entry['added_at']
+    flush(tmp)
+    for name in (TIME_FILE, FLUX_FILE, INDEX_FILE):
+        if os.path.exists(_file(tmp, name)):
+            os.replace(_file(tmp, name), _file(store, name))
+        elif os.path.exists(_file(store, name)):
+            os.remove(_file(store, name))
+    os.rmdir(tmp['path'])
+    return open_store(store['path'])
+
+
+def assign_stored(tasks, store):
+    """
+    Для конвейера main/mainforserver: звездам, уже лежащим в хранилище, task['stored'] =
+    (папка, запись индекса) — их кривая читается отсюда вместо MAST; остальным
+    task['keep_curve'] = True — их очищенная кривая вернется из расчета и допишется сюда.
+    Возвращает число звезд из хранилища.
+    """
+    hits = 0
+    for task in tasks:
+        entry = store['entries'].get(str(task['star']))
+        if entry is not None:
+            task['stored'] = (store['path'], entry)
+            hits += 1
+        else:
+            task['keep_curve'] = True
+    return hits
+
+
+def batch_periods(store, names=None, max_points=BATCH_POINTS, **periodogram_kw):
+    """
+    Пересчет периодов по всему хранилищу пачками (periodogram.batch_periodogram).
+    Возвращает DataFrame: star, period, power.
+    """
+    rows = []
+    for batch in batches(store, names, max_points):
+        result = periodogram.batch_periodogram([(c['time'], c['flux']) for _, c in batch], **periodogram_kw)
+        rows += [(star, p, w) for (star, _), p, w in zip(batch, result['period'], result['power'])]
+    return pd.DataFrame(rows, columns=['star', 'period', 'power'])
+
+
+if __name__ == "__main__":
+    # python lc_store.py [папка хранилища] — пересчет периодов всех звезд в lc_store_periods.csv
+    store = open_store(sys.argv[1] if len(sys.argv) > 1 else STORE_DIR)
+    print(f"В хранилище {len(store['entries'])} звезд, {store['end']} точек "
+          f"(мусора {garbage_points(store)} точек)")
+    periods = batch_periods(store, adaptive=True)
+    periods.to_csv("lc_store_periods.csv", index=False)
+    print(f"Периоды сохранены в lc_store_periods.csv ({len(periods)} звезд)")
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import warnings
 from tqdm import tqdm
 
@@ -11,18 +12,144 @@ from data_fetcher import download_lightcurve
 from analysis import process_lightcurve, find_period
 from astrophysics import calculate_gaia_distance, calculate_cepheid_distance, calculate_rr_lyrae_distance
 from visualizer import save_plots
+from pipeline import run_pipeline, run_serial
+from lc_cache import print_cache_stats
+import metrics
+import tracing
+import mast_bulk
+import lc_store
+import period_cache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import startable
 
 INPUT_FILE = "candidates_list.csv"
 OUTPUT_FILE = "universal_map_large.csv"
 
+# Конвейерный режим: скачивание, поиск периода и запись идут одновременно
+PIPELINE_MODE = True
+N_DOWNLOAD_WORKERS = 8          # потоков для MAST (сеть)
+N_CPU_WORKERS = os.cpu_count()  # процессов для периодограмм (CPU)
+QUEUE_SIZE = 32                 # максимум звезд "в пути" между стадиями
+MIN_POWER = 0.05                # слабее — звезду не записываем
+
+# Пакетный MAST: поиск по участкам неба и выбор одного продукта на звезду до запуска конвейера
+# (стадия скачивания качает только выбранный файл). False — поштучный lk.search_lightcurve.
+BULK_MAST = True
+
+# Очищенные кривые всех звезд в одном хранилище (lc_store): при повторном прогоне звезда
+# читается оттуда, без MAST. None — не сохранять.
+LC_STORE = "lc_store"
+
+# Кэш результатов поиска периода по отпечатку очищенной кривой и параметрам сетки (SQLite):
+# повторный прогон после правки формул расстояний или порогов Av не пересчитывает спектры. None — выключен.
+PERIOD_CACHE = "period_cache.sqlite"
+
+# Замеры по стадиям: снимок раз в METRICS_INTERVAL секунд (.prom — формат Prometheus, иначе JSON)
+METRICS_FILE = "run_metrics.json"
+METRICS_INTERVAL = 30
+
+# Трассировка звезд в формате Chrome trace / Perfetto (None — выключено) и семплирующий
+# профайлер CPU-процессов (свернутые стеки для flamegraph). Выключенные ничего не стоят.
+TRACE_FILE = None               # например "run_trace.json"
+PROFILE_WORKERS = False
+PROFILE_FILE = "run_profile.folded"
+
+
+def fetch_star(task):
+    # 1. Загрузка данных
+    with tracing.span(task['star'], cat='fetch'):
+        if 'stored' in task:
+            with metrics.timer('store_read'):
+                raw_lc = lc_store.read_entry(*task['stored'])
+        elif 'product' in task:
+            raw_lc = mast_bulk.fetch(task['product']) if task['product'] else None
+        else:
+            raw_lc = download_lightcurve(task['ra'], task['dec'])
+    if raw_lc is None:
+        metrics.skip('no_lightcurve')
+    return raw_lc
+
+
+def analyze_star(task, raw_lc):
+    star, ra, dec, meta = task['star'], task['ra'], task['dec'], task['meta']
+
+    # 2. Поиск периода
+    with metrics.timer('clean'):
+        clean_lc = process_lightcurve(raw_lc)
+    # Очищенная кривая уходит писателю для lc_store (только если ее там еще нет)
+    to_store = (star, clean_lc) if task.get('keep_curve') else None
+    with metrics.timer('periodogram'):
+        period, pg, power = find_period(clean_lc, min_power=MIN_POWER, cache=PERIOD_CACHE)
+
+    if power < MIN_POWER:
+        metrics.skip('weak_signal')
+        return None, to_store
+
+    # 3. Расчет расстояния
+    with metrics.timer('distance'):
+        dist_calc = None
+        method_name = "---"
+
+        if period > 1.0:
+            dist_calc, method_name = calculate_cepheid_distance(
+                period, meta['v_mag'], meta['i_mag'], meta['j_mag'], meta['k_mag']
+            )
+        else:
+            dist_calc, method_name = calculate_rr_lyrae_distance(
+                period, meta['v_mag'], meta['k_mag']
+            )
+
+        if dist_calc is None:
+            metrics.skip('no_distance')
+            return None, to_store
+
+        # 4. Сравнение с Gaia
+        d_gaia = calculate_gaia_distance(meta['parallax_mas'])
+
+        Av_estimate = 0.0
+        status = "Normal"
+        gaia_str = ""
+
+        if d_gaia:
+            mu_calc = 5 * np.log10(dist_calc) - 5
+            mu_gaia = 5 * np.log10(d_gaia) - 5
+            Av_estimate = mu_calc - mu_gaia
+
+            if Av_estimate > 0.5:
+                status = "DUST FOUND"
+            elif Av_estimate < -0.3:
+                status = "ANOMALY"
+            else:
+                status = "Clean"
+            gaia_str = f"{d_gaia:.0f}"
+        else:
+            status = "No Gaia"
+
+    # 5. Сохранение графиков для аномалий
+    if status != "Clean":
+        with metrics.timer('plot'):
+            save_plots(star, clean_lc, pg, period, overwrite=not pg.get('cached'))
+
+    # 6. Строка результата (запишет единственный писатель)
+    line = f"{star},{ra},{dec},{period:.4f},{method_name},{gaia_str},{dist_calc:.0f},{Av_estimate:.2f},{status}\n"
+    return line, to_store
+
 
-def run_analysis():
-    if not os.path.exists(INPUT_FILE):
+def analyze_star_measured(task, raw_lc):
+    # В CPU-процессе: (строка результата, кривая для lc_store) + замеры стадий для главного процесса
+    return metrics.capture(analyze_star, task, raw_lc, label=task['star'])
+
+
+def run_analysis(pipeline=PIPELINE_MODE, n_download=N_DOWNLOAD_WORKERS, n_cpu=N_CPU_WORKERS,
+                 trace_file=TRACE_FILE, profile=PROFILE_WORKERS, bulk_mast=BULK_MAST,
+                 store_dir=LC_STORE):
+    if not startable.exists(INPUT_FILE):
         print(f"Файл {INPUT_FILE} не найден! Запустите catalog_generator.py или проверьте имя файла.")
         return
 
     # Загружаем данные
-    candidates = pd.read_csv(INPUT_FILE)
+    candidates = startable.read(INPUT_FILE)
 
     # --- УЛУЧШЕННЫЙ ПОИСК КОЛОНОК ---
     def find_col(possible_names):
@@ -41,6 +168,14 @@ def run_analysis():
         print(f"ОШИБКА: Не найдена колонка с названием звезды! Колонки в файле: {candidates.columns.tolist()}")
         return
 
+    meta_cols = {
+        'v_mag': find_col(['v_mag', 'V']),
+        'i_mag': find_col(['i_mag', 'I']),
+        'j_mag': find_col(['j_mag', 'J']),
+        'k_mag': find_col(['k_mag', 'K']),
+        'parallax_mas': find_col(['parallax', 'parallax_mas', 'plx_value'])
+    }
+
     total_stars = len(candidates)
 
     # Подготовка выходного файла
@@ -56,94 +191,93 @@ def run_analysis():
         except:
             already_processed = []
 
-    print(f"Начинаем ОБРАТНЫЙ анализ {total_stars} звезд (с конца списка)...")
-
-    # --- ГЛАВНОЕ ИЗМЕНЕНИЕ: .iloc[::-1] разворачивает таблицу задом наперед ---
-    for index, row in tqdm(candidates.iloc[::-1].iterrows(), total=total_stars):
+    # --- Список заданий: .iloc[::-1] разворачивает таблицу задом наперед ---
+    done = set(already_processed)
+    tasks = []
+    for index, row in candidates.iloc[::-1].iterrows():
         star = str(row[star_col])
 
         # Пропускаем уже обработанные на ЭТОЙ машине
-        if star in already_processed:
-            continue
-
-        try:
-            ra = row[ra_col] if ra_col else 0
-            dec = row[dec_col] if dec_col else 0
-
-            # Авто-поиск метаданных
-            def get_val(names):
-                c = find_col(names)
-                return row[c] if c and not pd.isna(row[c]) else None
-
-            meta = {
-                'v_mag': get_val(['v_mag', 'V']),
-                'i_mag': get_val(['i_mag', 'I']),
-                'j_mag': get_val(['j_mag', 'J']),
-                'k_mag': get_val(['k_mag', 'K']),
-                'parallax_mas': get_val(['parallax', 'parallax_mas', 'plx_value'])
-            }
-
-            # 1. Загрузка данных
-            raw_lc = download_lightcurve(ra, dec)
-            if raw_lc is None: continue
-
-            # 2. Поиск периода
-            clean_lc = process_lightcurve(raw_lc)
-            period, pg, power = find_period(clean_lc)
-
-            if power < 0.05: continue
-
-            # 3. Расчет расстояния
-            dist_calc = None
-            method_name = "---"
-
-            if period > 1.0:
-                dist_calc, method_name = calculate_cepheid_distance(
-                    period, meta['v_mag'], meta['i_mag'], meta['j_mag'], meta['k_mag']
-                )
-            else:
-                dist_calc, method_name = calculate_rr_lyrae_distance(
-                    period, meta['v_mag'], meta['k_mag']
-                )
-
-            if dist_calc is None: continue
-
-            # 4. Сравнение с Gaia
-            d_gaia = calculate_gaia_distance(meta['parallax_mas'])
-
-            Av_estimate = 0.0
-            status = "Normal"
-            gaia_str = ""
-
-            if d_gaia:
-                mu_calc = 5 * np.log10(dist_calc) - 5
-                mu_gaia = 5 * np.log10(d_gaia) - 5
-                Av_estimate = mu_calc - mu_gaia
-
-                if Av_estimate > 0.5:
-                    status = "DUST FOUND"
-                elif Av_estimate < -0.3:
-                    status = "ANOMALY"
-                else:
-                    status = "Clean"
-                gaia_str = f"{d_gaia:.0f}"
-            else:
-                status = "No Gaia"
-
-            # 5. Сохранение графиков для аномалий
-            if status != "Clean":
-                save_plots(star, clean_lc, pg, period)
-
-            # 6. Запись результата (дозапись в конец файла)
-            with open(OUTPUT_FILE, 'a', encoding='utf-8') as f:
-                line = f"{star},{ra},{dec},{period:.4f},{method_name},{gaia_str},{dist_calc:.0f},{Av_estimate:.2f},{status}\n"
-                f.write(line)
-
-        except Exception as e:
+        if star in done:
             continue
 
+        # Авто-поиск метаданных
+        meta = {key: (row[c] if c and not pd.isna(row[c]) else None) for key, c in meta_cols.items()}
+        tasks.append({
+            'star': star,
+            'ra': row[ra_col] if ra_col else 0,
+            'dec': row[dec_col] if dec_col else 0,
+            'meta': meta
+        })
+
+    print(f"Начинаем ОБРАТНЫЙ анализ {total_stars} звезд (с конца списка), осталось {len(tasks)}...")
+
+    metrics.reset()
+    store = lc_store.open_store(store_dir) if store_dir else None
+    if store is not None:
+        print(f"Из хранилища кривых: {lc_store.assign_stored(tasks, store)} звезд")
+    if bulk_mast:
+        # Поиск и выбор продукта MAST пакетом до конвейера: дальше качается только выбранный файл
+        mast_bulk.assign_products([task for task in tasks if 'stored' not in task])
+    if trace_file or profile:
+        # До запуска пула: CPU-процессы получат настройки через tracing.init_worker
+        tracing.enable(trace=bool(trace_file), profile=profile)
+    stop_snapshots = metrics.start_snapshots(METRICS_FILE, METRICS_INTERVAL)
+
+    # 7. Запись результата (дозапись в конец файла одним писателем)
+    with open(OUTPUT_FILE, 'a', encoding='utf-8') as out, tqdm(total=len(tasks)) as bar:
+        def write_line(item):
+            result, record = item
+            metrics.merge(record)
+            line, to_store = result or (None, None)
+            if to_store is not None:
+                with metrics.timer('store_write'):
+                    lc_store.append(store, *to_store)
+            if line is None:
+                return
+            with metrics.timer('write'):
+                out.write(line)
+                out.flush()
+
+        def on_done(task, result):
+            metrics.done()
+            bar.set_postfix_str(metrics.rates_line(), refresh=False)
+            bar.update(1)
+
+        def on_error(task, stage, e):
+            metrics.error(stage, e)
+
+        if pipeline:
+            run_pipeline(tasks, fetch_star, analyze_star_measured, write_line,
+                         n_fetch=n_download, n_compute=n_cpu, queue_size=QUEUE_SIZE,
+                         on_done=on_done, on_error=on_error,
+                         initializer=tracing.init_worker, initargs=(tracing.worker_settings(),))
+        else:
+            run_serial(tasks, fetch_star, analyze_star_measured, write_line, on_done=on_done, on_error=on_error)
+
+    if store is not None:
+        lc_store.flush(store)
+        print(f"Хранилище кривых {store_dir}: {len(store['entries'])} звезд")
+    stop_snapshots()
+    metrics.print_summary()
+    if trace_file:
+        print(f"Трасса: {trace_file} ({tracing.save_trace(trace_file)} интервалов, открыть в ui.perfetto.dev)")
+        for name, seconds in tracing.slowest(5, 'fetch'):
+            print(f"  скачивание {name}: {seconds:.1f} с")
+        for name, seconds in tracing.slowest(5, 'analyze'):
+            print(f"  расчет {name}: {seconds:.1f} с")
+    if profile:
+        tracing.stop_profiler()
+        print(f"Профиль CPU-процессов: {PROFILE_FILE} ({tracing.save_profile(PROFILE_FILE)} семплов)")
+    if trace_file or profile:
+        tracing.disable()
+    print(f"Метрики: {METRICS_FILE}")
+    print_cache_stats()
+    if PERIOD_CACHE:
+        info = period_cache.stats(PERIOD_CACHE)
+        print(f"Кэш периодов {PERIOD_CACHE}: {info['entries']} записей, {info['mb']:.1f} МБ")
     print(f"\nГотово! Результаты на ПК (задом наперед) сохранены в {OUTPUT_FILE}")
 
 
 if __name__ == "__main__":
-    run_analysis()
\ No newline at end of file
+    run_analysis()
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import warnings
 from tqdm import tqdm
 
@@ -8,6 +9,17 @@ import data_fetcher
 import analysis
 import astrophysics
 import visualizer
+import lc_cache
+import simbad_meta
+import mast_bulk
+import lc_store
+import period_cache
+import metrics
+import tracing
+from pipeline import run_pipeline, run_serial
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import startable
 
 # Игнорируем предупреждения библиотек
 warnings.filterwarnings("ignore")
@@ -15,95 +27,237 @@ warnings.filterwarnings("ignore")
 INPUT_FILE = "candidates_listold.csv"
 OUTPUT_FILE = "universal_map_largePC.csv"
 
-def run_analysis():
-    if not os.path.exists(INPUT_FILE):
+# Конвейерный режим: SIMBAD/MAST, периодограммы и запись идут одновременно
+PIPELINE_MODE = True
+N_DOWNLOAD_WORKERS = 8
+N_CPU_WORKERS = os.cpu_count()
+QUEUE_SIZE = 32
+MIN_POWER = 0.001
+
+# Пакетный MAST: поиск по участкам неба и выбор одного продукта на звезду до запуска конвейера
+# (стадия скачивания качает только выбранный файл). False — поштучный lk.search_lightcurve.
+BULK_MAST = True
+
+# Очищенные кривые всех звезд в одном хранилище (lc_store): при повторном прогоне звезда
+# читается оттуда, без MAST. None — не сохранять.
+LC_STORE = "lc_store"
+
+# Кэш результатов поиска периода по отпечатку очищенной кривой и параметрам сетки (SQLite):
+# повторный прогон после правки формул расстояний или порогов Av не пересчитывает спектры. None — выключен.
+PERIOD_CACHE = "period_cache.sqlite"
+
+# Замеры по стадиям: снимок раз в METRICS_INTERVAL секунд (.prom — формат Prometheus, иначе JSON)
+METRICS_FILE = "run_metrics_server.json"
+METRICS_INTERVAL = 30
+
+# Трассировка звезд в формате Chrome trace / Perfetto (None — выключено) и семплирующий
+# профайлер CPU-процессов (свернутые стеки для flamegraph). Выключенные ничего не стоят.
+TRACE_FILE = None               # например "run_trace.json"
+PROFILE_WORKERS = False
+PROFILE_FILE = "run_profile.folded"
+
+
+def fetch_star(task):
+    # 1. Метаданные уже получены пакетом из SIMBAD (run_analysis) — лежат в задании
+    meta = task['meta']
+    if not meta:
+        metrics.skip('no_metadata')
+        return None
+
+    # 2. Скачивание данных TESS/Kepler
+    with tracing.span(task['star'], cat='fetch'):
+        if 'stored' in task:
+            with metrics.timer('store_read'):
+                raw_lc = lc_store.read_entry(*task['stored'])
+        elif 'product' in task:
+            raw_lc = mast_bulk.fetch(task['product']) if task['product'] else None
+        else:
+            raw_lc = data_fetcher.download_lightcurve(task['ra'], task['dec'])
+    if raw_lc is None:
+        metrics.skip('no_lightcurve')
+        return None
+
+    return meta, raw_lc
+
+
+def analyze_star(task, payload):
+    star, ra, dec = task['star'], task['ra'], task['dec']
+    meta, raw_lc = payload
+    is_carbon = 'C' in task['sp_type']
+
+    # 3. Анализ периода
+    with metrics.timer('clean'):
+        clean_lc = analysis.process_lightcurve(raw_lc)
+    # Очищенная кривая уходит писателю для lc_store (только если ее там еще нет)
+    to_store = (star, clean_lc) if task.get('keep_curve') else None
+    with metrics.timer('periodogram'):
+        period, pg, power = analysis.find_period(clean_lc, min_power=MIN_POWER, cache=PERIOD_CACHE)
+
+    # Если сигнал очень слабый
+    if power < MIN_POWER:
+        metrics.skip('weak_signal')
+        return None, to_store
+
+    # 4. Астрофизика
+    with metrics.timer('distance'):
+        star_type = "Cepheid" if period > 1.0 else "RR Lyrae"
+        dist_calc = None
+        method_name = "None"
+        status = "Processing"
+        av_est = 0.0
+
+        # Логика классификации
+        if is_carbon and star_type == "Cepheid":
+            method_name = "Carbon_Star_Skip"
+            status = "Skipped (Carbon)"
+            metrics.skip('carbon')
+        elif star_type == "Cepheid":
+            dist_calc, method_name = astrophysics.calculate_cepheid_distance(
+                period, meta['v_mag'], meta.get('i_mag'), meta.get('j_mag'), meta['k_mag']
+            )
+        else:
+            dist_calc, method_name = astrophysics.calculate_rr_lyrae_distance(
+                period, meta['v_mag'], meta['k_mag']
+            )
+        if dist_calc is None and not is_carbon:
+            metrics.skip('no_distance')
+
+        # 5. Сравнение с Gaia
+        d_gaia = astrophysics.calculate_gaia_distance(meta['parallax_mas'])
+
+        if dist_calc and d_gaia:
+            av_est = 5 * np.log10(dist_calc / d_gaia)
+            if av_est > 0.5: status = "DUST FOUND"
+            elif av_est < -0.5: status = "ANOMALY"
+            else: status = "Clean"
+        elif dist_calc:
+            status = "No Gaia Ref"
+
+    # Сохраняем графики только для интересных случаев
+    if status in ["DUST FOUND", "ANOMALY"]:
+        with metrics.timer('plot'):
+            visualizer.save_plots(star, clean_lc, pg, period, overwrite=not pg.get('cached'))
+
+    # 6. Строка для файла (теперь она возвращается всегда для найденных звезд)
+    calc_val = f"{dist_calc:.1f}" if dist_calc else "0"
+    gaia_val = f"{d_gaia:.1f}" if d_gaia else ""
+    line = f"{star},{ra},{dec},{period:.4f},{method_name},{gaia_val},{calc_val},{av_est:.2f},{status}\n"
+    return line, to_store
+
+
+def analyze_star_measured(task, payload):
+    # В CPU-процессе: (строка результата, кривая для lc_store) + замеры стадий для главного процесса
+    return metrics.capture(analyze_star, task, payload, label=task['star'])
+
+
+def run_analysis(pipeline=PIPELINE_MODE, n_download=N_DOWNLOAD_WORKERS, n_cpu=N_CPU_WORKERS,
+                 trace_file=TRACE_FILE, profile=PROFILE_WORKERS, bulk_mast=BULK_MAST,
+                 store_dir=LC_STORE):
+    if not startable.exists(INPUT_FILE):
         print(f"ОШИБКА: Файл {INPUT_FILE} не найден в папке проекта!")
         return
 
-    candidates = pd.read_csv(INPUT_FILE).iloc[::-1]
+    candidates = startable.read(INPUT_FILE).iloc[::-1]
     
     # Создаем заголовки, если файла еще нет
     if not os.path.exists(OUTPUT_FILE):
         with open(OUTPUT_FILE, 'w') as f:
             f.write("Star,RA,Dec,Period,Method,Gaia_Dist,Calc_Dist,Dust_Av,Status\n")
 
-    print(f"Начинаю анализ {len(candidates)} звезд...")
-
-    for index, row in tqdm(candidates.iterrows(), total=len(candidates)):
-        star = str(row['name'])
+    tasks = []
+    for index, row in candidates.iterrows():
         try:
-            ra, dec = float(row['ra']), float(row['dec'])
-            sp_type = str(row.get('sp_type', ''))
-            is_carbon = 'C' in sp_type
-
-            # 1. Запрос метаданных
-            meta = data_fetcher.get_star_metadata(star, ra, dec)
-            if not meta:
-                # print(f"-> {star}: Пропуск (Simbad не ответил)")
-                continue
-
-            # 2. Скачивание данных TESS/Kepler
-            raw_lc = data_fetcher.download_lightcurve(ra, dec)
-            if raw_lc is None:
-                # print(f"-> {star}: Пропуск (Данные TESS не найдены)")
-                continue
-
-            # 3. Анализ периода
-            clean_lc = analysis.process_lightcurve(raw_lc)
-            period, pg, power = analysis.find_period(clean_lc)
-
-            # Если сигнал очень слабый
-            if power < 0.001:
-                # print(f"-> {star}: Пропуск (Слабый сигнал: {power:.5f})")
-                continue
-
-            # 4. Астрофизика
-            star_type = "Cepheid" if period > 1.0 else "RR Lyrae"
-            dist_calc = None
-            method_name = "None"
-            status = "Processing"
-            av_est = 0.0
-
-            # Логика классификации
-            if is_carbon and star_type == "Cepheid":
-                method_name = "Carbon_Star_Skip"
-                status = "Skipped (Carbon)"
-            elif star_type == "Cepheid":
-                dist_calc, method_name = astrophysics.calculate_cepheid_distance(
-                    period, meta['v_mag'], meta.get('i_mag'), meta.get('j_mag'), meta['k_mag']
-                )
-            else:
-                dist_calc, method_name = astrophysics.calculate_rr_lyrae_distance(
-                    period, meta['v_mag'], meta['k_mag']
-                )
-
-            # 5. Сравнение с Gaia
-            d_gaia = astrophysics.calculate_gaia_distance(meta['parallax_mas'])
-            
-            if dist_calc and d_gaia:
-                av_est = 5 * np.log10(dist_calc / d_gaia)
-                if av_est > 0.5: status = "DUST FOUND"
-                elif av_est < -0.5: status = "ANOMALY"
-                else: status = "Clean"
-            elif dist_calc:
-                status = "No Gaia Ref"
-            
-            # 6. ЗАПИСЬ В ФАЙЛ (Теперь она срабатывает всегда для найденных звезд)
-            calc_val = f"{dist_calc:.1f}" if dist_calc else "0"
-            gaia_val = f"{d_gaia:.1f}" if d_gaia else ""
-            
-            with open(OUTPUT_FILE, 'a') as f:
-                f.write(f"{star},{ra},{dec},{period:.4f},{method_name},{gaia_val},{calc_val},{av_est:.2f},{status}\n")
-
-            # Сохраняем графики только для интересных случаев
-            if status in ["DUST FOUND", "ANOMALY"]:
-                visualizer.save_plots(star, clean_lc, pg, period)
+            tasks.append({
+                'star': str(row['name']),
+                'ra': float(row['ra']),
+                'dec': float(row['dec']),
+                'sp_type': str(row.get('sp_type', ''))
+            })
+        except Exception as e:
+            print(f"\n[!] Ошибка на звезде {row.get('name')}: {e}")
+
+    metrics.reset()
 
+    # Метаданные SIMBAD для всех звезд сразу (кусками через TAP upload, с кэшем по имени)
+    with metrics.timer('metadata'):
+        try:
+            metadata = simbad_meta.resolve(tasks)
         except Exception as e:
-            # Если возникла ошибка, мы хотя бы узнаем о ней в консоли
-            print(f"\n[!] Ошибка на звезде {star}: {e}")
-            continue
+            print(f"\n[!] SIMBAD недоступен: {e}")
+            metadata = {}
+    for task in tasks:
+        task['meta'] = metadata.get(task['star'])
+
+    store = lc_store.open_store(store_dir) if store_dir else None
+    if store is not None:
+        print(f"Из хранилища кривых: {lc_store.assign_stored(tasks, store)} звезд")
+
+    # Поиск и выбор продукта MAST пакетом — только для звезд, найденных в SIMBAD и не из хранилища
+    if bulk_mast:
+        mast_bulk.assign_products([task for task in tasks if task['meta'] and 'stored' not in task])
+
+    print(f"Начинаю анализ {len(tasks)} звезд...")
+
+    def on_error(task, stage, e):
+        # Если возникла ошибка, мы хотя бы узнаем о ней в консоли
+        metrics.error(stage, e)
+        print(f"\n[!] Ошибка на звезде {task['star']} ({stage}): {e}")
+
+    if trace_file or profile:
+        # До запуска пула: CPU-процессы получат настройки через tracing.init_worker
+        tracing.enable(trace=bool(trace_file), profile=profile)
+    stop_snapshots = metrics.start_snapshots(METRICS_FILE, METRICS_INTERVAL)
+
+    with open(OUTPUT_FILE, 'a') as out, tqdm(total=len(tasks)) as bar:
+        def write_line(item):
+            result, record = item
+            metrics.merge(record)
+            line, to_store = result or (None, None)
+            if to_store is not None:
+                with metrics.timer('store_write'):
+                    lc_store.append(store, *to_store)
+            if 'failure' in record:
+                print(f"\n[!] Ошибка при расчете ({record['failure']})")
+            if line is None:
+                return
+            with metrics.timer('write'):
+                out.write(line)
+                out.flush()
+
+        def on_done(task, result):
+            metrics.done()
+            bar.set_postfix_str(metrics.rates_line(), refresh=False)
+            bar.update(1)
+
+        if pipeline:
+            run_pipeline(tasks, fetch_star, analyze_star_measured, write_line,
+                         n_fetch=n_download, n_compute=n_cpu, queue_size=QUEUE_SIZE,
+                         on_done=on_done, on_error=on_error,
+                         initializer=tracing.init_worker, initargs=(tracing.worker_settings(),))
+        else:
+            run_serial(tasks, fetch_star, analyze_star_measured, write_line, on_done=on_done, on_error=on_error)
 
+    if store is not None:
+        lc_store.flush(store)
+        print(f"Хранилище кривых {store_dir}: {len(store['entries'])} звезд")
+    stop_snapshots()
+    metrics.print_summary()
+    if trace_file:
+        print(f"Трасса: {trace_file} ({tracing.save_trace(trace_file)} интервалов, открыть в ui.perfetto.dev)")
+        for name, seconds in tracing.slowest(5, 'fetch'):
+            print(f"  скачивание {name}: {seconds:.1f} с")
+        for name, seconds in tracing.slowest(5, 'analyze'):
+            print(f"  расчет {name}: {seconds:.1f} с")
+    if profile:
+        tracing.stop_profiler()
+        print(f"Профиль CPU-процессов: {PROFILE_FILE} ({tracing.save_profile(PROFILE_FILE)} семплов)")
+    if trace_file or profile:
+        tracing.disable()
+    print(f"Метрики: {METRICS_FILE}")
+    lc_cache.print_cache_stats()
+    if PERIOD_CACHE:
+        info = period_cache.stats(PERIOD_CACHE)
+        print(f"Кэш периодов {PERIOD_CACHE}: {info['entries']} записей, {info['mb']:.1f} МБ")
     print(f"\nАнализ завершен. Результаты сохранены в {OUTPUT_FILE}")
 
 if __name__ == "__main__":
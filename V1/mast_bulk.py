@@ -0,0 +1,281 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import astropy.units as u
+from astropy.coordinates import SkyCoord
+
+import lc_cache
+import lc_fits
+import metrics
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import crossmatch
+
+# Пакетная работа с MAST вместо lk.search_lightcurve на каждую звезду:
+# 1) поиск наблюдений сразу для всех кандидатов — один запрос на участок неба (TESS и Kepler вместе);
+# 2) список файлов кривых блеска найденных наблюдений пачками obsid;
+# 3) выбор одного файла на звезду только по метаданным (каденс, длительность файла, автор)
+#    и параллельная закачка только выбранных файлов.
+# Звезды, для которых пакетный поиск ничего не нашел, идут обычным поштучным поиском.
+MISSIONS = ['TESS', 'Kepler']   # project в MAST (QLP и TESS-SPOC лежат в obs_collection 'HLSP', но project 'TESS')
+PRODUCT_TYPES = ['cube', 'timeseries']  # как у lightkurve: кривые Kepler в MAST — "cube", TESS — "timeseries"
+HLSP_AUTHORS = ('QLP', 'TESS-SPOC')     # остальные HLSP (другие форматы файлов) не берем
+SEARCH_RADIUS_ARCSEC = 10       # как в data_fetcher.download_lightcurve
+TILE_DEG = 2.0                  # размер участка неба на один запрос поиска
+PRODUCT_BATCH = 500             # obsid в одном get_product_list
+MAX_SEARCH_JOBS = 4
+MAX_DOWNLOAD_JOBS = 8
+DOWNLOAD_DIR = "mast_products"
+
+# Выбор продукта: период ищется в PERIOD_RANGE (как в analysis.find_period)
+PERIOD_RANGE = (0.1, 50)
+SAMPLES_PER_PERIOD = 10         # каденс не грубее min_period / 10
+MIN_CYCLES = 3                  # длительность от 3 максимальных периодов — полное покрытие
+AUTHOR_RANK = {'SPOC': 0, 'Kepler': 0, 'TESS-SPOC': 1, 'QLP': 2}
+LC_SUBGROUPS = ('LC', 'LLC')    # lc.fits у SPOC/TESS-SPOC, llc.fits у Kepler (длинный каденс) и QLP
+# Наблюдение Kepler в MAST — все кварталы сразу, а файл — один квартал; длительность кварталов
+# (сут, приблизительно), остальные ~90 сут. Квартал берется из описания файла ("... - Q5").
+KEPLER_QUARTER_DAYS = {0: 9.7, 1: 33.5, 17: 31.8}
+KEPLER_QUARTER_DEFAULT = 90.0
+
+OBS_COLUMNS = ['obsid', 'obs_collection', 'project', 'provenance_name', 'target_name', 's_ra', 's_dec',
+               't_min', 't_max', 't_exptime']
+
+
+def _default_service():
+    from astroquery.mast import Observations
+    return Observations
+
+
+def _as_frame(stars):
+    # DataFrame или список заданий из main/mainforserver (star/name, ra, dec)
+    df = pd.DataFrame(stars) if not isinstance(stars, pd.DataFrame) else stars
+    if 'star' not in df.columns and 'name' in df.columns:
+        df = df.rename(columns={'name': 'star'})
+    df = df[['star', 'ra', 'dec']].copy()
+    df['star'] = df['star'].astype(str)
+    return df.drop_duplicates('star').reset_index(drop=True)
+
+
+def tiles(ra, dec, tile_deg=TILE_DEG, radius_arcsec=SEARCH_RADIUS_ARCSEC):
+    """
+    Делит звезды на участки неба примерно tile_deg x tile_deg.
+    Возвращает [(ra центра, dec центра, радиус конуса в градусах, индексы звезд), ...];
+    конус покрывает все звезды участка с запасом на радиус поиска.
+    """
+    ra, dec = np.asarray(ra, dtype=np.float64), np.asarray(dec, dtype=np.float64)
+    band = np.floor((dec + 90) / tile_deg).astype(np.int64)
+    band_dec = np.clip(-90 + (band + 0.5) * tile_deg, -89.9, 89.9)
+    n_cells = np.maximum(1, np.floor(360 * np.cos(np.radians(band_dec)) / tile_deg)).astype(np.int64)
+    cell = np.floor((ra % 360) / 360 * n_cells).astype(np.int64)
+    keys = band * 100_000 + cell
+
+    result = []
+    vectors = crossmatch.radec_to_unit(ra, dec)
+    for key in np.unique(keys):
+        members = np.flatnonzero(keys == key)
+        center = vectors[members].sum(axis=0)
+        center /= np.linalg.norm(center)
+        sep = np.degrees(np.arccos(np.clip(vectors[members] @ center, -1, 1))).max()
+        c_ra = np.degrees(np.arctan2(center[1], center[0])) % 360
+        c_dec = np.degrees(np.arcsin(center[2]))
+        result.append((float(c_ra), float(c_dec), float(sep + radius_arcsec / 3600), members))
+    return result
+
+
+def _query_tile(service, c_ra, c_dec, radius_deg, missions):
+    # Ответ по участку кэшируется как обычный поиск (lc_cache), ключ — центр, радиус, миссии и типы продуктов
+    key = lc_cache.search_key(c_ra, c_dec, radius_deg * 3600,
+                              "bulk:" + ",".join(missions) + ":" + ",".join(PRODUCT_TYPES))
+    table = lc_cache.load_search(key)
+    if table is None:
+        # Фильтр по project, а не по obs_collection: иначе не находятся HLSP (QLP, TESS-SPOC)
+        table = service.query_criteria(coordinates=SkyCoord(c_ra, c_dec, unit='deg'), radius=radius_deg * u.deg,
+                                       project=list(missions), dataproduct_type=PRODUCT_TYPES)
+        lc_cache.save_search(key, table)
+    df = table.to_pandas() if len(table) else pd.DataFrame(columns=OBS_COLUMNS)
+    return df[[c for c in OBS_COLUMNS if c in df.columns]]
+
+
+def search_products(stars, service=None, radius_arcsec=SEARCH_RADIUS_ARCSEC, missions=MISSIONS,
+                    tile_deg=TILE_DEG, max_workers=MAX_SEARCH_JOBS):
+    """
+    Наблюдения TESS/Kepler для всех звезд: по строке на пару (звезда, наблюдение) в радиусе поиска.
+    Колонки: star, obsid, obs_collection, project, provenance_name, t_min, t_max, t_exptime, sep_arcsec.
+    """
+    service = service or _default_service()
+    stars = _as_frame(stars)
+    parts = tiles(stars['ra'], stars['dec'], tile_deg, radius_arcsec)
+
+    with metrics.timer('search'), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_query_tile, service, c_ra, c_dec, radius, missions)
+                   for c_ra, c_dec, radius, _ in parts]
+        frames = [f.result() for f in futures]
+
+    obs = pd.concat([f for f in frames if len(f)] or [pd.DataFrame(columns=OBS_COLUMNS)], ignore_index=True)
+    obs = obs.drop_duplicates('obsid')
+    obs = obs[(obs['obs_collection'] != 'HLSP') | obs['provenance_name'].isin(HLSP_AUTHORS)].reset_index(drop=True)
+    print(f"MAST: {len(stars)} звезд, {len(parts)} запросов поиска, наблюдений {len(obs)}")
+    if obs.empty:
+        return pd.DataFrame(columns=['star'] + OBS_COLUMNS + ['sep_arcsec'])
+
+    matches = crossmatch.crossmatch(stars, obs, radius_arcsec, ref_ra_col='s_ra', ref_dec_col='s_dec', keep='all')
+    return matches.dropna(subset=['obsid']).drop(columns=['ra', 'dec']).reset_index(drop=True)
+
+
+def select_products(matches, period_range=PERIOD_RANGE, period_ranges=None):
+    """
+    Одна строка на звезду по метаданным: каденс должен разрешать min_period,
+    дальше — лучшее покрытие max_period (длительность), более грубый из подходящих
+    каденсов (меньше байт), предпочтительный автор при равном каденсе, ближайшая цель.
+    Длительность — колонка span (у файлов из product_files), иначе t_max - t_min наблюдения.
+    period_ranges — {звезда: (min_period, max_period)} для звезд с известным типом.
+    """
+    if matches.empty:
+        return matches
+    df = matches.copy()
+    ranges = [(period_ranges or {}).get(s, period_range) for s in df['star']]
+    p_min = np.array([r[0] for r in ranges], dtype=np.float64)
+    p_max = np.array([r[1] for r in ranges], dtype=np.float64)
+
+    cadence_days = df['t_exptime'].to_numpy(dtype=np.float64) / 86400.0
+    if 'span' not in df.columns:
+        df['span'] = df['t_max'] - df['t_min']
+    baseline = df['span'].to_numpy(dtype=np.float64)
+    df['usable'] = cadence_days <= p_min / SAMPLES_PER_PERIOD
+    # Покрытие округляем, чтобы сектора TESS одной длины считались равными и решали автор/каденс
+    df['coverage'] = np.round(np.minimum(baseline / (MIN_CYCLES * p_max), 1.0), 1)
+    df['author_rank'] = df['provenance_name'].map(AUTHOR_RANK).fillna(len(AUTHOR_RANK)).astype(int)
+
+    df = df.sort_values(['star', 'usable', 'coverage', 't_exptime', 'author_rank', 'span', 'sep_arcsec'],
+                        ascending=[True, False, False, False, True, False, True])
+    return df.drop_duplicates('star').reset_index(drop=True)
+
+
+def _file_span(files):
+    """Длительность каждого файла, сут: у TESS файл = наблюдение, у Kepler — один квартал."""
+    span = (files['t_max'] - files['t_min']).to_numpy(dtype=np.float64)
+    if 'description' not in files.columns:
+        return span
+    quarter = files['description'].astype(str).str.extract(r'Q(\d+)', expand=False)
+    kepler = ((files['project'] == 'Kepler') & quarter.notna()).to_numpy()
+    days = np.array([KEPLER_QUARTER_DAYS.get(int(q), KEPLER_QUARTER_DEFAULT) for q in quarter[kepler]])
+    span[kepler] = np.minimum(span[kepler], days)
+    return span
+
+
+def product_files(matches, service=None, batch=PRODUCT_BATCH):
+    """
+    Файлы кривых блеска найденных наблюдений (get_product_list пачками obsid):
+    по строке на пару (звезда, файл) с собственной длительностью файла span.
+    Наблюдения без файла кривой блеска выпадают.
+    """
+    service = service or _default_service()
+    obsids = list(dict.fromkeys(str(o) for o in matches['obsid']))
+    frames = []
+    for i in range(0, len(obsids), batch):
+        table = service.get_product_list(obsids[i:i + batch])
+        frames.append(table.to_pandas())
+    columns = ['obsid', 'productFilename', 'dataURI', 'size', 'description']
+    products = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns + ['obsID'])
+    products = products[products['productSubGroupDescription'].isin(LC_SUBGROUPS)] if len(products) else products
+    products = products.assign(obsid=products['obsID'].astype(str))
+
+    files = matches.assign(obsid=matches['obsid'].astype(str)).merge(
+        products[[c for c in columns if c in products.columns]], on='obsid', how='inner')
+    files['span'] = _file_span(files)
+    return files
+
+
+def plan(stars, service=None, period_range=PERIOD_RANGE, period_ranges=None, **search_kw):
+    """
+    Поиск + список файлов + выбор. Возвращает {звезда: продукт (словарь) или None}.
+    Звезды без наблюдений или без файла кривой блеска получают None.
+    """
+    service = service or _default_service()
+    stars = _as_frame(stars)
+    matches = search_products(stars, service, **search_kw)
+    files = product_files(matches, service) if len(matches) else matches
+    selected = select_products(files, period_range, period_ranges)
+    chosen = {row['star']: row for row in selected.to_dict('records') if isinstance(row.get('dataURI'), str)}
+    total = sum(float(p['size']) for p in chosen.values() if pd.notna(p['size']))
+    print(f"MAST: выбрано продуктов {len(chosen)} из {len(stars)} звезд, к закачке {total / 1e6:.1f} МБ")
+    return {star: chosen.get(star) for star in stars['star']}
+
+
+def _local_path(product, out_dir):
+    return os.path.join(out_dir, product['productFilename'])
+
+
+def download_one(product, service=None, out_dir=DOWNLOAD_DIR):
+    """Скачивает файл продукта (если его еще нет на диске). Возвращает локальный путь."""
+    path = _local_path(product, out_dir)
+    if os.path.exists(path):
+        return path
+    service = service or _default_service()
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    service.download_file(product['dataURI'], local_path=tmp, cache=False)
+    os.replace(tmp, path)
+    return path
+
+
+def download_products(products, service=None, out_dir=DOWNLOAD_DIR, max_workers=MAX_DOWNLOAD_JOBS):
+    """
+    Параллельная закачка выбранных файлов (products — результат plan()).
+    Возвращает ({звезда: путь}, [(звезда, ошибка), ...]); уже скачанные файлы не качаются повторно.
+    """
+    service = service or _default_service()
+    todo = {star: p for star, p in products.items() if p is not None}
+    paths, failed = {}, []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download_one, p, service, out_dir): star for star, p in todo.items()}
+        for future in as_completed(futures):
+            star = futures[future]
+            try:
+                paths[star] = future.result()
+            except Exception as e:
+                failed.append((star, e))
+    if failed:
+        print(f"MAST: не скачано файлов: {len(failed)} (запустите еще раз — готовые не перекачиваются)")
+    return paths, failed
+
+
+def fetch(product, service=None, out_dir=DOWNLOAD_DIR):
+    """
+    Для стадии скачивания конвейера: файл выбранного продукта -> словарь массивов lc_fits.read
+    (только TIME, поток и QUALITY; без LightCurve). None при ошибке.
+    """
+    try:
+        with metrics.timer('download'):
+            path = download_one(product, service, out_dir)
+            return lc_fits.read(path)
+    except Exception:
+        return None
+
+
+def assign_products(tasks, service=None, **plan_kw):
+    """
+    Для конвейера main/mainforserver: task['product'] = выбранный продукт.
+    Звездам без пакетного совпадения продукт не ставится — их стадия скачивания ищет поштучно
+    (download_lightcurve, ответ тоже кэшируется). Если пакетный поиск не удался, задания не меняются.
+    """
+    if not tasks:
+        return tasks
+    try:
+        products = plan(tasks, service, **plan_kw)
+    except Exception as e:
+        print(f"[!] Пакетный поиск MAST не удался ({e}), качаем поштучно")
+        return tasks
+    missing = 0
+    for task in tasks:
+        product = products.get(str(task['star']))
+        if product is None:
+            missing += 1
+        else:
+            task['product'] = product
+    if missing:
+        print(f"MAST: без пакетного совпадения {missing} звезд — для них поштучный поиск")
+    return tasks
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import tracing
+
+# Замеры run_analysis: время по стадиям, причины пропуска звезд и ошибки по стадиям.
+# Стадии скачивания (search, download) идут в потоках главного процесса и пишут сюда напрямую.
+# Стадии расчета (clean, periodogram, distance, plot) идут в CPU-процессах: там capture()
+# собирает их в отдельную запись, которая возвращается вместе с результатом и сливается merge().
+STAGES = ('metadata', 'search', 'download', 'store_read', 'clean', 'periodogram', 'distance', 'plot', 'write',
+          'store_write')
+NETWORK_STAGES = ('metadata', 'search', 'download')
+PROM_PREFIX = "astro_run"
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _new_record():
+    return {'stages': {}, 'skips': {}, 'errors': {}}
+
+
+_state = {'started': time.time(), 'done': 0, **_new_record()}
+
+
+def reset():
+    """Обнуляет счетчики (в начале run_analysis)."""
+    with _lock:
+        _state.update(started=time.time(), done=0, **_new_record())
+
+
+def _add(record, stage, seconds):
+    entry = record['stages'].setdefault(stage, {'count': 0, 'seconds': 0.0, 'max_s': 0.0})
+    entry['count'] += 1
+    entry['seconds'] += seconds
+    entry['max_s'] = max(entry['max_s'], seconds)
+
+
+def _bump(table, key, n=1):
+    table[key] = table.get(key, 0) + n
+
+
+def _update(fn):
+    # Внутри capture() — в запись текущего потока, иначе — в общие счетчики процесса
+    record = getattr(_local, 'record', None)
+    if record is not None:
+        fn(record)
+    else:
+        with _lock:
+            fn(_state)
+
+
+def error(stage, exc):
+    """Учет исключения; одно и то же исключение считается один раз (на самой внутренней стадии)."""
+    if getattr(exc, '_metrics_stage', None) is not None:
+        return
+    try:
+        exc._metrics_stage = stage
+    except AttributeError:
+        pass
+    _update(lambda r: _bump(r['errors'].setdefault(stage, {}), type(exc).__name__))
+
+
+@contextmanager
+def timer(stage):
+    """with metrics.timer('download'): ... — время стадии; исключение учитывается как ошибка стадии."""
+    start = time.perf_counter()
+    try:
+        with tracing.span(stage):
+            yield
+    except Exception as e:
+        error(stage, e)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        _update(lambda r: _add(r, stage, seconds))
+
+
+def skip(reason):
+    """Звезда отброшена: no_metadata, no_lightcurve, weak_signal, no_distance, carbon ..."""
+    _update(lambda r: _bump(r['skips'], reason))
+
+
+def done(n=1):
+    with _lock:
+        _state['done'] += n
+
+
+def capture(func, *args, label=None):
+    """
+    Вызов func(*args) в CPU-процессе с отдельной записью замеров.
+    Возвращает (результат, запись); исключение не пробрасывается, а попадает
+    в запись (ошибки и record['failure']) — результат тогда None.
+    label — имя интервала в трассе (обычно имя звезды), если трассировка включена;
+    интервалы и семплы профайлера этого процесса уходят в запись (record['trace']).
+    """
+    tracing.attach()
+    _local.record = record = _new_record()
+    try:
+        with tracing.span(label or func.__name__, cat='analyze'):
+            result = func(*args)
+    except Exception as e:
+        error('compute', e)
+        record['failure'] = f"{getattr(e, '_metrics_stage', 'compute')}: {e!r}"
+        result = None
+    finally:
+        _local.record = None
+    trace = tracing.drain()
+    if trace is not None:
+        record['trace'] = trace
+    return result, record
+
+
+def merge(record):
+    """Сливает запись из capture() в общие счетчики главного процесса."""
+    tracing.merge(record.get('trace'))
+    with _lock:
+        for stage, entry in record['stages'].items():
+            total = _state['stages'].setdefault(stage, {'count': 0, 'seconds': 0.0, 'max_s': 0.0})
+            total['count'] += entry['count']
+            total['seconds'] += entry['seconds']
+            total['max_s'] = max(total['max_s'], entry['max_s'])
+        for reason, n in record['skips'].items():
+            _bump(_state['skips'], reason, n)
+        for stage, kinds in record['errors'].items():
+            for kind, n in kinds.items():
+                _bump(_state['errors'].setdefault(stage, {}), kind, n)
+
+
+def snapshot():
+    """Текущее состояние счетчиков словарем (для JSON, Prometheus и строки tqdm)."""
+    with _lock:
+        elapsed = max(time.time() - _state['started'], 1e-9)
+        stages = {}
+        for stage in sorted(_state['stages'], key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            entry = _state['stages'][stage]
+            stages[stage] = {
+                **entry,
+                'mean_s': entry['seconds'] / entry['count'],
+                'per_s': entry['count'] / elapsed,
+            }
+        return {
+            'updated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'elapsed_s': elapsed,
+            'stars_done': _state['done'],
+            'stars_per_s': _state['done'] / elapsed,
+            'stages': stages,
+            'skips': dict(_state['skips']),
+            'errors': {stage: dict(kinds) for stage, kinds in _state['errors'].items()},
+        }
+
+
+def to_prometheus(snap):
+    """Снимок в текстовом формате Prometheus (для node_exporter textfile collector)."""
+    p = PROM_PREFIX
+    lines = [
+        f"# TYPE {p}_elapsed_seconds gauge", f"{p}_elapsed_seconds {snap['elapsed_s']:.3f}",
+        f"# TYPE {p}_stars_done_total counter", f"{p}_stars_done_total {snap['stars_done']}",
+        f"# TYPE {p}_stage_calls_total counter",
+    ]
+    lines += [f'{p}_stage_calls_total{{stage="{s}"}} {e["count"]}' for s, e in snap['stages'].items()]
+    lines.append(f"# TYPE {p}_stage_seconds_total counter")
+    lines += [f'{p}_stage_seconds_total{{stage="{s}"}} {e["seconds"]:.6f}' for s, e in snap['stages'].items()]
+    lines.append(f"# TYPE {p}_skips_total counter")
+    lines += [f'{p}_skips_total{{reason="{r}"}} {n}' for r, n in snap['skips'].items()]
+    lines.append(f"# TYPE {p}_errors_total counter")
+    lines += [f'{p}_errors_total{{stage="{s}",kind="{k}"}} {n}'
+              for s, kinds in snap['errors'].items() for k, n in kinds.items()]
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path):
+    """Пишет снимок в path: .prom — формат Prometheus, иначе JSON. Запись атомарная."""
+    snap = snapshot()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        if path.endswith('.prom'):
+            f.write(to_prometheus(snap))
+        else:
+            json.dump(snap, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def start_snapshots(path, interval=30.0):
+    """Фоновая запись снимка раз в interval секунд. Возвращает stop() — она пишет последний снимок."""
+    stopped = threading.Event()
+
+    def loop():
+        while not stopped.wait(interval):
+            try:
+                write_snapshot(path)
+            except OSError as e:
+                print(f"\n[!] Не удалось записать метрики в {path}: {e}")
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+
+    def stop():
+        stopped.set()
+        thread.join()
+        write_snapshot(path)
+    return stop
+
+
+def rates_line(snap=None):
+    """Короткая строка для tqdm: скорость каждой стадии (в секунду) и число пропусков/ошибок."""
+    snap = snap or snapshot()
+    parts = [f"{stage} {e['per_s']:.2f}/s" for stage, e in snap['stages'].items()]
+    n_errors = sum(n for kinds in snap['errors'].values() for n in kinds.values())
+    parts.append(f"skip {sum(snap['skips'].values())} err {n_errors}")
+    return " | ".join(parts)
+
+
+def print_summary(snap=None):
+    """Итог: время по стадиям, доля сети против расчета, пропуски и ошибки."""
+    snap = snap or snapshot()
+    print(f"\nЗамеры по стадиям ({snap['stars_done']} звезд за {snap['elapsed_s']:.0f} с):")
+    for stage, e in snap['stages'].items():
+        print(f"  {stage:<12} {e['count']:>7} раз, {e['seconds']:>9.1f} с, "
+              f"в среднем {e['mean_s']:.3f} с, максимум {e['max_s']:.2f} с")
+    network = sum(e['seconds'] for s, e in snap['stages'].items() if s in NETWORK_STAGES)
+    compute = sum(e['seconds'] for s, e in snap['stages'].items() if s not in NETWORK_STAGES)
+    if network + compute > 0:
+        print(f"  Сеть {network:.0f} с / расчет и запись {compute:.0f} с "
+              f"({network / (network + compute):.0%} времени стадий — сеть)")
+    if snap['skips']:
+        print("  Пропуски: " + ", ".join(f"{r} {n}" for r, n in sorted(snap['skips'].items())))
+    if snap['errors']:
+        print("  Ошибки: " + ", ".join(f"{s}/{k} {n}" for s, kinds in snap['errors'].items()
+                                       for k, n in kinds.items()))
@@ -0,0 +1,120 @@
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
+
+# Кэш результатов find_period: повторный прогон main.py (например, после правки формул расстояний
+# или порогов Av) не пересчитывает Ломб-Скаргл. Ключ — отпечаток очищенной кривой блеска
+# плюс параметры поиска (границы периодов, передискретизация, режим, top_k, min_power).
+# Хранится лучший период, мощность, пики и (если STORE_SPECTRUM) сжатый спектр для графика.
+# Одна база SQLite на всех: CPU-процессы пишут в нее параллельно (WAL), соединение — свое в каждом процессе.
+CACHE_FILE = "period_cache.sqlite"
+STORE_SPECTRUM = True
+VERSION = 1                     # менять при изменении алгоритма periodogram — старые записи не подхватятся
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS periods (
+    key TEXT PRIMARY KEY,
+    best_period REAL,
+    best_power REAL,
+    peak_periods BLOB,
+    peak_powers BLOB,
+    frequency BLOB,
+    power BLOB,
+    stopped INTEGER,
+    n_points INTEGER,
+    params TEXT,
+    created_at TEXT
+)
+"""
+
+_conn = {'pid': None, 'path': None, 'db': None}
+
+
+def _db(path):
+    # После fork соединение родителя использовать нельзя — открываем свое
+    if _conn['db'] is None or _conn['pid'] != os.getpid() or _conn['path'] != path:
+        db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(_SCHEMA)
+        _conn.update(pid=os.getpid(), path=path, db=db)
+    return _conn['db']
+
+
+def fingerprint(time, flux):
+    """
+    Хэш очищенной кривой. Типы — как в lc_store (время float64, поток float32): кривая,
+    прочитанная из хранилища, дает тот же отпечаток, что и до записи туда.
+    """
+    h = hashlib.sha1()
+    h.update(np.asarray(time, dtype='<f8').tobytes())
+    h.update(np.asarray(flux, dtype='<f4').tobytes())
+    return h.hexdigest()
+
+
+def key(time, flux, **params):
+    """Ключ записи: отпечаток кривой + параметры поиска (любой параметр меняет ключ)."""
+    text = json.dumps({'lc': fingerprint(time, flux), 'version': VERSION, 'params': params},
+                      sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest(), text
+
+
+def _pack(values, dtype):
+    return zlib.compress(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+
+def _unpack(blob, dtype):
+    return np.frombuffer(zlib.decompress(blob), dtype=dtype)
+
+
+def load(cache_key, path=CACHE_FILE):
+    """
+    Словарь pg как у analysis.find_period (с пометкой cached=True) или None.
+    Без сохраненного спектра — без frequency/power.
+    """
+    row = _db(path).execute(
+        "SELECT peak_periods, peak_powers, frequency, power, stopped FROM periods WHERE key = ?",
+        (cache_key,)).fetchone()
+    if row is None:
+        return None
+    pg = {
+        'peak_periods': _unpack(row[0], np.float64),
+        'peak_powers': _unpack(row[1], np.float64),
+        'stopped': bool(row[4]),
+        'cached': True,
+    }
+    if row[2] is not None:
+        pg['frequency'] = _unpack(row[2], np.float32).astype(np.float64)
+        pg['power'] = _unpack(row[3], np.float32)
+        pg['period'] = 1.0 / pg['frequency']
+    return pg
+
+
+def save(cache_key, params, pg, n_points, path=CACHE_FILE, spectrum=STORE_SPECTRUM):
+    """Записывает результат find_period (pg) под ключом; params — текст из key() для справки."""
+    has_spectrum = spectrum and 'power' in pg
+    _db(path).execute(
+        "INSERT OR REPLACE INTO periods VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (cache_key, float(pg['peak_periods'][0]), float(pg['peak_powers'][0]),
+         _pack(pg['peak_periods'], np.float64), _pack(pg['peak_powers'], np.float64),
+         _pack(pg['frequency'], np.float32) if has_spectrum else None,
+         _pack(pg['power'], np.float32) if has_spectrum else None,
+         int(bool(pg.get('stopped', False))), int(n_points), params,
+         datetime.now(timezone.utc).isoformat(timespec='seconds')))
+
+
+def stats(path=CACHE_FILE):
+    """Число записей и размер базы (для печати в конце прогона)."""
+    if not os.path.exists(path):
+        return {'entries': 0, 'mb': 0.0}
+    entries = _db(path).execute("SELECT COUNT(*) FROM periods").fetchone()[0]
+    size = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    return {'entries': entries, 'mb': size / 1e6}
+
+
+def clear(path=CACHE_FILE):
+    _db(path).execute("DELETE FROM periods")
@@ -0,0 +1,356 @@
+import os
+from math import factorial
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Пакетный Ломб-Скаргл без объектов lightkurve.Periodogram.
+# Сетка частот и нормировка "amplitude" повторяют lc.to_periodogram(method='lombscargle'),
+# тригонометрические суммы считаются по схеме Press & Rybicki (экстирполяция + FFT),
+# причем FFT делается сразу для пачки звезд одной матрицей.
+
+OVERSAMPLE_FACTOR = 5      # как у lightkurve при normalization='amplitude'
+FFT_OVERSAMPLING = 8       # запас сетки FFT относительно числа частот
+MFFT = 4                   # число соседних узлов при экстирполяции
+MAX_BATCH_CELLS = 2 ** 22  # ограничение на размер матрицы FFT (строк * Nfft)
+
+# Двухэтапный поиск: грубая сетка с шагом ~1/baseline, затем уточнение вокруг лучших пиков
+COARSE_OVERSAMPLE = 1.0
+REFINE_PEAKS = 3
+
+# Допуски check_accuracy (макс. относительное расхождение с lightkurve по всем звездам)
+CHECK_PERIOD_TOL = 1e-3
+CHECK_POWER_TOL = 1e-2
+
+
+def _bitceil(n):
+    return 1 << int(n - 1).bit_length()
+
+
+def frequency_grid(time, minimum_period=0.1, maximum_period=50, oversample_factor=OVERSAMPLE_FACTOR):
+    """Сетка (f0, df, n) в 1/сутки — та же, что строит lightkurve для minimum/maximum_period."""
+    baseline = float(time[-1] - time[0])
+    df = 1.0 / baseline / oversample_factor
+    f0 = 1.0 / maximum_period
+    n = len(np.arange(f0, 1.0 / minimum_period, df))
+    return f0, df, n
+
+
+def _as_arrays(time, flux):
+    time = np.asarray(time, dtype=np.float64)
+    flux = np.asarray(flux, dtype=np.float64)
+    good = np.isfinite(time) & np.isfinite(flux)
+    return time[good], flux[good]
+
+
+def _extirpolate(x, y, rows, n_rows, n, m=MFFT):
+    """Раскладывает значения y в точках x на целочисленную сетку range(n) для каждой строки rows."""
+    result = np.zeros(n_rows * n, dtype=y.dtype)
+    base = rows * n
+
+    def add(ind, vals):
+        if np.iscomplexobj(vals):
+            result.real += np.bincount(ind, vals.real, minlength=n_rows * n)
+            result.imag += np.bincount(ind, vals.imag, minlength=n_rows * n)
+        else:
+            result[:] += np.bincount(ind, vals, minlength=n_rows * n)
+
+    integers = x % 1 == 0
+    if integers.any():
+        add(base[integers] + x[integers].astype(np.int64), y[integers])
+        x, y, base = x[~integers], y[~integers], base[~integers]
+
+    ilo = np.clip((x - m // 2).astype(np.int64), 0, n - m)
+    numerator = y * np.prod(x - ilo - np.arange(m)[:, np.newaxis], 0)
+    denominator = factorial(m - 1)
+    for j in range(m):
+        if j > 0:
+            denominator *= j / (j - m)
+        ind = ilo + (m - 1 - j)
+        add(base + ind, numerator / (denominator * (x - ind)))
+    return result.reshape(n_rows, n)
+
+
+def _trig_sums(t, h, rows, t0, f0, df, n_freq, nfft, freq_factor=1):
+    """Суммы S = sum h*sin(2pi f t), C = sum h*cos(2pi f t) для всех строк пачки сразу."""
+    df = df * freq_factor
+    f0 = f0 * freq_factor
+    t_rel = t - t0[rows]
+    h = h * np.exp(2j * np.pi * f0[rows] * t_rel)
+    tnorm = (t_rel * nfft * df[rows]) % nfft
+    grid = _extirpolate(tnorm, h, rows, len(t0), nfft)
+    fftgrid = np.fft.ifft(grid, axis=1, norm="forward")[:, :n_freq]
+    f = f0[:, np.newaxis] + df[:, np.newaxis] * np.arange(n_freq)
+    fftgrid *= np.exp(2j * np.pi * t0[:, np.newaxis] * f)
+    return fftgrid.imag, fftgrid.real
+
+
+def _amplitude_batch(series, grids):
+    """Амплитудный спектр Ломба-Скаргла (плавающее среднее, без весов) для пачки звезд."""
+    n_rows = len(series)
+    n_freq = max(g[2] for g in grids)
+    nfft = _bitceil(int(n_freq * FFT_OVERSAMPLING))
+
+    rows = np.concatenate([np.full(len(t), i, dtype=np.int64) for i, (t, _) in enumerate(series)])
+    t = np.concatenate([s[0] for s in series])
+    counts = np.array([len(s[0]) for s in series], dtype=np.float64)
+    t0 = np.array([s[0].min() for s in series])
+    f0 = np.array([g[0] for g in grids])
+    df = np.array([g[1] for g in grids])
+
+    # Веса 1/N и центрирование каждой кривой
+    w = 1.0 / counts[rows]
+    y = np.concatenate([s[1] - s[1].mean() for s in series])
+
+    sh, ch = _trig_sums(t, w * y, rows, t0, f0, df, n_freq, nfft)
+    s2, c2 = _trig_sums(t, w, rows, t0, f0, df, n_freq, nfft, freq_factor=2)
+    s, c = _trig_sums(t, w, rows, t0, f0, df, n_freq, nfft)
+
+    tan_2wt = (s2 - 2 * s * c) / (c2 - (c * c - s * s))
+    s2w = tan_2wt / np.sqrt(1 + tan_2wt * tan_2wt)
+    c2w = 1 / np.sqrt(1 + tan_2wt * tan_2wt)
+    cw = np.sqrt(0.5) * np.sqrt(1 + c2w)
+    sw = np.sqrt(0.5) * np.sign(s2w) * np.sqrt(1 - c2w)
+
+    yc = ch * cw + sh * sw
+    ys = sh * cw - ch * sw
+    cc = 0.5 * (1 + c2 * c2w + s2 * s2w) - (c * cw + s * sw) ** 2
+    ss = 0.5 * (1 - c2 * c2w - s2 * s2w) - (s * cw - c * sw) ** 2
+
+    # PSD-нормировка astropy (0.5 * N * p), затем amplitude = sqrt(psd * 4 / N) как в lightkurve
+    power = yc * yc / cc + ys * ys / ss
+    return np.sqrt(np.clip(2.0 * power, 0, None))
+
+
+def top_peaks(power, k):
+    """Индексы k самых высоких локальных максимумов спектра (по убыванию)."""
+    inner = np.flatnonzero((power[1:-1] > power[:-2]) & (power[1:-1] >= power[2:])) + 1
+    # Глобальный максимум может лежать на краю сетки — lightkurve его тоже возьмет
+    best = int(np.argmax(power))
+    if best not in inner:
+        inner = np.append(inner, best)
+    if len(inner) > k:
+        inner = inner[np.argpartition(power[inner], -k)[-k:]]
+    return inner[np.argsort(power[inner])[::-1]]
+
+
+def lombscargle(time, flux, minimum_period=0.1, maximum_period=50, oversample_factor=OVERSAMPLE_FACTOR):
+    """Спектр одной звезды: (frequency, amplitude) на сетке lightkurve."""
+    time, flux = _as_arrays(time, flux)
+    grid = frequency_grid(time, minimum_period, maximum_period, oversample_factor)
+    power = _amplitude_batch([(time, flux)], [grid])[0, :grid[2]]
+    frequency = grid[0] + grid[1] * np.arange(grid[2])
+    return frequency, power
+
+
+def _amplitude_windows(time, flux, f_start, df, n_steps):
+    """
+    Точный спектр прямыми суммами в нескольких окнах с общим шагом df.
+    Вместо cos/sin на каждой частоте поворачиваем exp(2pi i f t) на exp(2pi i df t) —
+    одно комплексное умножение на точку. Возвращает матрицу (окна, n_steps).
+    """
+    w = 1.0 / len(time)
+    t = time - time.min()
+    y = flux - flux.mean()
+    z = np.exp(2j * np.pi * np.outer(t, f_start))
+    step = np.exp(2j * np.pi * df * t)[:, np.newaxis]
+    power = np.empty((len(f_start), n_steps))
+    for k in range(n_steps):
+        z2 = z * z
+        c, s = w * z.real.sum(0), w * z.imag.sum(0)
+        yc, ys = w * (y @ z.real), w * (y @ z.imag)
+        # cos^2 = (1 + cos2x) / 2, sin^2 = (1 - cos2x) / 2, cos*sin = sin2x / 2
+        c2, s2 = w * z2.real.sum(0), w * z2.imag.sum(0)
+        cc = 0.5 * (1 + c2) - c * c
+        ss = 0.5 * (1 - c2) - s * s
+        cs = 0.5 * s2 - c * s
+        # То же, что YC^2/CC + YS^2/SS после поворота на tau
+        power[:, k] = (ss * yc * yc + cc * ys * ys - 2 * cs * yc * ys) / (cc * ss - cs * cs)
+        z = z * step
+    return np.sqrt(np.clip(2.0 * power, 0, None))
+
+
+def _refine(time, flux, coarse_freq, coarse_power, fine_grid, coarse_df, n_refine, top_k, min_power):
+    """
+    Уточнение грубого спектра: пересчет на полной сетке lightkurve в окне +-coarse_df/2
+    вокруг n_refine лучших пиков. Если грубый максимум заведомо ниже min_power, уточнение
+    пропускается (возвращаем грубые пики и stopped=True).
+    """
+    peaks = top_peaks(coarse_power, max(n_refine, top_k))
+    # Худший случай недобора амплитуды на грубой сетке: пик между узлами (sinc(0.5 / oversample))
+    attenuation = np.sinc(0.5 * coarse_df * (time[-1] - time[0]))
+    if min_power is not None and coarse_power[peaks[0]] < min_power * attenuation:
+        return coarse_freq[peaks[:top_k]], coarse_power[peaks[:top_k]], (coarse_freq, coarse_power), True
+
+    # Окна на узлах полной сетки, чтобы результат совпадал с полным перебором
+    f0, df, n = fine_grid
+    half = int(np.ceil(0.5 * coarse_df / df)) + 1
+    centers = np.rint((coarse_freq[peaks[:n_refine]] - f0) / df).astype(np.int64)
+    lo = np.clip(centers - half, 0, max(0, n - 2 * half - 1))
+    n_steps = min(n, 2 * half + 1)
+    fine_power = _amplitude_windows(time, flux, f0 + df * lo, df, n_steps)
+    fine_freq = f0 + df * (lo[:, np.newaxis] + np.arange(n_steps))
+
+    best = np.argmax(fine_power, axis=1)
+    freqs = fine_freq[np.arange(len(lo)), best]
+    powers = fine_power[np.arange(len(lo)), best]
+    freqs, unique = np.unique(freqs, return_index=True)
+    powers = powers[unique]
+    order = np.argsort(powers)[::-1][:top_k]
+
+    # Для графика: грубый спектр с вставленными уточненными точками
+    freq = np.concatenate([coarse_freq, fine_freq.ravel()])
+    power = np.concatenate([coarse_power, fine_power.ravel()])
+    sort = np.argsort(freq)
+    return freqs[order], powers[order], (freq[sort], power[sort]), False
+
+
+def adaptive_search(time, flux, minimum_period=0.1, maximum_period=50, oversample_factor=OVERSAMPLE_FACTOR,
+                    coarse_oversample=COARSE_OVERSAMPLE, n_refine=REFINE_PEAKS, top_k=3, min_power=None):
+    """
+    Двухэтапный поиск периода для одной звезды.
+
+    Возвращает словарь: peak_periods / peak_powers (по убыванию мощности),
+    frequency / power (спектр для графика) и stopped (True, если сработал ранний выход
+    по min_power и уточнение не делалось).
+    """
+    time, flux = _as_arrays(time, flux)
+    coarse = frequency_grid(time, minimum_period, maximum_period, coarse_oversample)
+    fine = frequency_grid(time, minimum_period, maximum_period, oversample_factor)
+    coarse_power = _amplitude_batch([(time, flux)], [coarse])[0, :coarse[2]]
+    coarse_freq = coarse[0] + coarse[1] * np.arange(coarse[2])
+    freqs, powers, spectrum, stopped = _refine(time, flux, coarse_freq, coarse_power, fine, coarse[1],
+                                               n_refine, top_k, min_power)
+    return {
+        'peak_periods': 1.0 / freqs,
+        'peak_powers': powers,
+        'frequency': spectrum[0],
+        'power': spectrum[1],
+        'stopped': stopped,
+    }
+
+
+def _empty_result(n, top_k):
+    return {
+        'period': np.full(n, np.nan),
+        'power': np.full(n, np.nan),
+        'peak_periods': np.full((n, top_k), np.nan),
+        'peak_powers': np.full((n, top_k), np.nan),
+    }
+
+
+def _batch_chunk(series, minimum_period, maximum_period, oversample_factor, shared_grid, top_k,
+                 adaptive=False, min_power=None):
+    result = _empty_result(len(series), top_k)
+    clean = [_as_arrays(t, f) for t, f in series]
+    # В адаптивном режиме пачкой считается только грубая сетка
+    grid_oversample = COARSE_OVERSAMPLE if adaptive else oversample_factor
+
+    if shared_grid:
+        # Общая сетка по самому длинному ряду (самая мелкая df подходит всем)
+        longest = max(clean, key=lambda s: s[0][-1] - s[0][0] if len(s[0]) > 1 else 0)
+        common = frequency_grid(longest[0], minimum_period, maximum_period, grid_oversample)
+
+    jobs = []
+    for i, (t, f) in enumerate(clean):
+        if len(t) < 3 or t[-1] <= t[0]:
+            continue
+        grid = common if shared_grid else frequency_grid(t, minimum_period, maximum_period, grid_oversample)
+        if grid[2] < 1:
+            continue
+        jobs.append((i, grid))
+
+    # Группируем звезды с одинаковым размером FFT — их можно считать одной матрицей
+    by_nfft = {}
+    for i, grid in jobs:
+        by_nfft.setdefault(_bitceil(int(grid[2] * FFT_OVERSAMPLING)), []).append((i, grid))
+
+    for nfft, group in by_nfft.items():
+        rows_per_batch = max(1, MAX_BATCH_CELLS // nfft)
+        for start in range(0, len(group), rows_per_batch):
+            part = group[start:start + rows_per_batch]
+            spectra = _amplitude_batch([clean[i] for i, _ in part], [g for _, g in part])
+            for row, (i, (f0, df, n)) in enumerate(part):
+                power = spectra[row, :n]
+                if adaptive:
+                    t, f = clean[i]
+                    fine = frequency_grid(t, minimum_period, maximum_period, oversample_factor)
+                    freqs, powers, _, _ = _refine(t, f, f0 + df * np.arange(n), power, fine, df,
+                                                  REFINE_PEAKS, top_k, min_power)
+                else:
+                    peaks = top_peaks(power, top_k)
+                    freqs, powers = f0 + df * peaks, power[peaks]
+                result['period'][i] = 1.0 / freqs[0]
+                result['power'][i] = powers[0]
+                result['peak_periods'][i, :len(freqs)] = 1.0 / freqs
+                result['peak_powers'][i, :len(freqs)] = powers
+    return result
+
+
+def batch_periodogram(series, minimum_period=0.1, maximum_period=50, oversample_factor=OVERSAMPLE_FACTOR,
+                      shared_grid=False, top_k=3, n_jobs=None, chunk_size=64, adaptive=False, min_power=None):
+    """
+    Периоды сразу для многих кривых блеска.
+
+    series — список пар (time, flux) в сутках. Возвращает словарь массивов:
+    period, power (лучший пик) и peak_periods / peak_powers формы (n, top_k).
+    Звезды режутся на куски по chunk_size и считаются на всех ядрах.
+    adaptive=True включает двухэтапный поиск (см. adaptive_search).
+    """
+    series = list(series)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    args = (minimum_period, maximum_period, oversample_factor, shared_grid, top_k, adaptive, min_power)
+    chunks = [series[i:i + chunk_size] for i in range(0, len(series), chunk_size)]
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        parts = [_batch_chunk(chunk, *args) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            parts = list(executor.map(_batch_chunk, chunks, *[[a] * len(chunks) for a in args]))
+
+    if not parts:
+        return _empty_result(0, top_k)
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+
+def _synthetic_curve(rng, period, amplitude, n_points, baseline, noise=0.01):
+    time = 1000 + np.sort(rng.uniform(0, baseline, n_points))
+    flux = 1 + amplitude * np.sin(2 * np.pi * time / period + rng.uniform(0, 2 * np.pi))
+    return time, flux + rng.normal(0, noise, n_points)
+
+
+def check_accuracy(n_stars=20, seed=42):
+    """
+    Сверка с текущим lc.to_periodogram(method='lombscargle', 0.1-50 d) на синтетических кривых.
+    Возвращает True, если период и мощность лучшего пика у обоих режимов в пределах
+    CHECK_PERIOD_TOL / CHECK_POWER_TOL.
+    """
+    import lightkurve as lk
+
+    rng = np.random.default_rng(seed)
+    series = []
+    for _ in range(n_stars):
+        period = 10 ** rng.uniform(-0.9, 1.5)
+        baseline = rng.choice([27.0, 80.0, 350.0])
+        series.append(_synthetic_curve(rng, period, rng.uniform(0.02, 0.3), int(baseline * 48), baseline))
+
+    batch = batch_periodogram(series)
+    fast = batch_periodogram(series, adaptive=True)
+
+    ok = True
+    for name, res in (('пакет', batch), ('грубо->точно', fast)):
+        worst_period, worst_power = 0.0, 0.0
+        for i, (t, f) in enumerate(series):
+            pg = lk.LightCurve(time=t, flux=f).to_periodogram(method='lombscargle', minimum_period=0.1, maximum_period=50)
+            ref_period, ref_power = pg.period_at_max_power.value, pg.max_power.value
+            worst_period = max(worst_period, abs(res['period'][i] - ref_period) / ref_period)
+            worst_power = max(worst_power, abs(res['power'][i] - ref_power) / ref_power)
+        passed = worst_period <= CHECK_PERIOD_TOL and worst_power <= CHECK_POWER_TOL
+        ok = ok and passed
+        print(f"[{name}] Звезд: {n_stars}. Макс. отн. ошибка периода: {worst_period:.2e}, мощности: {worst_power:.2e}"
+              f" — {'OK' if passed else 'ПРЕВЫШЕН ДОПУСК'}")
+    return ok
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(0 if check_accuracy() else 1)
@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Маркер конца потока задач между стадиями
+_DONE = object()
+
+# CPU-процессы запускаются не через fork: пул создает их лениво, когда в главном процессе уже
+# работают потоки (скачивание, снимки метрик, пулы SIMBAD/MAST), и форк мог унести чужую
+# захваченную блокировку. forkserver порождает воркеров из чистого процесса без потоков
+# (на Windows его нет — там spawn). Глобальное состояние главного процесса воркеры не видят:
+# нужные им настройки передаются через initializer/initargs.
+MP_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _report_error(on_error, task, stage, exc):
+    if on_error is not None:
+        on_error(task, stage, exc)
+
+
+def run_serial(tasks, fetch, compute, write, on_done=None, on_error=None):
+    """
+    Последовательный режим: те же стадии (загрузка -> расчет -> запись),
+    но по одной звезде за раз. Удобно для отладки и для сравнения скорости.
+    """
+    for task in tasks:
+        result = None
+        stage = "fetch"
+        try:
+            payload = fetch(task)
+            if payload is not None:
+                stage = "compute"
+                result = compute(task, payload)
+                if result is not None:
+                    stage = "write"
+                    write(result)
+        except Exception as e:
+            _report_error(on_error, task, stage, e)
+            result = None
+
+        if on_done is not None:
+            on_done(task, result)
+
+
+def run_pipeline(tasks, fetch, compute, write, n_fetch=8, n_compute=None, queue_size=32,
+                 use_processes=True, on_done=None, on_error=None, initializer=None, initargs=()):
+    """
+    Конвейерный режим: N потоков скачивания -> пул CPU-воркеров -> один писатель.
+
+    fetch(task)            -> payload или None (сеть, выполняется в потоках)
+    compute(task, payload) -> result или None  (CPU, выполняется в процессах)
+    write(result)          -> запись результата (только в главном потоке)
+
+    Очереди между стадиями ограничены queue_size, поэтому быстрая стадия
+    не может убежать вперед и съесть всю память. Для use_processes=True
+    функция compute должна быть объявлена на уровне модуля (pickle), а
+    initializer(*initargs) выполняется в каждом CPU-процессе до первой задачи.
+    """
+    n_compute = n_compute or os.cpu_count() or 1
+    n_fetch = max(1, n_fetch)
+
+    task_q = queue.Queue(maxsize=queue_size)
+    compute_q = queue.Queue(maxsize=queue_size)
+    write_q = queue.Queue(maxsize=queue_size)
+
+    # 1. Подача задач
+    def feeder():
+        for task in tasks:
+            task_q.put(task)
+        for _ in range(n_fetch):
+            task_q.put(_DONE)
+
+    # 2. Скачивание (I/O)
+    def fetcher():
+        while True:
+            task = task_q.get()
+            if task is _DONE:
+                return
+            try:
+                payload = fetch(task)
+            except Exception as e:
+                _report_error(on_error, task, "fetch", e)
+                payload = None
+
+            if payload is None:
+                write_q.put((task, None))
+            else:
+                compute_q.put((task, payload))
+
+    # 3. Раздача CPU-задач в пул (не больше 2 задач на воркер одновременно)
+    in_flight = threading.BoundedSemaphore(n_compute * 2)
+    pending = [0]
+    pending_cv = threading.Condition()
+
+    def dispatcher(executor):
+        while True:
+            item = compute_q.get()
+            if item is _DONE:
+                break
+            task, payload = item
+            in_flight.acquire()
+            with pending_cv:
+                pending[0] += 1
+            try:
+                future = executor.submit(compute, task, payload)
+            except Exception as e:
+                _report_error(on_error, task, "compute", e)
+                _finish(task, None)
+                continue
+            future.add_done_callback(lambda f, t=task: _collect(t, f))
+
+        # Ждем, пока все отправленные задачи вернутся, и только потом закрываем запись
+        with pending_cv:
+            while pending[0] > 0:
+                pending_cv.wait()
+        write_q.put(_DONE)
+
+    def _collect(task, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            _report_error(on_error, task, "compute", e)
+            result = None
+        _finish(task, result)
+
+    def _finish(task, result):
+        in_flight.release()
+        write_q.put((task, result))
+        with pending_cv:
+            pending[0] -= 1
+            pending_cv.notify_all()
+
+    if use_processes:
+        pool = ProcessPoolExecutor(max_workers=n_compute, mp_context=multiprocessing.get_context(MP_START_METHOD),
+                                   initializer=initializer, initargs=initargs)
+    else:
+        pool = ThreadPoolExecutor(max_workers=n_compute)
+    with pool as executor:
+        threads = [threading.Thread(target=feeder, daemon=True)]
+        threads += [threading.Thread(target=fetcher, daemon=True) for _ in range(n_fetch)]
+        for t in threads:
+            t.start()
+
+        disp = threading.Thread(target=dispatcher, args=(executor,), daemon=True)
+        disp.start()
+
+        def closer():
+            for t in threads:
+                t.join()
+            compute_q.put(_DONE)
+
+        threading.Thread(target=closer, daemon=True).start()
+
+        # 4. Единственный писатель — главный поток
+        while True:
+            item = write_q.get()
+            if item is _DONE:
+                break
+            task, result = item
+            if result is not None:
+                try:
+                    write(result)
+                except Exception as e:
+                    _report_error(on_error, task, "write", e)
+                    result = None
+            if on_done is not None:
+                on_done(task, result)
+
+        disp.join()
@@ -1,10 +1,15 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import startable
 
 
 def plot_map():
-    df = pd.read_csv("universal_map_large.csv")
+    df = startable.read("universal_map_large.csv", columns=['Gaia_Dist', 'Calc_Dist', 'Dust_Av'])
     df = df[df['Gaia_Dist'] > 0]
 
     plt.figure(figsize=(10, 7))
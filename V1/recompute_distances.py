@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import sys
+import pandas as pd
+
+from astrophysics import (variable_star_distance_array, gaia_distance_array,
+                          extinction_status_array, METHOD_NAMES, METHOD_NONE)
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import startable
+
+# Пересчет расстояний и статусов по уже готовой таблице периодов — без MAST и без периодограмм.
+# Удобно, когда поменялись формулы в astrophysics.py или пороги Av.
+CANDIDATES_FILE = "candidates_list.csv"
+PERIODS_FILE = "universal_map_large.csv"
+OUTPUT_FILE = "universal_map_recomputed.csv"
+
+
+def _find_col(df, possible_names):
+    for name in possible_names:
+        for col in df.columns:
+            if col.lower() == name.lower():
+                return col
+    return None
+
+
+def recompute_distances(candidates_file=CANDIDATES_FILE, periods_file=PERIODS_FILE, output_file=OUTPUT_FILE):
+    for path in (candidates_file, periods_file):
+        if not startable.exists(path):
+            print(f"Файл {path} не найден!")
+            return None
+
+    periods = startable.read(periods_file, columns=['Star', 'RA', 'Dec', 'Period'])
+    candidates = startable.read(candidates_file)
+
+    # Фотометрия и параллакс берутся из списка кандидатов (как в main.py)
+    star_col = _find_col(candidates, ['name', 'Star', 'main_id', 'star'])
+    cols = {
+        'v_mag': _find_col(candidates, ['v_mag', 'V']),
+        'i_mag': _find_col(candidates, ['i_mag', 'I']),
+        'j_mag': _find_col(candidates, ['j_mag', 'J']),
+        'k_mag': _find_col(candidates, ['k_mag', 'K']),
+        'parallax_mas': _find_col(candidates, ['parallax', 'parallax_mas', 'plx_value'])
+    }
+    meta = pd.DataFrame({'Star': candidates[star_col].astype(str)})
+    for key, col in cols.items():
+        meta[key] = pd.to_numeric(candidates[col], errors='coerce') if col else np.nan
+    meta = meta.drop_duplicates(subset=['Star'])
+
+    df = periods[['Star', 'RA', 'Dec', 'Period']].copy()
+    df['Period'] = pd.to_numeric(df['Period'], errors='coerce')
+    df['Star'] = df['Star'].astype(str)
+    df = df.merge(meta, on='Star', how='left')
+
+    # Весь расчет — несколько векторных выражений по колонкам
+    dist, method = variable_star_distance_array(df['Period'], df['v_mag'], df['i_mag'], df['j_mag'], df['k_mag'])
+    d_gaia = gaia_distance_array(df['parallax_mas'])
+    av, status = extinction_status_array(dist, d_gaia)
+
+    keep = method != METHOD_NONE
+    out = pd.DataFrame({
+        'Star': df['Star'],
+        'RA': df['RA'],
+        'Dec': df['Dec'],
+        'Period': df['Period'].round(4),
+        'Type': METHOD_NAMES[method],
+        'Gaia_Dist': np.round(d_gaia),
+        'Calc_Dist': np.round(dist),
+        'Dust_Av': np.round(av, 2),
+        'Status': status,
+    })[keep]
+
+    startable.write(out, output_file)
+    print(f"Пересчитано {len(out)} звезд из {len(periods)}. Результат: {output_file}")
+    print(out['Status'].value_counts().to_string())
+    return out
+
+
+if __name__ == "__main__":
+    recompute_distances()
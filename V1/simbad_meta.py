@@ -0,0 +1,172 @@
+import os
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from astropy.table import Table
+
+# Метаданные звезд (V, I, J, K и параллакс) из SIMBAD одним пакетом вместо запроса на звезду.
+# Список кандидатов уходит в TAP как загруженная таблица (TAP_UPLOAD.stars) кусками по CHUNK_SIZE.
+# Сначала ищем по идентификатору, ненайденные — по ближайшему объекту в радиусе MATCH_RADIUS_ARCSEC.
+# Ответы (и "не найдено" тоже) кэшируются по имени звезды в CACHE_FILE; "не найдено" старше
+# NOT_FOUND_TTL_DAYS запрашивается снова — SIMBAD пополняется идентификаторами и объектами.
+SIMBAD_TAP_URL = "http://simbad.u-strasbg.fr/simbad/sim-tap"
+CACHE_FILE = "simbad_meta_cache.parquet"
+CHUNK_SIZE = 5000
+MAX_PARALLEL_JOBS = 2
+MATCH_RADIUS_ARCSEC = 5.0
+RETRIES = 2
+RETRY_DELAY = 5.0
+NOT_FOUND_TTL_DAYS = 30
+
+META_COLUMNS = ['v_mag', 'i_mag', 'j_mag', 'k_mag', 'parallax_mas']
+CACHE_COLUMNS = ['name', 'main_id', 'match'] + META_COLUMNS + ['fetched_at']
+
+_SELECT = """
+    SELECT u.name, b.main_id, b.plx_value AS parallax_mas,
+           f.V AS v_mag, f.I AS i_mag, f.J AS j_mag, f.K AS k_mag{extra}
+    FROM TAP_UPLOAD.stars AS u
+    {join}
+    LEFT JOIN allfluxes AS f ON f.oidref = b.oid
+"""
+
+QUERY_BY_ID = _SELECT.format(extra="", join="""JOIN ident AS i ON i.id = u.name
+    JOIN basic AS b ON b.oid = i.oidref""")
+
+QUERY_BY_POSITION = _SELECT.format(
+    extra=",\n           DISTANCE(POINT('ICRS', b.ra, b.dec), POINT('ICRS', u.ra, u.dec)) AS dist",
+    join="""JOIN basic AS b
+        ON 1 = CONTAINS(POINT('ICRS', b.ra, b.dec), CIRCLE('ICRS', u.ra, u.dec, {radius_deg}))""")
+
+
+def _default_service():
+    import pyvo as vo
+    return vo.dal.TAPService(SIMBAD_TAP_URL)
+
+
+def _decode(x):
+    return x.decode('utf-8') if isinstance(x, bytes) else x
+
+
+def _run(service, query, upload, retries, retry_delay):
+    for attempt in range(retries + 1):
+        try:
+            df = service.run_sync(query, uploads={'stars': upload}).to_table().to_pandas()
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(retry_delay * (attempt + 1))
+    for col in ('name', 'main_id'):
+        if col in df.columns:
+            df[col] = df[col].map(_decode)
+    return df
+
+
+def _resolve_chunk(service, chunk, radius_arcsec, retries, retry_delay):
+    """Один кусок кандидатов: запрос по именам, затем по координатам для оставшихся."""
+    upload = Table.from_pandas(chunk[['name', 'ra', 'dec']].reset_index(drop=True))
+    by_id = _run(service, QUERY_BY_ID, upload, retries, retry_delay)
+    by_id = by_id.drop_duplicates('name').assign(match='id')
+
+    rest = chunk[~chunk['name'].isin(by_id['name'])]
+    by_pos = pd.DataFrame(columns=['name'])
+    if len(rest):
+        query = QUERY_BY_POSITION.format(radius_deg=radius_arcsec / 3600.0)
+        upload = Table.from_pandas(rest[['name', 'ra', 'dec']].reset_index(drop=True))
+        by_pos = _run(service, query, upload, retries, retry_delay)
+        # Несколько объектов в круге — берем ближайший
+        by_pos = by_pos.sort_values('dist').drop_duplicates('name').drop(columns='dist').assign(match='position')
+
+    found = pd.concat([by_id, by_pos], ignore_index=True)
+    missing = chunk.loc[~chunk['name'].isin(found['name']), ['name']].assign(match='none')
+    return pd.concat([found, missing], ignore_index=True)
+
+
+def load_cache(path=CACHE_FILE):
+    """Кэш метаданных (DataFrame с индексом по имени звезды); пустой, если файла нет."""
+    if path and os.path.exists(path):
+        return pd.read_parquet(path).set_index('name')
+    return pd.DataFrame(columns=CACHE_COLUMNS).set_index('name')
+
+
+def save_cache(cache, path=CACHE_FILE):
+    tmp = path + ".tmp"
+    cache.reset_index().to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _expired(cache, ttl_days):
+    """Имена звезд с ответом "не найдено" старше ttl_days (или без даты)."""
+    not_found = cache[cache['match'] == 'none']
+    fetched_at = pd.to_datetime(not_found['fetched_at'], utc=True, errors='coerce')
+    stale = fetched_at.isna() | (fetched_at < pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=ttl_days))
+    return not_found.index[stale.to_numpy()]
+
+
+def _as_frame(stars):
+    # DataFrame с колонками name/ra/dec или список словарей (как задания в mainforserver/test.py)
+    df = pd.DataFrame(stars) if not isinstance(stars, pd.DataFrame) else stars
+    if 'name' not in df.columns and 'star' in df.columns:
+        df = df.rename(columns={'star': 'name'})
+    df = df[['name', 'ra', 'dec']].copy()
+    df['name'] = df['name'].map(_decode).astype(str)
+    df['ra'] = df['ra'].astype(np.float64)
+    df['dec'] = df['dec'].astype(np.float64)
+    return df.drop_duplicates('name')
+
+
+def _to_meta(row):
+    if row['match'] == 'none':
+        return None
+    return {col: float(row[col]) if pd.notna(row[col]) else np.nan for col in META_COLUMNS}
+
+
+def resolve(stars, service=None, cache_file=CACHE_FILE, chunk_size=CHUNK_SIZE, max_workers=MAX_PARALLEL_JOBS,
+            radius_arcsec=MATCH_RADIUS_ARCSEC, refresh=False, retries=RETRIES, retry_delay=RETRY_DELAY,
+            not_found_ttl_days=NOT_FOUND_TTL_DAYS):
+    """
+    Метаданные для всех звезд сразу: {имя: {'v_mag', 'i_mag', 'j_mag', 'k_mag', 'parallax_mas'}}
+    (отсутствующие величины — NaN), для ненайденных в SIMBAD — None.
+
+    stars — DataFrame или список словарей с name (или star), ra, dec.
+    В SIMBAD уходят только звезды, которых нет в кэше или которые не были найдены раньше
+    not_found_ttl_days дней назад (refresh=True — все).
+    service — TAP-сервис с run_sync(query, uploads=...) (по умолчанию pyvo к SIMBAD).
+    """
+    stars = _as_frame(stars)
+    cache = load_cache(cache_file)
+    if refresh:
+        todo = stars
+    else:
+        expired = _expired(cache, not_found_ttl_days)
+        todo = stars[~stars['name'].isin(cache.index) | stars['name'].isin(expired)]
+        n_expired = int(stars['name'].isin(expired).sum())
+        if n_expired:
+            print(f"SIMBAD: {n_expired} звезд с устаревшим ответом \"не найдено\" — запрашиваем снова")
+
+    if len(todo):
+        service = service or _default_service()
+        chunks = [todo.iloc[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        print(f"SIMBAD: {len(todo)} звезд не в кэше или устарели, загрузка {len(chunks)} кусками...")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+            parts = list(executor.map(
+                lambda c: _resolve_chunk(service, c, radius_arcsec, retries, retry_delay), chunks))
+
+        fresh = pd.concat(parts, ignore_index=True)
+        fresh['fetched_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        fresh = fresh.reindex(columns=CACHE_COLUMNS)
+        fresh[META_COLUMNS] = fresh[META_COLUMNS].astype(np.float64)
+        fresh = fresh.set_index('name')
+        # Пустой кэш в concat не передаем: у него колонки object, pandas предупреждает о смене типов
+        kept = cache[~cache.index.isin(fresh.index)]
+        cache = pd.concat([kept, fresh]) if len(kept) else fresh
+        if cache_file:
+            save_cache(cache, cache_file)
+        counts = fresh['match'].value_counts()
+        print(f"SIMBAD: по имени {counts.get('id', 0)}, по координатам {counts.get('position', 0)}, "
+              f"не найдено {counts.get('none', 0)}")
+
+    rows = cache.loc[cache.index.isin(stars['name'])]
+    return {name: _to_meta(row) for name, row in rows.iterrows()}
@@ -4,6 +4,8 @@ import warnings
 import data_fetcher
 import analysis
 import astrophysics
+import lc_cache
+import simbad_meta
 
 # Отключаем лишние предупреждения для чистоты вывода
 warnings.filterwarnings("ignore")
@@ -20,6 +22,9 @@ test_candidates = [
 def run_local_test():
     print("=== ЗАПУСК ЛОКАЛЬНОГО ТЕСТА (PC) ===")
 
+    # Шаг 0: Метаданные из Simbad для всех объектов одним запросом
+    metadata = simbad_meta.resolve(test_candidates)
+
     for star_data in test_candidates:
         star_name = star_data['name']
         ra = star_data['ra']
@@ -30,7 +35,7 @@ def run_local_test():
         print(f"    RA: {ra}, Dec: {dec}, SpType: {sp_type}")
 
         # Шаг 1: Метаданные из Simbad
-        meta = data_fetcher.get_star_metadata(star_name, ra, dec)
+        meta = metadata.get(star_name)
         if not meta:
             print("    [!] ОШИБКА: Simbad не вернул данные. Проверьте интернет.")
             continue
@@ -89,6 +94,7 @@ def run_local_test():
         else:
             print(f"    [!] РЕЗУЛЬТАТ: Расстояние не рассчитано (Method: {method_name})")
 
+    lc_cache.print_cache_stats()
     print("\n=== ТЕСТ ЗАВЕРШЕН ===")
 
 
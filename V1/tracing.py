@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import signal
+import threading
+import contextlib
+
+# Трассировка отдельных звезд: вложенные интервалы (spans) в формате Chrome trace,
+# файл открывается в chrome://tracing или ui.perfetto.dev. Плюс семплирующий профайлер
+# для CPU-процессов (SIGPROF по процессорному времени, стеки в свернутом формате flamegraph).
+# Выключено по умолчанию: span() тогда возвращает пустой контекст и ничего не записывает.
+# CPU-процессы конвейера запускаются не через fork (pipeline.MP_START_METHOD): настройки
+# передаются им явно — worker_settings() в главном процессе, init_worker() в воркере.
+PROFILE_INTERVAL = 0.005  # секунд процессорного времени между семплами
+
+_state = {'trace': False, 'profile': False, 'interval': PROFILE_INTERVAL, 'main_pid': None, 'buffer_pid': None,
+          'profiler_pid': None}
+_lock = threading.Lock()
+_events = []
+_samples = {}
+_NULL = contextlib.nullcontext()
+
+
+def enable(trace=True, profile=False, interval=PROFILE_INTERVAL):
+    """Включает запись интервалов и/или профайлер; буферы очищаются."""
+    _state.update(trace=trace, profile=profile, interval=interval, main_pid=os.getpid(), buffer_pid=os.getpid())
+    with _lock:
+        _events.clear()
+    _samples.clear()
+
+
+def worker_settings():
+    """Настройки для CPU-процессов (аргумент init_worker)."""
+    return {'trace': _state['trace'], 'profile': _state['profile'], 'interval': _state['interval']}
+
+
+def init_worker(settings):
+    """initializer пула процессов: включает в воркере то же, что в главном процессе."""
+    _state.update(settings, buffer_pid=None, profiler_pid=None)
+
+
+def disable():
+    stop_profiler()
+    _state.update(trace=False, profile=False)
+
+
+def enabled():
+    return _state['trace'] or _state['profile']
+
+
+def _now_us():
+    # Общие для всех процессов часы: интервалы воркеров ложатся на одну шкалу с главным
+    return time.time_ns() / 1000.0
+
+
+@contextlib.contextmanager
+def _span(name, cat, args):
+    start = _now_us()
+    try:
+        yield
+    except Exception as e:
+        args['error'] = type(e).__name__
+        raise
+    finally:
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': start, 'dur': _now_us() - start,
+                 'pid': os.getpid(), 'tid': threading.get_native_id(), 'args': args}
+        with _lock:
+            _events.append(event)
+
+
+def span(name, cat='stage', **args):
+    """with tracing.span('download', star=...): ... — интервал в трассе (если трассировка включена)."""
+    if not _state['trace']:
+        return _NULL
+    return _span(name, cat, args)
+
+
+def _on_sample(signum, frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    key = ";".join(reversed(stack))
+    _samples[key] = _samples.get(key, 0) + 1
+
+
+def attach():
+    """
+    Вызывается в начале работы в CPU-процессе. Если буферы достались от другого процесса
+    (fork) — выбрасываем их, иначе интервалы вернутся в трассу дважды.
+    Затем запускает профайлер, если он включен.
+    """
+    if not enabled():
+        return
+    if _state['buffer_pid'] != os.getpid():
+        with _lock:
+            _events.clear()
+        _samples.clear()
+        _state['buffer_pid'] = os.getpid()
+    start_profiler()
+
+
+def start_profiler():
+    """Запускает профайлер в текущем процессе (один раз на процесс; только из главного потока)."""
+    if not _state['profile'] or _state['profiler_pid'] == os.getpid() or not hasattr(signal, 'SIGPROF'):
+        return
+    try:
+        signal.signal(signal.SIGPROF, _on_sample)
+    except ValueError:
+        # Не главный поток (compute в потоках) — профайлер здесь недоступен
+        return
+    signal.setitimer(signal.ITIMER_PROF, _state['interval'], _state['interval'])
+    _state['profiler_pid'] = os.getpid()
+
+
+def stop_profiler():
+    if _state['profiler_pid'] == os.getpid():
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        _state['profiler_pid'] = None
+
+
+def drain():
+    """Забирает накопленные в этом процессе интервалы и семплы (для передачи в главный процесс)."""
+    if not enabled():
+        return None
+    with _lock:
+        events = list(_events)
+        _events.clear()
+    samples = dict(_samples)
+    for key, n in samples.items():
+        _samples[key] -= n
+    return {'events': events, 'samples': samples}
+
+
+def merge(data):
+    """Добавляет то, что вернул drain() в другом процессе."""
+    if not data:
+        return
+    with _lock:
+        _events.extend(data['events'])
+    for key, n in data['samples'].items():
+        _samples[key] = _samples.get(key, 0) + n
+
+
+def save_trace(path):
+    """Пишет трассу в формате Chrome trace (JSON с traceEvents)."""
+    with _lock:
+        events = list(_events)
+    names = []
+    for pid in sorted({e['pid'] for e in events} | {_state['main_pid']}):
+        label = "run_analysis" if pid == _state['main_pid'] else f"cpu worker {pid}"
+        names.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': label}})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': names + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return len(events)
+
+
+def save_profile(path):
+    """Пишет семплы в свернутом формате ("стек;стек;... число") для flamegraph.pl / speedscope."""
+    samples = sorted(((n, key) for key, n in _samples.items() if n > 0), reverse=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for n, key in samples:
+            f.write(f"{key} {n}\n")
+    return sum(n for n, _ in samples)
+
+
+def slowest(n=10, cat='analyze'):
+    """Самые долгие интервалы категории cat: [(имя, секунды), ...] — для печати в конце прогона."""
+    with _lock:
+        spans = [e for e in _events if e.get('cat') == cat]
+    spans.sort(key=lambda e: e['dur'], reverse=True)
+    return [(e['name'], e['dur'] / 1e6) for e in spans[:n]]
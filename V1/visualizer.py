@@ -1,12 +1,37 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 
 if not os.path.exists("plots"): os.makedirs("plots")
 
-def save_plots(name, lc, pg, period):
+def _fold(time, period):
+    # Фаза в сутках от -P/2 до P/2 относительно первой точки (как lc.fold(period))
+    return ((time - time[0]) / period + 0.5) % 1.0 * period - 0.5 * period
+
+def plot_path(name):
+    return f"plots/{name.replace(' ','_')}.png"
+
+def save_plots(name, lc, pg, period, overwrite=True):
+    # overwrite=False — готовый график не перерисовываем (период взят из кэша, картинка та же)
+    if not overwrite and os.path.exists(plot_path(name)):
+        return
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
-    pg.plot(ax=ax1, title=f"Periodogram: {name}")
-    lc.fold(period).scatter(ax=ax2, title=f"Folded P={period:.3f}d")
+    # pg — словарь из analysis.find_period (period/power), а не объект Periodogram
+    if 'power' in pg:
+        ax1.plot(pg['period'], pg['power'], 'k-', lw=0.7)
+    else:
+        # Результат из period_cache без сохраненного спектра — только найденные пики
+        ax1.vlines(pg['peak_periods'], 0, pg['peak_powers'], colors='k')
+    ax1.set_xscale('log')
+    ax1.set_xlabel('Period [d]')
+    ax1.set_ylabel('Amplitude')
+    ax1.set_title(f"Periodogram: {name}")
+    # lc — массивы из analysis.process_lightcurve; свертка без объекта LightCurve
+    phase = _fold(np.asarray(lc['time'], dtype=np.float64), period)
+    ax2.scatter(phase, lc['flux'], s=2, c='k')
+    ax2.set_xlabel('Phase [d]')
+    ax2.set_ylabel('Normalized Flux')
+    ax2.set_title(f"Folded P={period:.3f}d")
     plt.tight_layout()
-    plt.savefig(f"plots/{name.replace(' ','_')}.png")
-    plt.close()
\ No newline at end of file
+    plt.savefig(plot_path(name))
+    plt.close()
@@ -1,12 +1,40 @@
+import os
+import sys
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from astropy.coordinates import SkyCoord
-import astropy.units as u
 
-
-def plot_error_map(input_file):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import galactic
+import startable
+import streaming
+
+# Потоковый режим (включается вручную): файл читается кусками, каждый кусок в воркере
+# сворачивается в сетку (l, b) с суммой и числом ошибок в ячейке — в памяти только сетка,
+# а не вся таблица. Карта тогда строится по ячейкам, а не по звездам, плюс гистограмма ошибок
+STREAMING = False
+CHUNK_ROWS = streaming.CHUNK_ROWS
+N_WORKERS = None  # None — по числу ядер
+BIN_DEG = 2.0
+L_EDGES = np.arange(-180, 180 + BIN_DEG, BIN_DEG)
+B_EDGES = np.arange(-90, 90 + BIN_DEG, BIN_DEG)
+HIST_EDGES = np.arange(-300, 305, 5)
+HIST_FILE = 'error_map_hist.npz'
+HIST_PLOT_FILE = 'error_hist.png'
+
+
+def _show_or_close(show):
+    # plt.show() ждет, пока окно закроют; без окна фигуры закрываем, чтобы не копились в памяти
+    if show:
+        plt.show()
+    else:
+        plt.close('all')
+
+
+def plot_error_map(input_file, show=True):
     print(f"Загружаем данные из {input_file}...")
-    df = pd.read_csv(input_file)
+    # Только нужные колонки: из Parquet остальные даже не читаются
+    df = startable.read(input_file, columns=['ra', 'dec', 'rel_error'])
 
     # 1. Отсекаем дикие выбросы (ошибки > 300%), чтобы они не портили шкалу
     df_filtered = df[df['rel_error'].abs() < 300].copy()
@@ -15,19 +43,12 @@ def plot_error_map(input_file):
     # 2. Переводим RA и Dec в Галактические координаты (l, b)
     print("Конвертируем координаты в галактическую систему...")
 
-    # ИСПРАВЛЕНИЕ ЗДЕСЬ: вытаскиваем чистые numpy-массивы через .values
-    ra_vals = df_filtered['ra'].astype(float).values
-    dec_vals = df_filtered['dec'].astype(float).values
-
-    coords = SkyCoord(ra=ra_vals * u.degree,
-                      dec=dec_vals * u.degree,
-                      frame='icrs')
-    galactic_coords = coords.galactic
+    # l, b кэшируются рядом с input_file: повторный запуск не пересчитывает координаты
+    gal = galactic.galactic_columns(df_filtered, 'ra', 'dec', cache_path=input_file)
 
     # Добавляем в датафрейм (l - долгота, b - широта)
-    l_wrap = galactic_coords.l.wrap_at(180 * u.deg).degree
-    df_filtered['gal_l'] = l_wrap
-    df_filtered['gal_b'] = galactic_coords.b.degree
+    df_filtered['gal_l'] = galactic.wrap_l(gal['l'])
+    df_filtered['gal_b'] = gal['b']
 
     # 3. Настройка графика
     print("Отрисовка карты...")
@@ -61,9 +82,70 @@ def plot_error_map(input_file):
     plt.savefig('error_map_galactic14000.png', dpi=300)
     print("Карта успешно сохранена в файл 'error_map_galactic14000.png'!")
 
-    # Показываем окно с графиком
-    plt.show()
+    # Показываем окно с графиком (show=False — для цепочки run_chain: только файл, без окна)
+    _show_or_close(show)
+
+
+def _map_chunk(chunk):
+    # Выполняется в воркере: тот же отсев выбросов, l/b и накопление в сетку и гистограмму
+    chunk = chunk[chunk['rel_error'].abs() < 300]
+    l, b = galactic.radec_to_galactic(chunk['ra'].astype(float).values, chunk['dec'].astype(float).values)
+    rel_error = chunk['rel_error'].to_numpy(dtype=float)
+    grid = streaming.update_map(streaming.new_map(L_EDGES, B_EDGES), galactic.wrap_l(l), b, rel_error)
+    hist = streaming.update_histogram(streaming.new_histogram(HIST_EDGES), rel_error)
+    return grid, hist
+
+
+def plot_error_map_streaming(input_file, chunk_rows=CHUNK_ROWS, n_workers=N_WORKERS, show=True):
+    """Карта средних ошибок в ячейках BIN_DEG x BIN_DEG; память не зависит от числа звезд."""
+    print(f"Потоковая обработка {input_file} (кусками по {chunk_rows} строк)...")
+    grid = streaming.new_map(L_EDGES, B_EDGES)
+    hist = streaming.new_histogram(HIST_EDGES)
+    chunks = startable.iter_chunks(input_file, chunk_rows, columns=['ra', 'dec', 'rel_error'])
+    for chunk_grid, chunk_hist in streaming.map_chunks(_map_chunk, chunks, n_workers):
+        streaming.merge_map(grid, chunk_grid)
+        hist['count'] += chunk_hist['count']
+    print(f"Звезд для графика (после отсева аномалий): {grid['count'].sum()}")
+
+    # Накопленные данные сохраняем, чтобы перерисовать график без повторного чтения таблицы
+    np.savez(HIST_FILE, l_edges=grid['x_edges'], b_edges=grid['y_edges'], error_sum=grid['sum'],
+             error_count=grid['count'], hist_edges=hist['edges'], hist_count=hist['count'])
+
+    print("Отрисовка карты...")
+    plt.figure(figsize=(12, 6))
+    mesh = plt.pcolormesh(grid['x_edges'], grid['y_edges'], streaming.map_mean(grid).T,
+                          cmap='coolwarm', vmin=-50, vmax=150)
+
+    plt.colorbar(mesh, label='Средняя относительная ошибка в ячейке (%)')
+    plt.title('Карта погрешностей расчета расстояний (в Галактических координатах)')
+    plt.xlabel('Галактическая долгота $l$ (градусы)')
+    plt.ylabel('Галактическая широта $b$ (градусы)')
+    plt.xlim(180, -180)
+    plt.ylim(-90, 90)
+    plt.axhline(0, color='black', linestyle='--', alpha=0.5)
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+
+    plt.savefig('error_map_galactic14000.png', dpi=300)
+    print("Карта успешно сохранена в файл 'error_map_galactic14000.png'!")
+
+    # Гистограмма относительных ошибок по всей выборке (накоплена по кускам)
+    plt.figure(figsize=(8, 5))
+    plt.stairs(hist['count'], hist['edges'], fill=True, alpha=0.7)
+    plt.axvline(0, color='black', linestyle='--', alpha=0.5)
+    plt.title('Распределение относительных ошибок расстояний')
+    plt.xlabel('Относительная ошибка (%)')
+    plt.ylabel('Число звезд')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(HIST_PLOT_FILE, dpi=150)
+    print(f"Гистограмма ошибок сохранена в файл '{HIST_PLOT_FILE}'!")
+    _show_or_close(show)
 
 
 # Запуск
-plot_error_map('stars_calculated.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    if STREAMING:
+        plot_error_map_streaming('stars_calculated.csv')
+    else:
+        plot_error_map('stars_calculated.csv')
@@ -1,5 +1,10 @@
+import os
+import sys
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import startable
+
 
 def prepare_star_catalog(input_filename, output_filename):
     # 1. Загружаем исходные данные
@@ -37,9 +42,10 @@ def prepare_star_catalog(input_filename, output_filename):
     new_df['rel_error'] = None
 
     # 5. Сохраняем в новый файл
-    new_df.to_csv(output_filename, index=False)
+    startable.write(new_df, output_filename)
     print(f"Готово! Файл '{output_filename}' создан. Количество звезд: {len(new_df)}")
 
 
 # Запуск (замените 'your_file.csv' на реальное имя вашего файла)
-prepare_star_catalog('my_stars_with_distance.csv', 'stars_prepared.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    prepare_star_catalog('my_stars_with_distance.csv', 'stars_prepared.csv')
\ No newline at end of file
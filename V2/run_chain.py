@@ -0,0 +1,88 @@
+import os
+import sys
+import importlib.util
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import stages
+
+import prepare_star_catalog
+import calculate_errors
+import plot_errors
+
+# Цепочка V2: prepare -> x-match -> calculate -> plot. Стадия перезапускается, только если
+# поменялись ее входные файлы, параметры или код скрипта — правка графика не гоняет кросс-матч.
+# Запуск: python run_chain.py [стадия ...]  — перечисленные стадии пересчитать принудительно ('all' — все)
+SOURCE_FILE = 'my_stars_with_distance.csv'
+PREPARED_FILE = 'stars_prepared.csv'
+PERIODS_FILE = 'stars_with_periods.csv'
+CALCULATED_FILE = 'stars_calculated.csv'
+MAX_PARALLEL_STAGES = 2
+
+
+def _load_script(filename):
+    # x-matching.py нельзя импортировать обычным import из-за дефиса в имени
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(filename)[0].replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_stages():
+    x_matching = _load_script('x-matching.py')
+
+    # Локальная копия VSX — тоже вход: обновили каталог -> кросс-матч пересчитается
+    xmatch_inputs = [PREPARED_FILE]
+    if os.path.exists(x_matching.VSX_LOCAL_FILE):
+        xmatch_inputs.append(x_matching.VSX_LOCAL_FILE)
+
+    return [
+        stages.stage('prepare', prepare_star_catalog.prepare_star_catalog,
+                     args=(SOURCE_FILE, PREPARED_FILE),
+                     inputs=[SOURCE_FILE], outputs=[PREPARED_FILE]),
+        stages.stage('xmatch', x_matching.enrich_stars_with_periods,
+                     args=(PREPARED_FILE, PERIODS_FILE),
+                     inputs=xmatch_inputs, outputs=[PERIODS_FILE],
+                     params={'radius_arcsec': x_matching.MATCH_RADIUS_ARCSEC,
+                             'local_vsx': len(xmatch_inputs) > 1}),
+        calculate_stage(),
+        plot_stage(),
+    ]
+
+
+def calculate_stage():
+    # Режим расчета — как в calculate_errors.STREAMING; смена режима тоже перезапускает стадию
+    if calculate_errors.STREAMING:
+        return stages.stage('calculate', calculate_errors.process_calculations_streaming,
+                            args=(PERIODS_FILE, CALCULATED_FILE),
+                            inputs=[PERIODS_FILE], outputs=[CALCULATED_FILE],
+                            params={'streaming': True, 'chunk_rows': calculate_errors.CHUNK_ROWS,
+                                    'uncertainty': calculate_errors.UNCERTAINTY})
+    return stages.stage('calculate', calculate_errors.process_calculations,
+                        args=(PERIODS_FILE, CALCULATED_FILE),
+                        inputs=[PERIODS_FILE], outputs=[CALCULATED_FILE],
+                        params={'streaming': False, 'uncertainty': calculate_errors.UNCERTAINTY})
+
+
+def plot_stage():
+    # show=False: график только сохраняется — окно plt.show() остановило бы цепочку до его закрытия
+    if plot_errors.STREAMING:
+        return stages.stage('plot', plot_errors.plot_error_map_streaming,
+                            args=(CALCULATED_FILE, plot_errors.CHUNK_ROWS, plot_errors.N_WORKERS, False),
+                            inputs=[CALCULATED_FILE],
+                            outputs=['error_map_galactic14000.png', plot_errors.HIST_FILE, plot_errors.HIST_PLOT_FILE],
+                            params={'streaming': True, 'bin_deg': plot_errors.BIN_DEG})
+    return stages.stage('plot', plot_errors.plot_error_map,
+                        args=(CALCULATED_FILE, False),
+                        inputs=[CALCULATED_FILE], outputs=['error_map_galactic14000.png'],
+                        params={'streaming': False})
+
+
+def run_chain(force=()):
+    status = stages.run_stages(build_stages(), force=force, max_workers=MAX_PARALLEL_STAGES)
+    print("Итог: " + ", ".join(f"{name} — {result}" for name, result in status.items()))
+    return status
+
+
+if __name__ == '__main__':
+    run_chain(force=sys.argv[1:])
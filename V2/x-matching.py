@@ -1,13 +1,33 @@
+import os
+import sys
 import pandas as pd
 from astroquery.xmatch import XMatch
 from astropy import units as u
 from astropy.table import Table
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import crossmatch
+import startable
+
+# Локальная копия VSX (B/vsx/vsx: Name, RAJ2000, DEJ2000, Period, Type).
+# Если файл есть — матчим у себя через KD-дерево, без сервера CDS.
+VSX_LOCAL_FILE = 'vsx_catalog.parquet'
+MATCH_RADIUS_ARCSEC = 3
+
+
+def match_vsx_local(clean_df, vsx_file=VSX_LOCAL_FILE):
+    """Кросс-матч с локальной VSX: ближайший объект в радиусе, колонки name/Period/Type как у XMatch."""
+    vsx = crossmatch.load_reference(vsx_file, columns=['RAJ2000', 'DEJ2000', 'Period', 'Type'])
+    matched = crossmatch.crossmatch(clean_df, vsx, MATCH_RADIUS_ARCSEC,
+                                    ref_ra_col='RAJ2000', ref_dec_col='DEJ2000',
+                                    ref_columns=['Period', 'Type'], keep='nearest')
+    return matched[['name', 'Period', 'Type']]
+
 
 def enrich_stars_with_periods(input_file, output_file):
     print(f"1. Читаем данные из файла: {input_file}...")
     try:
-        df = pd.read_csv(input_file)
+        df = startable.read(input_file)
     except FileNotFoundError:
         print(f"Ошибка: Файл '{input_file}' не найден. Убедитесь, что первый скрипт отработал корректно.")
         return
@@ -21,25 +41,32 @@ def enrich_stars_with_periods(input_file, output_file):
     table_to_match = Table.from_pandas(clean_df)
 
     print(f"2. Запуск кросс-матчинга для {len(table_to_match)} объектов...")
-    print("Ищем совпадения в каталоге VSX (VizieR: B/vsx/vsx). Это займет около 1-2 минут...")
 
     try:
-        # Отправляем запрос на сервер CDS
-        matched_table = XMatch.query(
-            cat1=table_to_match,
-            cat2='vizier:B/vsx/vsx',  # Каталог переменных звезд VSX
-            max_distance=3 * u.arcsec,  # Ищем в радиусе 3 угловых секунд
-            colRA1='ra',
-            colDec1='dec'
-        )
-
-        # Превращаем результат обратно в привычный pandas DataFrame
-        matched_df = matched_table.to_pandas()
-        print(f"Успешно! Найдено совпадений: {len(matched_df)}")
-
-        # В каталоге VSX нужные нам данные лежат в колонках 'Period' и 'Type'
-        # Берем только их и 'name' для объединения
-        match_subset = matched_df[['name', 'Period', 'Type']].copy()
+        if os.path.exists(VSX_LOCAL_FILE):
+            print(f"Ищем совпадения в локальной копии VSX ({VSX_LOCAL_FILE})...")
+            match_subset = match_vsx_local(clean_df)
+            print(f"Успешно! Найдено совпадений: {len(match_subset)}")
+        else:
+            print("Ищем совпадения в каталоге VSX (VizieR: B/vsx/vsx). Это займет около 1-2 минут...")
+            # Отправляем запрос на сервер CDS
+            matched_table = XMatch.query(
+                cat1=table_to_match,
+                cat2='vizier:B/vsx/vsx',  # Каталог переменных звезд VSX
+                max_distance=MATCH_RADIUS_ARCSEC * u.arcsec,  # Ищем в радиусе 3 угловых секунд
+                colRA1='ra',
+                colDec1='dec'
+            )
+
+            # Превращаем результат обратно в привычный pandas DataFrame
+            matched_df = matched_table.to_pandas()
+            print(f"Успешно! Найдено совпадений: {len(matched_df)}")
+
+            # В каталоге VSX нужные нам данные лежат в колонках 'Period' и 'Type'
+            # Берем только их и 'name' для объединения (ближайший — первым)
+            if 'angDist' in matched_df.columns:
+                matched_df = matched_df.sort_values('angDist', kind='stable')
+            match_subset = matched_df[['name', 'Period', 'Type']].copy()
 
         # Убираем дубликаты (на случай, если одна звезда сматчилась с двумя объектами)
         match_subset = match_subset.drop_duplicates(subset=['name'])
@@ -57,7 +84,7 @@ def enrich_stars_with_periods(input_file, output_file):
         final_df.drop(columns=['Period', 'Type'], inplace=True, errors='ignore')
 
         # 4. Сохраняем в новый файл
-        final_df.to_csv(output_file, index=False)
+        startable.write(final_df, output_file)
         print(f"4. Готово! Данные сохранены в файл: '{output_file}'")
 
         # Выводим небольшую статистику
@@ -69,4 +96,5 @@ def enrich_stars_with_periods(input_file, output_file):
 
 
 # Запуск скрипта
-enrich_stars_with_periods('stars_prepared.csv', 'stars_with_periods.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    enrich_stars_with_periods('stars_prepared.csv', 'stars_with_periods.csv')
\ No newline at end of file
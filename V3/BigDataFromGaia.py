@@ -1,8 +1,25 @@
+import os
+import sys
 import pandas as pd
-from astroquery.gaia import Gaia
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from gaia_partitions import fetch_partitioned, load_partitions, clear_partitions
+import query_cache
+import startable
 
-def download_unlimited_gaia_dataset():
+# Запросы режутся на куски по диапазонам source_id и идут параллельно
+N_PARTITIONS = 32
+MAX_PARALLEL_JOBS = 4
+PARTS_DIR = "gaia_parts"
+
+
+def download_unlimited_gaia_dataset(service=None, n_partitions=N_PARTITIONS, max_workers=MAX_PARALLEL_JOBS,
+                                    refresh=False):
+    """
+    Части запросов лежат в PARTS_DIR в папках с ключом текста запроса и числом частей
+    (как в V5/data_fetcher.py): правка фильтров ADQL или запуск V3 и V4 из одной папки
+    не подхватят чужие части. refresh=True — удалить части этих запросов и скачать заново.
+    """
     print("1. Подключаемся к архиву космического телескопа Gaia (ESA)...")
     print("ВНИМАНИЕ: Сняты все лимиты. Мы качаем Big Data. Это может занять 3-5 минут!")
 
@@ -12,7 +29,7 @@ def download_unlimited_gaia_dataset():
         s.source_id AS name,
         s.ra, s.dec,
         s.phot_g_mean_mag AS v_mag,
-        s.parallax,
+        s.parallax, s.parallax_error,
         c.pf AS period,
         'CEP' AS sp_type
     FROM gaiadr3.gaia_source AS s
@@ -20,6 +37,7 @@ def download_unlimited_gaia_dataset():
     WHERE s.parallax > 0 
       AND s.parallax / s.parallax_error > 5
       AND c.pf > 0
+      AND {partition}
     """
 
     # Запрос 2: Ищем ВСЕ качественные RR Лиры
@@ -28,7 +46,7 @@ def download_unlimited_gaia_dataset():
         s.source_id AS name,
         s.ra, s.dec,
         s.phot_g_mean_mag AS v_mag,
-        s.parallax,
+        s.parallax, s.parallax_error,
         r.pf AS period,
         'RR' AS sp_type
     FROM gaiadr3.gaia_source AS s
@@ -36,16 +54,30 @@ def download_unlimited_gaia_dataset():
     WHERE s.parallax > 0 
       AND s.parallax / s.parallax_error > 5
       AND r.pf > 0
+      AND {partition}
     """
 
-    print("2. Отправляем запрос на Цефеиды. Ждем ответа сервера...")
-    job_cep = Gaia.launch_job_async(query_cep)
-    df_cep = job_cep.get_results().to_pandas()
-    print(f"Получено идеальных Цефеид: {len(df_cep)}")
+    parts_cep = f"{query_cache.query_key(query_cep)}_{n_partitions}_cep"
+    parts_rr = f"{query_cache.query_key(query_rr)}_{n_partitions}_rr"
+    if refresh:
+        clear_partitions(parts_cep, PARTS_DIR)
+        clear_partitions(parts_rr, PARTS_DIR)
+        print(f"--- Скачанные части {parts_cep}, {parts_rr} удалены, качаем заново ---")
 
-    print("3. Отправляем запрос на огромный массив RR Лиры. Ждем ответа сервера...")
-    job_rr = Gaia.launch_job_async(query_rr)
-    df_rr = job_rr.get_results().to_pandas()
+    print("2. Отправляем запросы на Цефеиды (по частям неба). Ждем ответа сервера...")
+    cep_parts, cep_failed = fetch_partitioned(query_cep, parts_cep, PARTS_DIR, n_partitions, max_workers, service)
+
+    print("3. Отправляем запросы на огромный массив RR Лиры. Ждем ответа сервера...")
+    rr_parts, rr_failed = fetch_partitioned(query_rr, parts_rr, PARTS_DIR, n_partitions, max_workers, service)
+
+    if cep_failed or rr_failed:
+        print(f"!!! Не скачано частей: {len(cep_failed) + len(rr_failed)}. "
+              f"Запустите скрипт еще раз — готовые части из {PARTS_DIR} повторно не качаются.")
+        return
+
+    df_cep = load_partitions(cep_parts)
+    print(f"Получено идеальных Цефеид: {len(df_cep)}")
+    df_rr = load_partitions(rr_parts)
     print(f"Получено идеальных RR Лиры: {len(df_rr)}")
 
     print("4. Объединяем и переводим параллаксы в парсеки...")
@@ -55,12 +87,12 @@ def download_unlimited_gaia_dataset():
     df_total['dist_ref'] = 1000.0 / df_total['parallax']
 
     output_file = 'stars_with_periods.csv'
-    df_total.to_csv(output_file, index=False)
+    startable.write(df_total, output_file)
 
     print(f"\nАБСОЛЮТНЫЙ УСПЕХ! Скачано {len(df_total)} звезд!")
     print(f"Файл '{output_file}' готов. Можно запускать расчеты!")
 
 
-# Запуск
+# Запуск: python BigDataFromGaia.py [--refresh]  (--refresh — скачать части заново)
 if __name__ == '__main__':
-    download_unlimited_gaia_dataset()
\ No newline at end of file
+    download_unlimited_gaia_dataset(refresh='--refresh' in sys.argv[1:])
\ No newline at end of file
@@ -1,17 +1,20 @@
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from astropy.coordinates import SkyCoord
-import astropy.units as u
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import galactic
+import startable
 
 
 def create_3d_star_map(input_file):
-    if not os.path.exists(input_file):
+    if not startable.exists(input_file):
         print(f"❌ Файл {input_file} не найден!")
         return
 
-    df = pd.read_csv(input_file)
+    df = startable.read(input_file, columns=['name', 'ra', 'dec', 'dist_ref', 'rel_error'])
 
     # 1. СТРОГИЙ ФИЛЬТР (как в 2D)
     # Оставляем только те звезды, где расчеты имеют смысл
@@ -24,12 +27,8 @@ def create_3d_star_map(input_file):
     print(f"Число звезд после фильтрации: {len(df)}")
 
     # Координаты
-    coords = SkyCoord(ra=df['ra'].values * u.degree,
-                      dec=df['dec'].values * u.degree,
-                      distance=df['dist_ref'].values * u.pc,
-                      frame='icrs')
-    galactic = coords.galactic
-    df['x'], df['y'], df['z'] = galactic.cartesian.x.value, galactic.cartesian.y.value, galactic.cartesian.z.value
+    gal = galactic.galactic_columns(df, 'ra', 'dec', dist_col='dist_ref', cache_path=input_file)
+    df['x'], df['y'], df['z'] = gal['X'], gal['Y'], gal['Z']
 
     fig = go.Figure()
 
@@ -1,20 +1,76 @@
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import os
-from astropy.coordinates import SkyCoord
-import astropy.units as u
+import sys
 import webbrowser
 
-
-def create_3d_galaxy_map(file_path):
-    if not os.path.exists(file_path):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import galactic
+import startable
+import lod
+
+# LOD-режим: далекие/плотные области — воксели, отдельные точки — только рядом и в разреженных местах.
+# Число маркеров ограничено MAX_MARKERS, поэтому размер HTML не растет вместе с каталогом.
+LOD_MODE = True
+MAX_MARKERS = lod.MAX_MARKERS
+ERROR_COLORSCALE = [
+    (0, "gray"),  # Ошибки нет или пропущено
+    (0.01, "blue"),  # Маленькая ошибка
+    (0.5, "yellow"),  # Средняя
+    (1.0, "red")  # Большая ошибка (пыль)
+]
+
+
+def _f32(values):
+    # numpy-массивы plotly пишет в HTML как типизированные (base64), а не как списки чисел
+    return np.asarray(values, dtype=np.float32)
+
+
+def build_lod_figure(df, keep_stars=None, max_markers=MAX_MARKERS):
+    """3D-сцена из отдельных звезд и вокселей (размер маркера ~ число звезд, цвет — средняя ошибка)."""
+    keep = df['Star'].isin(keep_stars).to_numpy() if keep_stars is not None else None
+    points, voxels, voxel_size, radius = lod.build_lod(
+        df['X'].to_numpy(), df['Y'].to_numpy(), df['Z'].to_numpy(), df['relative_error'].to_numpy(),
+        max_markers=max_markers, keep=keep)
+    print(f"LOD: {len(points)} звезд отдельно, {len(voxels['count'])} вокселей по {voxel_size:.0f} пк "
+          f"(точки до {radius:.0f} пк)")
+
+    stars = df.iloc[points]
+    voxel_error = np.nan_to_num(voxels['value'], nan=-1).clip(max=150)
+    marker_color = dict(colorscale=ERROR_COLORSCALE, cmin=0, cmax=150)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter3d(
+        x=_f32(stars['X']), y=_f32(stars['Y']), z=_f32(stars['Z']),
+        mode='markers', name='Звезды',
+        marker=dict(size=2.5, opacity=0.8, color=_f32(stars['error_viz']), showscale=True, **marker_color),
+        text=(stars['Star'].astype(str) + "<br>" + stars['Status'].astype(str)).to_numpy(),
+        customdata=_f32(stars[['Gaia_Dist', 'Calc_Dist', 'relative_error']].to_numpy()),
+        hovertemplate="%{text}<br>Gaia_Dist=%{customdata[0]:.1f}<br>Calc_Dist=%{customdata[1]:.1f}"
+                      "<br>relative_error=%{customdata[2]:.2f}<extra></extra>",
+    ))
+    fig.add_trace(go.Scatter3d(
+        x=voxels['x'], y=voxels['y'], z=voxels['z'],
+        mode='markers', name=f'Воксели {voxel_size:.0f} пк',
+        marker=dict(size=_f32(2 + 2 * np.log10(voxels['count'])), opacity=0.5,
+                    color=_f32(voxel_error), **marker_color),
+        customdata=np.column_stack([voxels['count'], voxels['value']]).astype(np.float32),
+        hovertemplate="Звезд: %{customdata[0]:.0f}<br>Средняя ошибка: %{customdata[1]:.2f}%<extra></extra>",
+    ))
+    fig.update_layout(title="Интерактивная карта: Погрешности и межзвездная среда (LOD)")
+    return fig
+
+
+def create_3d_galaxy_map(file_path, lod_mode=LOD_MODE, keep_stars=None, max_markers=MAX_MARKERS):
+    if not startable.exists(file_path):
         print(f"Ошибка: Файл '{file_path}' не найден.")
         return
 
     print(f"Загрузка данных из {file_path}...")
     # Читаем файл, учитывая возможные пустые значения
-    df = pd.read_csv(file_path)
+    df = startable.read(file_path, columns=['Star', 'RA', 'Dec', 'Gaia_Dist', 'Calc_Dist', 'Status'])
 
     # 1. Подготовка данных
     # Заменяем пустые значения в дистанциях на NaN для корректной работы
@@ -41,18 +97,9 @@ def create_3d_galaxy_map(file_path):
 
     # 3. Перевод координат в Галактические
     print(f"Конвертирую координаты для {len(df)} звезд...")
-    coords = SkyCoord(ra=df['RA'].values * u.degree, dec=df['Dec'].values * u.degree, frame='icrs')
-    df['l'] = coords.galactic.l.degree
-    df['b'] = coords.galactic.b.degree
-
-    # 4. Декартовы координаты
-    l_rad = np.radians(df['l'])
-    b_rad = np.radians(df['b'])
-    d = df['Plot_Dist']
-
-    df['X'] = d * np.cos(b_rad) * np.cos(l_rad)
-    df['Y'] = d * np.cos(b_rad) * np.sin(l_rad)
-    df['Z'] = d * np.sin(b_rad)
+    # 4. Декартовы координаты — тем же проходом; l, b, X, Y, Z кэшируются рядом с file_path
+    gal = galactic.galactic_columns(df, 'RA', 'Dec', dist_col='Plot_Dist', cache_path=file_path)
+    df[['l', 'b', 'X', 'Y', 'Z']] = gal[['l', 'b', 'X', 'Y', 'Z']]
 
     # Подготовка шкалы для визуализации
     # Если ошибки нет (Skipped), запишем её как -1, чтобы покрасить в серый
@@ -60,27 +107,26 @@ def create_3d_galaxy_map(file_path):
 
     # 5. Построение графика
     print("Генерация 3D сцены...")
-    fig = px.scatter_3d(
-        df,
-        x='X', y='Y', z='Z',
-        color='error_viz',
-        color_continuous_scale=[
-            (0, "gray"),  # Ошибки нет или пропущено
-            (0.01, "blue"),  # Маленькая ошибка
-            (0.5, "yellow"),  # Средняя
-            (1.0, "red")  # Большая ошибка (пыль)
-        ],
-        hover_name='Star',
-        hover_data={
-            'X': False, 'Y': False, 'Z': False,
-            'Gaia_Dist': ':.1f',
-            'Calc_Dist': ':.1f',
-            'relative_error': ':.2f',
-            'Status': True
-        },
-        title="Интерактивная карта: Погрешности и межзвездная среда",
-        range_color=[0, 150]
-    )
+    if lod_mode:
+        fig = build_lod_figure(df, keep_stars=keep_stars, max_markers=max_markers)
+    else:
+        fig = px.scatter_3d(
+            df,
+            x='X', y='Y', z='Z',
+            color='error_viz',
+            color_continuous_scale=ERROR_COLORSCALE,
+            hover_name='Star',
+            hover_data={
+                'X': False, 'Y': False, 'Z': False,
+                'Gaia_Dist': ':.1f',
+                'Calc_Dist': ':.1f',
+                'relative_error': ':.2f',
+                'Status': True
+            },
+            title="Интерактивная карта: Погрешности и межзвездная среда",
+            range_color=[0, 150]
+        )
+        fig.update_traces(marker=dict(size=2.5, opacity=0.8))
 
     fig.update_layout(
         template="plotly_dark",
@@ -92,8 +138,6 @@ def create_3d_galaxy_map(file_path):
         )
     )
 
-    fig.update_traces(marker=dict(size=2.5, opacity=0.8))
-
     # 6. Сохранение
     output_file = "Astro_3D_Map_Fixed.html"
     fig.write_html(output_file)
@@ -1,40 +1,57 @@
+import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import montecarlo
+import pl_relations
 
-def calculate_distances(df):
-    print("Расчет абсолютных величин по типам звезд...")
+# Неопределенности методом Монте-Карло: параллакс — по parallax_error из Gaia,
+# звездная величина и период — типичные ошибки (в выборке их нет)
+MC_SAMPLES = montecarlo.N_SAMPLES
+V_MAG_ERR = 0.02
+PERIOD_REL_ERR = 1e-3
 
-    def get_m_abs(row):
-        p = row['period']
-        st = str(row['sub_type']).upper()
+# P-L зависимости по sub_type — таблица классов Gaia из common/pl_relations.py
+TYPE_CLASSES = pl_relations.GAIA_SUBTYPE_CLASSES
 
-        # 1. Классические Цефеиды (DCEP)
-        if 'DCEP' in st:
-            return -2.76 * np.log10(p) - 1.45
 
-        # 2. Цефеиды II типа (W Vir, BL Her)
-        elif 'T2CEP' in st or 'CW' in st:
-            return -1.64 * np.log10(p) - 0.65
+def absolute_magnitude_array(period, sub_type):
+    return pl_relations.absolute_magnitude_array(period, sub_type, TYPE_CLASSES)
 
-        # 3. RR Лиры (считаем в среднем для RRAB/RRC)
-        elif 'RR' in st:
-            return -1.87 * np.log10(p) - 0.64
 
-        return np.nan
+def calculate_distances(df):
+    print("Расчет абсолютных величин по типам звезд...")
 
-    # Применяем формулы
-    df['M_calc'] = df.apply(get_m_abs, axis=1)
+    # Применяем формулы: типы -> коды классов -> коэффициенты, дальше только массивы
+    m_calc = absolute_magnitude_array(df['period'].to_numpy(), df['sub_type'].to_numpy())
 
     # Удаляем если тип не распознан
-    df = df.dropna(subset=['M_calc']).copy()
+    keep = ~np.isnan(m_calc)
+    df = df[keep].copy()
+    m_calc = m_calc[keep]
+    v_mag = df['v_mag'].to_numpy(dtype=np.float64)
+    parallax = df['parallax'].to_numpy(dtype=np.float64)
 
     # Расстояние по закону Ливитта (фотометрическое)
-    df['dist_pl'] = 10 ** ((df['v_mag'] - df['M_calc'] + 5) / 5)
+    dist_pl = 10 ** ((v_mag - m_calc + 5) / 5)
 
     # Расстояние по параллаксу Gaia (эталонное)
-    df['dist_ref'] = 1000 / df['parallax']
+    dist_ref = 1000 / parallax
+
+    df['M_calc'] = m_calc
+    df['dist_pl'] = dist_pl
+    df['dist_ref'] = dist_ref
 
     # Твоя "Карта поглощения" — относительная ошибка
-    df['rel_error'] = (df['dist_pl'] - df['dist_ref']) / df['dist_ref'] * 100
+    df['rel_error'] = (dist_pl - dist_ref) / dist_ref * 100
+
+    return df
+
 
-    return df
\ No newline at end of file
+def calculate_uncertainties(df, n_samples=MC_SAMPLES, n_workers=None, seed=0):
+    """Перцентили (16/50/84) M_calc, dist_pl, dist_ref, abs_error, rel_error по n_samples выборкам на звезду."""
+    a, b = pl_relations.coefficients(df['sub_type'].to_numpy(), TYPE_CLASSES)
+    inputs = montecarlo.distance_inputs(df, a, b, V_MAG_ERR, PERIOD_REL_ERR)
+    return montecarlo.propagate(df, montecarlo.distance_model, inputs, n_samples=n_samples,
+                                n_workers=n_workers, seed=seed)
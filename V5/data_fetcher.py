@@ -1,27 +1,46 @@
 import pandas as pd
+import numpy as np
 import os
-from astroquery.gaia import Gaia
+import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+from gaia_partitions import fetch_partitioned, load_partitions, clear_partitions
+import query_cache
 
-def fetch_gaia_data():
-    """
-    Загружает данные из Gaia DR3.
-    Использует кэширование, чтобы не зависеть от сбоев сервера.
-    """
-    cache_file = "raw_gaia_cache.csv"
+# Запросы режутся на куски по диапазонам source_id и идут параллельно
+N_PARTITIONS = 32
+MAX_PARALLEL_JOBS = 4
+PARTS_DIR = "gaia_parts"
 
-    # 1. Проверяем, есть ли данные локально
-    if os.path.exists(cache_file):
-        print(f"--- Загрузка данных из локального кэша: {cache_file} ---")
-        return pd.read_csv(cache_file)
+# Фильтры качества (входят в ключ кэша)
+RUWE_MAX = 1.4
+PARALLAX_SNR_MIN = 10
 
-    print("--- Локальный кэш не найден. Запуск запросов к серверу Gaia (ESA) ---")
+# Явные типы колонок в кэше: float32 для фотометрии, категории для типов
+GAIA_DTYPES = {
+    'source_id': np.int64,
+    'ra': np.float64,
+    'dec': np.float64,
+    'v_mag': np.float32,
+    'parallax': np.float32,
+    'parallax_error': np.float32,
+    'period': np.float32,
+    'sub_type': 'category',
+    'main_type': 'category',
+}
 
-    # Настройка лимитов (снятие ограничений на количество строк)
-    Gaia.ROW_LIMIT = -1
 
+def fetch_gaia_data(service=None, n_partitions=N_PARTITIONS, max_workers=MAX_PARALLEL_JOBS,
+                    ruwe_max=RUWE_MAX, parallax_snr_min=PARALLAX_SNR_MIN, refresh=False):
+    """
+    Загружает данные из Gaia DR3.
+    Использует кэширование, чтобы не зависеть от сбоев сервера: запись кэша привязана
+    к тексту запросов и фильтрам, поэтому другой запрос не получит чужие данные.
+    service — TAP-сервис с launch_job_async (по умолчанию astroquery.gaia.Gaia).
+    refresh=True — удалить запись для этих запросов и скачать заново.
+    """
     # Условия фильтрации: живой параллакс, хороший RUWE (качество) и точность > 10 сигма
-    common_where = "s.parallax > 0 AND s.ruwe < 1.4 AND s.parallax/s.parallax_error > 10"
+    common_where = f"s.parallax > 0 AND s.ruwe < {ruwe_max} AND s.parallax/s.parallax_error > {parallax_snr_min}"
 
     # Запрос для Цефеид (Классические + II тип)
     query_cep = f"""
@@ -30,7 +49,7 @@ def fetch_gaia_data():
         c.pf as period, c.type_best_classification as sub_type, 'CEP' as main_type
     FROM gaiadr3.gaia_source AS s
     JOIN gaiadr3.vari_cepheid AS c ON s.source_id = c.source_id
-    WHERE {common_where}
+    WHERE {common_where} AND {{partition}}
     """
 
     # Запрос для RR Лир
@@ -40,18 +59,47 @@ def fetch_gaia_data():
         r.pf as period, r.type_best_classification as sub_type, 'RR' as main_type
     FROM gaiadr3.gaia_source AS s
     JOIN gaiadr3.vari_rrlyrae AS r ON s.source_id = r.source_id
-    WHERE {common_where}
+    WHERE {common_where} AND {{partition}}
     """
 
+    cache_key = query_cache.query_key(query_cep, query_rr, common_where=common_where, ruwe_max=ruwe_max,
+                                      parallax_snr_min=parallax_snr_min)
+
+    parts_cep, parts_rr = f"{cache_key}_{n_partitions}_cep", f"{cache_key}_{n_partitions}_rr"
+
+    # 1. Проверяем, есть ли данные локально именно для этих запросов
+    if refresh:
+        query_cache.invalidate(cache_key)
+        clear_partitions(parts_cep, PARTS_DIR)
+        clear_partitions(parts_rr, PARTS_DIR)
+        print(f"--- Запись кэша {cache_key} удалена, качаем заново ---")
+    cached = query_cache.load(cache_key)
+    if cached is not None:
+        info = query_cache.metadata(cache_key)
+        print(f"--- Загрузка данных из локального кэша {cache_key} "
+              f"({info['rows']} строк, скачано {info['fetched_at']}) ---")
+        return cached
+
+    print("--- Локальный кэш не найден. Запуск запросов к серверу Gaia (ESA) ---")
+
     try:
-        print("Отправка запроса на Цефеиды...")
-        job_cep = Gaia.launch_job_async(query_cep)
-        df_cep = job_cep.get_results().to_pandas()
-        print(f"Получено Цефеид: {len(df_cep)}")
+        # Части пишутся на диск по мере готовности; при повторном запуске докачиваются только упавшие
+        print("Отправка запросов на Цефеиды...")
+        cep_parts, cep_failed = fetch_partitioned(query_cep, parts_cep, PARTS_DIR,
+                                                  n_partitions, max_workers, service)
+
+        print("Отправка запросов на RR Лиры...")
+        rr_parts, rr_failed = fetch_partitioned(query_rr, parts_rr, PARTS_DIR,
+                                                n_partitions, max_workers, service)
 
-        print("Отправка запроса на RR Лиры...")
-        job_rr = Gaia.launch_job_async(query_rr)
-        df_rr = job_rr.get_results().to_pandas()
+        if cep_failed or rr_failed:
+            print(f"!!! Не скачано частей: {len(cep_failed) + len(rr_failed)}. "
+                  f"Запустите еще раз — готовые части из {PARTS_DIR} будут взяты с диска.")
+            return pd.DataFrame()
+
+        df_cep = load_partitions(cep_parts)
+        print(f"Получено Цефеид: {len(df_cep)}")
+        df_rr = load_partitions(rr_parts)
         print(f"Получено RR Лир: {len(df_rr)}")
 
         # Объединяем результаты
@@ -59,11 +107,16 @@ def fetch_gaia_data():
 
         if not full_df.empty:
             # Сохраняем в кэш, чтобы не качать заново
-            full_df.to_csv(cache_file, index=False)
-            print(f"Данные успешно закешированы в {cache_file}")
+            full_df = query_cache.save(
+                cache_key, full_df, GAIA_DTYPES,
+                queries=[query_cep, query_rr],
+                filters={'common_where': common_where, 'ruwe_max': ruwe_max, 'parallax_snr_min': parallax_snr_min},
+                row_counts={'cep': len(df_cep), 'rr': len(df_rr)},
+            )
+            print(f"Данные успешно закешированы: {query_cache.CACHE_DIR}/{cache_key}.parquet")
 
         return full_df
 
     except Exception as e:
         print(f"!!! Ошибка при работе с Gaia API: {e}")
-        return pd.DataFrame()  # Возвращаем пустой объект, чтобы main.py мог это обработать
\ No newline at end of file
+        return pd.DataFrame()  # Возвращаем пустой объект, чтобы main.py мог это обработать
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Уровни детализации (LOD) для 3D-карты: далекие и плотные области сворачиваются
+# в воксели-маркеры (число звезд, средняя ошибка), отдельные точки остаются только
+# рядом с Солнцем, в разреженных вокселях и для звезд, выбранных пользователем.
+VOXEL_SIZE_PC = 100.0
+NEAR_RADIUS_PC = 500.0
+DENSE_VOXEL = 20
+MAX_MARKERS = 200_000
+
+
+def voxel_index(x, y, z, voxel_size):
+    """Номер вокселя для каждой звезды: (inverse, counts) — как np.unique(..., return_inverse, return_counts)."""
+    cells = [np.floor(np.asarray(c, dtype=np.float64) / voxel_size).astype(np.int64) for c in (x, y, z)]
+    ix, iy, iz = (c - c.min() for c in cells)
+    ny, nz = iy.max() + 1, iz.max() + 1
+    linear = (ix * ny + iy) * nz + iz
+    _, inverse, counts = np.unique(linear, return_inverse=True, return_counts=True)
+    return inverse, counts
+
+
+def split_points(x, y, z, voxel_size=VOXEL_SIZE_PC, near_radius=NEAR_RADIUS_PC,
+                 dense_voxel=DENSE_VOXEL, keep=None):
+    """Маска звезд, которые рисуются по отдельности, и номера вокселей для остальных."""
+    inverse, counts = voxel_index(x, y, z, voxel_size)
+    dist = np.sqrt(np.square(x) + np.square(y) + np.square(z))
+    as_point = (dist < near_radius) | (counts[inverse] <= dense_voxel)
+    if keep is not None:
+        as_point |= np.asarray(keep, dtype=bool)
+    return as_point, inverse
+
+
+def aggregate_voxels(x, y, z, value, inverse, mask):
+    """
+    Средние координаты, число звезд и среднее value по вокселям (только строки mask).
+    NaN в value не участвуют в среднем; воксель без значений получает NaN.
+    Массивы на выходе типизированы (float32 / int32) — так их компактнее писать в HTML.
+    """
+    _, vox = np.unique(inverse[mask], return_inverse=True)
+    n_vox = vox.max() + 1 if len(vox) else 0
+    count = np.bincount(vox, minlength=n_vox)
+    value = np.asarray(value, dtype=np.float64)[mask]
+    has_value = np.isfinite(value)
+    value_sum = np.bincount(vox, weights=np.where(has_value, value, 0.0), minlength=n_vox)
+    value_count = np.bincount(vox, weights=has_value, minlength=n_vox)
+
+    out = {'count': count.astype(np.int32)}
+    for name, c in (('x', x), ('y', y), ('z', z)):
+        out[name] = (np.bincount(vox, weights=np.asarray(c, dtype=np.float64)[mask], minlength=n_vox)
+                     / np.maximum(count, 1)).astype(np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['value'] = np.where(value_count > 0, value_sum / value_count, np.nan).astype(np.float32)
+    return out
+
+
+def build_lod(x, y, z, value, voxel_size=VOXEL_SIZE_PC, near_radius=NEAR_RADIUS_PC,
+              dense_voxel=DENSE_VOXEL, max_markers=MAX_MARKERS, keep=None):
+    """
+    Разбиение каталога на отдельные точки и воксели так, чтобы маркеров было не больше max_markers.
+    1) воксель укрупняется вдвое, пока занятых вокселей больше половины бюджета;
+    2) звезды из keep — всегда точки, остальные кандидаты (ближняя зона и разреженные воксели)
+       берутся от Солнца наружу, пока хватает бюджета; кто не влез — уходит в воксели.
+    Возвращает (индексы отдельных звезд, словарь вокселей, voxel_size, радиус последней точки).
+    """
+    x, y, z = (np.asarray(c, dtype=np.float64) for c in (x, y, z))
+    if len(x) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, aggregate_voxels(x, y, z, x, empty, empty > 0), voxel_size, 0.0
+    while len(voxel_index(x, y, z, voxel_size)[1]) > max_markers // 2:
+        voxel_size *= 2
+
+    as_point, inverse = split_points(x, y, z, voxel_size, near_radius, dense_voxel)
+    forced = np.zeros(len(x), dtype=bool) if keep is None else np.asarray(keep, dtype=bool)
+    candidates = np.flatnonzero(as_point & ~forced)
+    budget = max(max_markers - len(np.unique(inverse)) - int(forced.sum()), 0)
+    dist = np.sqrt(np.square(x) + np.square(y) + np.square(z))
+    if len(candidates) > budget:
+        candidates = candidates[np.argsort(dist[candidates], kind='stable')[:budget]]
+    points = np.union1d(np.flatnonzero(forced), candidates)
+    radius = float(dist[candidates].max()) if len(candidates) else 0.0
+
+    rest = np.ones(len(x), dtype=bool)
+    rest[points] = False
+    return points, aggregate_voxels(x, y, z, value, inverse, rest), voxel_size, radius
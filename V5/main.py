@@ -1,6 +1,14 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
 from data_fetcher import fetch_gaia_data
-from calculator import calculate_distances
+from calculator import calculate_distances, calculate_uncertainties
 from visualizer import plot_by_type
+import startable
+
+# Добавить к результату перцентили расстояний и ошибок (Монте-Карло по parallax_error)
+UNCERTAINTY = False
 
 if __name__ == "__main__":
     # 1. Загрузка
@@ -13,10 +21,12 @@ if __name__ == "__main__":
     else:
         # 2. Расчет
         processed_data = calculate_distances(raw_data)
+        if UNCERTAINTY:
+            processed_data = processed_data.join(calculate_uncertainties(processed_data))
 
         # 3. Результат
         print(f"Средняя ошибка по всей выборке: {processed_data['rel_error'].mean():.2f}%")
-        processed_data.to_csv("improved_stars_data.csv", index=False)
+        startable.write(processed_data, "improved_stars_data.csv")
 
         # 4. Визуализация
         plot_by_type(processed_data)
\ No newline at end of file
@@ -1,18 +1,17 @@
+import os
+import sys
 import matplotlib.pyplot as plt
-from astropy.coordinates import SkyCoord
-import astropy.units as u
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+import galactic
 
 
 def plot_by_type(df):
     print("Подготовка карты погрешностей...")
 
     # Перевод в галактические координаты
-    coords = SkyCoord(ra=df['ra'].values * u.deg,
-                      dec=df['dec'].values * u.deg,
-                      frame='icrs').galactic
-
-    l_raw = coords.l.wrap_at(180 * u.deg).degree
-    b_raw = coords.b.degree
+    l_raw, b_raw = galactic.radec_to_galactic(df['ra'].values, df['dec'].values)
+    l_raw = galactic.wrap_l(l_raw)
 
     plt.figure(figsize=(14, 7))
 
@@ -0,0 +1,24 @@
+import os
+import sys
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_module(version, name):
+    """
+    Импорт скрипта из папки версии (V1...V5) по пути файла.
+    Имена модулей в версиях совпадают (data_fetcher, visualizer), поэтому регистрируем
+    их как '<версия>_<имя>', а папку версии добавляем в sys.path для ее внутренних импортов.
+    """
+    folder = os.path.join(ROOT, version)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    key = f"{version}_{name}"
+    if key in sys.modules:
+        return sys.modules[key]
+    spec = importlib.util.spec_from_file_location(key, os.path.join(folder, name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[key] = module
+    spec.loader.exec_module(module)
+    return module
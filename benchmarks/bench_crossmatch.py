@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from astropy.coordinates import SkyCoord
+import astropy.units as u
+
+from _load import ROOT
+
+sys.path.append(os.path.join(ROOT, 'common'))
+import crossmatch
+
+# Локальный кросс-матч: N источников против M объектов опорного каталога.
+# Запуск: python benchmarks/bench_crossmatch.py [источников] [опорных]
+
+
+def make_reference(m, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ra': rng.uniform(0, 360, m),
+        'dec': np.degrees(np.arcsin(rng.uniform(-1, 1, m))),
+        'phot_g_mean_mag': rng.uniform(8, 21, m),
+        'ref_id': np.arange(m),
+    })
+
+
+def make_sources(ref, n, seed=1, jitter_arcsec=0.3):
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(len(ref), n, replace=False)
+    src = pd.DataFrame({
+        'name': [f"S{i}" for i in range(n)],
+        'ra': ref['ra'].to_numpy()[pick] + rng.normal(0, jitter_arcsec / 3600, n),
+        'dec': ref['dec'].to_numpy()[pick] + rng.normal(0, jitter_arcsec / 3600, n),
+    })
+    return src, pick
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(n=100_000, m=1_000_000):
+    ref = make_reference(m)
+    src, pick = make_sources(ref, n)
+    print(f"Источников: {n:,}, опорный каталог: {m:,}")
+
+    index, t_build = _timed(lambda: crossmatch.build_index(ref['ra'], ref['dec']))
+    print(f"KD-дерево: {t_build:.2f} с")
+
+    nearest, t = _timed(lambda: crossmatch.crossmatch(src, ref, 3, index=index, ref_columns=['ref_id']))
+    ok = (nearest['ref_id'].to_numpy() == pick[nearest.index]).mean()
+    print(f"keep='nearest'   3\": {t:.2f} с, пар {len(nearest):,}, верных {ok:.2%}")
+
+    brightest, t = _timed(lambda: crossmatch.crossmatch(src, ref, 2, index=index, keep='brightest',
+                                                        mag_col='phot_g_mean_mag'))
+    print(f"keep='brightest' 2\": {t:.2f} с, пар {len(brightest):,}")
+
+    # Сверка с astropy на подвыборке: тот же сосед и то же расстояние
+    sub = src.iloc[:2000]
+    c = SkyCoord(sub['ra'].to_numpy() * u.deg, sub['dec'].to_numpy() * u.deg)
+    rc = SkyCoord(ref['ra'].to_numpy() * u.deg, ref['dec'].to_numpy() * u.deg)
+    idx, sep, _ = c.match_to_catalog_sky(rc)
+    ours = crossmatch.crossmatch(sub, ref, 3, index=index, ref_columns=['ref_id'])
+    assert (idx[ours.index] == ours['ref_id'].to_numpy()).all()
+    err = np.abs(sep.arcsec[ours.index] - ours['sep_arcsec'].to_numpy()).max()
+    print(f"Сверка с astropy match_to_catalog_sky: совпадает, max |dsep| = {err:.1e}\"")
+
+    # Правила выбора на тесной паре: яркий дальше, слабый ближе
+    pair = pd.DataFrame({'ra': [10.0, 10.0 + 1.5 / 3600], 'dec': [0.0, 0.0],
+                         'phot_g_mean_mag': [15.0, 12.0], 'ref_id': [0, 1]})
+    star = pd.DataFrame({'name': ['X'], 'ra': [10.0 + 0.2 / 3600], 'dec': [0.0]})
+    assert crossmatch.crossmatch(star, pair, 2, keep='nearest')['ref_id'].iloc[0] == 0
+    assert crossmatch.crossmatch(star, pair, 2, keep='brightest', mag_col='phot_g_mean_mag')['ref_id'].iloc[0] == 1
+    assert len(crossmatch.crossmatch(star, pair, 2, keep='all')) == 2
+    print("Правила keep nearest / brightest / all: OK")
+
+
+if __name__ == "__main__":
+    run(*(int(a) for a in sys.argv[1:3]))
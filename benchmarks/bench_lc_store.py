@@ -0,0 +1,92 @@
+import os
+import time
+import tempfile
+import numpy as np
+
+from _load import load_module
+from stand_ins import write_lightcurve_fits
+
+# Повторная обработка набора кривых: каждая в своем lc.fits (как в кэше lightkurve / mast_products)
+# против одного хранилища V1/lc_store.py. Замеряется полный проход чтения и пересчет периодов.
+# Файлы FITS читаются лучшим из имеющихся способов (lc_fits.load), lk.read — для справки на части.
+# Запуск: python benchmarks/bench_lc_store.py [звезд] [--points=18000]
+N_STARS = 300
+N_POINTS = 18_000   # сектор TESS с каденсом 2 мин
+LK_SAMPLE = 30
+
+
+def make_files(folder, n_stars, n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(n_stars):
+        t = 1400.0 + 27.4 * (i % 60) + np.arange(n_points) / 720.0
+        period = 10 ** rng.uniform(-1, 1.3)
+        flux = 1 + 0.05 * np.sin(2 * np.pi * t / period) + rng.normal(0, 0.005, n_points)
+        path = os.path.join(folder, f"star_{i:05d}_lc.fits")
+        write_lightcurve_fits(path, t, flux, 'TESS', seed=i)
+        paths.append(path)
+    return paths
+
+
+def run(n_stars=N_STARS, n_points=N_POINTS):
+    lc_fits = load_module('V1', 'lc_fits')
+    lc_store = load_module('V1', 'lc_store')
+    periodogram = load_module('V1', 'periodogram')
+    import lightkurve as lk
+
+    folder = tempfile.mkdtemp()
+    print(f"Звезд: {n_stars}, точек в кривой: {n_points}")
+    paths = make_files(folder, n_stars, n_points)
+    fits_mb = sum(os.path.getsize(p) for p in paths) / 1e6
+
+    start = time.perf_counter()
+    store = lc_store.open_store(os.path.join(folder, 'store'))
+    for i, path in enumerate(paths):
+        lc_store.append(store, f"star {i}", lc_fits.load(path))
+    lc_store.flush(store)
+    build = time.perf_counter() - start
+    store_mb = sum(os.path.getsize(os.path.join(store['path'], f))
+                   for f in (lc_store.TIME_FILE, lc_store.FLUX_FILE, lc_store.INDEX_FILE)) / 1e6
+    print(f"FITS: {fits_mb:.0f} МБ в {n_stars} файлах; хранилище: {store_mb:.0f} МБ, сборка {build:.1f} с")
+
+    # 1. Полный проход чтения
+    sample = paths[:LK_SAMPLE]
+    start = time.perf_counter()
+    for path in sample:
+        lk.read(path).remove_nans().normalize().remove_outliers(sigma=5)
+    lk_per_star = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    points_fits = sum(len(lc_fits.load(p)['time']) for p in paths)
+    read_fits = time.perf_counter() - start
+
+    start = time.perf_counter()
+    points_store = sum(len(c['time']) for _, c in lc_store.iter_curves(lc_store.open_store(store['path'])))
+    read_store = time.perf_counter() - start
+    assert points_fits == points_store
+
+    print(f"{'чтение всех кривых':<34}{'с':>8}{'мс/звезду':>12}")
+    print(f"{'  lk.read + очистка (оценка)':<34}{lk_per_star * n_stars:>8.2f}{lk_per_star * 1e3:>12.2f}")
+    print(f"{'  lc_fits.load по файлам':<34}{read_fits:>8.2f}{read_fits / n_stars * 1e3:>12.2f}")
+    print(f"{'  lc_store.iter_curves':<34}{read_store:>8.2f}{read_store / n_stars * 1e3:>12.2f}")
+
+    # 2. Пересчет периодов: чтение по файлам + batch_periodogram против batch_periods по хранилищу
+    start = time.perf_counter()
+    curves = [lc_fits.load(p) for p in paths]
+    by_files = periodogram.batch_periodogram([(c['time'], c['flux']) for c in curves], adaptive=True, n_jobs=1)
+    periods_fits = time.perf_counter() - start
+
+    start = time.perf_counter()
+    by_store = lc_store.batch_periods(store, adaptive=True, n_jobs=1)
+    periods_store = time.perf_counter() - start
+    same = np.allclose(by_files['period'], by_store['period'].to_numpy(), rtol=1e-4)
+    print(f"Пересчет периодов: по файлам {periods_fits:.1f} с, по хранилищу {periods_store:.1f} с "
+          f"(периоды совпадают: {same})")
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    options = dict(a[2:].split('=', 1) for a in args if a.startswith('--') and '=' in a)
+    positional = [a for a in args if a.isdigit()]
+    run(int(positional[0]) if positional else N_STARS, int(options.get('points', N_POINTS)))
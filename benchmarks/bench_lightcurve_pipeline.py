@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import numpy as np
+
+from _load import load_module
+from stand_ins import SyntheticMast
+
+# Пропускная способность V1/main.py (звезд в час) на локальном заменителе MAST:
+# последовательный режим против конвейера с разным числом потоков скачивания и CPU-процессов.
+# Каждая конфигурация начинает с пустого кэша lc_cache в своей временной папке.
+# Запуск: python benchmarks/bench_lightcurve_pipeline.py [звезд] [--latency=0.5] [--failure=0.05]
+#         [--points=15000] [--fetch=1,4,8,16] [--cpu=1,2]
+N_STARS = 40
+LATENCY = 0.5        # секунд на скачивание кривой (поиск — четверть этого)
+FAILURE_RATE = 0.05
+N_POINTS = 15000     # ~ сектор TESS с каденсом 2 минуты
+FETCH_WORKERS = [1, 4, 8, 16]
+
+
+def make_tasks(n, seed=0):
+    """Задания как в main.run_analysis: звезда, координаты и метаданные для расчета расстояния."""
+    rng = np.random.default_rng(seed)
+    tasks = []
+    for i in range(n):
+        v_mag = rng.uniform(9, 14)
+        tasks.append({
+            'star': f"SYN {i:05d}",
+            'ra': float(rng.uniform(0, 360)),
+            'dec': float(np.degrees(np.arcsin(rng.uniform(-1, 1)))),
+            'meta': {
+                'v_mag': v_mag,
+                'i_mag': v_mag - 0.7 if rng.uniform() < 0.5 else np.nan,
+                'j_mag': np.nan,
+                'k_mag': v_mag - 1.5 if rng.uniform() < 0.7 else np.nan,
+                'parallax_mas': float(rng.lognormal(-0.5, 0.7)),
+            },
+        })
+    return tasks
+
+
+def timed_analyze(task, payload):
+    # Выполняется в CPU-процессе конвейера: стадия расчета и ее собственные время/CPU
+    main = load_module('V1', 'main')
+    start, cpu = time.perf_counter(), time.process_time()
+    line, _ = main.analyze_star(task, payload)
+    return line, time.perf_counter() - start, time.process_time() - cpu
+
+
+def _init_worker():
+    # CPU-процессы конвейера импортируют main заново (не fork) — настройку прогона повторяем в них
+    load_module('V1', 'main').PERIOD_CACHE = None
+
+
+def _cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def run_config(main, tasks, archive, pipeline, n_fetch=1, n_cpu=1):
+    """Один прогон main-стадий на заданиях; возвращает словарь метрик."""
+    folder = tempfile.mkdtemp()
+    os.chdir(folder)
+    os.makedirs("plots", exist_ok=True)
+    stats = {'fetch': [], 'compute': [], 'compute_cpu': [], 'write': [], 'written': 0, 'errors': {}}
+    lock = threading.Lock()
+
+    def fetch(task):
+        start = time.perf_counter()
+        try:
+            return main.download_lightcurve(task['ra'], task['dec'], archive=archive)
+        finally:
+            with lock:
+                stats['fetch'].append(time.perf_counter() - start)
+
+    def write(item):
+        line, wall, cpu = item
+        stats['compute'].append(wall)
+        stats['compute_cpu'].append(cpu)
+        if line is not None:
+            start = time.perf_counter()
+            out.write(line)
+            out.flush()
+            stats['write'].append(time.perf_counter() - start)
+            stats['written'] += 1
+
+    def on_error(task, stage, exc):
+        with lock:
+            stats['errors'][stage] = stats['errors'].get(stage, 0) + 1
+
+    failures_before = archive.failures
+    cpu_before = _cpu_seconds()
+    start = time.perf_counter()
+    with open(main.OUTPUT_FILE, 'w', encoding='utf-8') as out:
+        if pipeline:
+            main.run_pipeline(tasks, fetch, timed_analyze, write, n_fetch=n_fetch, n_compute=n_cpu,
+                              queue_size=main.QUEUE_SIZE, on_error=on_error, initializer=_init_worker)
+        else:
+            main.run_serial(tasks, fetch, timed_analyze, write, on_error=on_error)
+    wall = time.perf_counter() - start
+    cpu = _cpu_seconds() - cpu_before
+
+    return {
+        'config': f"конвейер {n_fetch}x{n_cpu}" if pipeline else "последовательно",
+        'wall_s': wall,
+        'stars_per_s': len(tasks) / wall,
+        'stars_per_hour': len(tasks) / wall * 3600,
+        'written': stats['written'],
+        'no_data': len(tasks) - len(stats['compute']) - sum(stats['errors'].values()),
+        'archive_failures': archive.failures - failures_before,
+        'errors': stats['errors'],
+        'fetch_mean_s': float(np.mean(stats['fetch'])) if stats['fetch'] else 0.0,
+        'compute_mean_s': float(np.mean(stats['compute'])) if stats['compute'] else 0.0,
+        'compute_cpu_s': float(np.sum(stats['compute_cpu'])),
+        'write_mean_s': float(np.mean(stats['write'])) if stats['write'] else 0.0,
+        'cpu_s': cpu,
+        'cpu_util': cpu / wall / (os.cpu_count() or 1),
+    }
+
+
+def run(n_stars=N_STARS, latency=LATENCY, failure_rate=FAILURE_RATE, n_points=N_POINTS,
+        fetch_workers=None, cpu_workers=None):
+    main = load_module('V1', 'main')
+    main.PERIOD_CACHE = None  # каждый прогон считает периоды заново
+    fetch_workers = fetch_workers or FETCH_WORKERS
+    cpu_workers = cpu_workers or sorted({1, os.cpu_count() or 1})
+    tasks = make_tasks(n_stars)
+    cwd = os.getcwd()
+
+    print(f"Звезд: {n_stars}, задержка архива {latency} с, отказов {failure_rate:.0%}, "
+          f"точек в кривой {n_points}, ядер: {os.cpu_count()}")
+    configs = [(False, 1, 1)] + [(True, f, c) for c in cpu_workers for f in fetch_workers]
+    results = []
+    try:
+        for pipeline, n_fetch, n_cpu in configs:
+            archive = SyntheticMast(latency=latency, failure_rate=failure_rate, n_points=n_points)
+            results.append(run_config(main, tasks, archive, pipeline, n_fetch, n_cpu))
+    finally:
+        os.chdir(cwd)
+
+    print(f"{'конфигурация':<20}{'время, с':>10}{'звезд/с':>9}{'звезд/ч':>9}{'записано':>10}{'отказы':>8}"
+          f"{'скач., с':>10}{'расчет, с':>11}{'CPU':>7}")
+    for r in results:
+        print(f"{r['config']:<20}{r['wall_s']:>10.1f}{r['stars_per_s']:>9.2f}{r['stars_per_hour']:>9.0f}"
+              f"{r['written']:>10}{r['archive_failures']:>8}{r['fetch_mean_s']:>10.2f}"
+              f"{r['compute_mean_s']:>11.2f}{r['cpu_util']:>7.0%}")
+        if r['errors']:
+            print(f"    ошибки по стадиям: {r['errors']}")
+
+    # Подсказка для выбора N_DOWNLOAD_WORKERS: сколько потоков нужно, чтобы скачивание успевало за CPU
+    serial = results[0]
+    if serial['compute_mean_s'] > 0:
+        ratio = serial['fetch_mean_s'] / serial['compute_mean_s']
+        print(f"Скачивание / расчет на звезду: {ratio:.1f} -> потоков скачивания на один CPU-процесс: "
+              f"~{int(np.ceil(ratio))}")
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = dict(a[2:].split('=', 1) for a in args if a.startswith('--') and '=' in a)
+    positional = [a for a in args if a.isdigit()]
+    run(n_stars=int(positional[0]) if positional else N_STARS,
+        latency=float(options.get('latency', LATENCY)),
+        failure_rate=float(options.get('failure', FAILURE_RATE)),
+        n_points=int(options.get('points', N_POINTS)),
+        fetch_workers=[int(x) for x in options['fetch'].split(',')] if 'fetch' in options else None,
+        cpu_workers=[int(x) for x in options['cpu'].split(',')] if 'cpu' in options else None)
@@ -0,0 +1,81 @@
+import os
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from _load import load_module
+from stand_ins import SyntheticMastArchive
+
+# Поштучный путь (download_lightcurve: lk.search_lightcurve на звезду + search[0].download())
+# против пакетного V1/mast_bulk.py (поиск по участкам неба, выбор продукта, закачка только выбранного)
+# на локальном заменителе MAST. Сравниваются число запросов, объем закачки и время.
+# Запуск: python benchmarks/bench_mast_bulk.py [звезд] [--latency=0.2]
+N_STARS = 300
+LATENCY = 0.2
+CLUSTERED = 0.6  # доля звезд в одном поле ~10x10 градусов (как списки по полю Kepler/балджу)
+
+
+def make_stars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    n_field = int(n * CLUSTERED)
+    ra = np.concatenate([rng.uniform(285, 295, n_field), rng.uniform(0, 360, n - n_field)])
+    dec = np.concatenate([rng.uniform(40, 50, n_field),
+                          np.degrees(np.arcsin(rng.uniform(-1, 1, n - n_field)))])
+    return [(f"SYN {i:05d}", float(ra[i]), float(dec[i])) for i in range(n)]
+
+
+def _cadence_minutes(lc):
+    # LightCurve (поштучно) или словарь массивов lc_fits.read (пакетно)
+    if lc is None:
+        return np.nan
+    time = lc['time'] if isinstance(lc, dict) else lc.time.value
+    return float(np.median(np.diff(time))) * 1440 if len(time) > 1 else np.nan
+
+
+def _report(label, archive, wall, curves, n):
+    cadences = np.array([_cadence_minutes(lc) for lc in curves])
+    got = np.isfinite(cadences)
+    # Каденс, при котором период 0.1 сут (нижняя граница поиска) еще разрешается 10 точками
+    usable = cadences[got] <= 0.1 * 1440 / 10
+    print(f"{label:<12}{archive.requests:>10}{archive.downloads:>10}{archive.bytes / 1e6:>10.1f}{wall:>10.1f}"
+          f"{got.sum():>8}/{n}{usable.mean() if got.any() else 0:>10.0%}")
+
+
+def run(n_stars=N_STARS, latency=LATENCY, n_workers=8):
+    fetcher = load_module('V1', 'data_fetcher')
+    mast_bulk = load_module('V1', 'mast_bulk')
+    stars = make_stars(n_stars)
+    tasks = [{'star': name, 'ra': ra, 'dec': dec} for name, ra, dec in stars]
+    cwd = os.getcwd()
+
+    print(f"Звезд: {n_stars} ({CLUSTERED:.0%} в одном поле), задержка запроса {latency} с, потоков {n_workers}")
+    print(f"{'путь':<12}{'запросов':>10}{'файлов':>10}{'МБ':>10}{'время, с':>10}{'кривых':>10}{'каденс ок':>10}")
+    try:
+        # 1. Поштучно, как в конвейере main.py: n_workers потоков скачивания
+        os.chdir(tempfile.mkdtemp())
+        archive = SyntheticMastArchive(stars, latency=latency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            curves = list(executor.map(
+                lambda t: fetcher.download_lightcurve(t['ra'], t['dec'], archive=archive), tasks))
+        _report("поштучно", archive, time.perf_counter() - start, curves, n_stars)
+
+        # 2. Пакетно: план (поиск + выбор + список файлов), закачка выбранного, чтение с диска
+        os.chdir(tempfile.mkdtemp())
+        archive = SyntheticMastArchive(stars, latency=latency)
+        start = time.perf_counter()
+        with_output = mast_bulk.plan(tasks, service=archive)
+        mast_bulk.download_products(with_output, service=archive, max_workers=n_workers)
+        curves = [mast_bulk.fetch(p, service=archive) if p is not None else None for p in with_output.values()]
+        _report("пакетно", archive, time.perf_counter() - start, curves, n_stars)
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    options = dict(a[2:].split('=', 1) for a in args if a.startswith('--') and '=' in a)
+    positional = [a for a in args if a.isdigit()]
+    run(int(positional[0]) if positional else N_STARS, float(options.get('latency', LATENCY)))
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import resource
+import numpy as np
+import pandas as pd
+
+from _load import ROOT, load_module
+
+# Монте-Карло неопределенности V5 calculator: N звезд x S выборок кусками по процессам.
+# Проверяет, что медиана совпадает с точечной оценкой, ширина dist_ref — с ошибкой параллакса,
+# и что пик памяти не растет с числом звезд (полный куб N x S не создается).
+# Запуск: python benchmarks/bench_montecarlo.py [звезд] [выборок]
+
+
+def make_stars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    parallax = rng.uniform(0.2, 3, n)
+    return pd.DataFrame({
+        'period': 10 ** rng.uniform(-0.4, 1.5, n),
+        'sub_type': rng.choice(['DCEP', 'T2CEP', 'RRAB', 'RRC'], n),
+        'v_mag': rng.uniform(8, 18, n),
+        'parallax': parallax,
+        'parallax_error': parallax * 0.05,
+    })
+
+
+def run(n=1_000_000, n_samples=1000):
+    calculator = load_module('V5', 'calculator')
+    df = make_stars(n)
+    df = calculator.calculate_distances(df)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    start = time.perf_counter()
+    result = calculator.calculate_uncertainties(df, n_samples=n_samples)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    cube_mb = n * n_samples * 4 / 2 ** 20
+
+    print(f"{n:,} звезд x {n_samples} выборок: {elapsed:.1f} с на {os.cpu_count()} ядрах, "
+          f"пик памяти {rss_before:.0f} -> {rss_after:.0f} МБ (один куб float32 был бы {cube_mb:,.0f} МБ)")
+
+    width = (result['dist_ref_p84'] - result['dist_ref_p16']) / 2 / df['dist_ref']
+    shift = np.median(np.abs(result['rel_error_p50'] - df['rel_error']))
+    print(f"Полуширина dist_ref / dist_ref: {np.median(width):.4f} (ошибка параллакса 5%), "
+          f"|медиана rel_error - точечная|: {shift:.2f}%")
+    assert abs(np.median(width) - 0.05) < 0.005
+
+
+if __name__ == "__main__":
+    run(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,76 @@
+import os
+import time
+import tempfile
+import numpy as np
+
+from _load import load_module
+
+# Повторный прогон стадии расчета main.py по готовому набору кривых: без кэша периодов,
+# с холодным кэшем (первый прогон) и с теплым (как после правки формул расстояний / порогов Av).
+# Плюс проверка, что параллельные CPU-процессы пишут в одну базу без ошибок блокировки.
+# Запуск: python benchmarks/bench_period_cache.py [звезд] [--points=18000]
+N_STARS = 200
+N_POINTS = 18_000
+
+
+def make_tasks(n_stars, n_points, seed=0):
+    rng = np.random.default_rng(seed)
+    tasks = []
+    for i in range(n_stars):
+        t = 1400.0 + np.arange(n_points) / 720.0
+        period = 10 ** rng.uniform(-0.9, 1.3)
+        flux = 1 + 0.05 * np.sin(2 * np.pi * t / period) + rng.normal(0, 0.005, n_points)
+        v_mag = float(rng.uniform(9, 15))
+        meta = {'v_mag': v_mag, 'i_mag': v_mag - 0.7, 'j_mag': np.nan, 'k_mag': v_mag - 1.5,
+                'parallax_mas': float(rng.lognormal(-0.5, 0.7))}
+        curve = {'time': t, 'flux': flux.astype(np.float32), 'clean': True}
+        tasks.append(({'star': f"SYN {i:05d}", 'ra': 0.0, 'dec': 0.0, 'meta': meta}, curve))
+    return tasks
+
+
+def _pass(main, tasks):
+    start = time.perf_counter()
+    lines = [main.analyze_star(task, curve)[0] for task, curve in tasks]
+    return time.perf_counter() - start, lines
+
+
+def _analyze(item):
+    main = load_module('V1', 'main')
+    task, curve = item
+    return main.analyze_star(task, curve)[0]
+
+
+def run(n_stars=N_STARS, n_points=N_POINTS):
+    from concurrent.futures import ProcessPoolExecutor
+    main = load_module('V1', 'main')
+    period_cache = load_module('V1', 'period_cache')
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("plots", exist_ok=True)
+    tasks = make_tasks(n_stars, n_points)
+    print(f"Звезд: {n_stars}, точек в кривой: {n_points}")
+
+    main.PERIOD_CACHE = None
+    plain, reference = _pass(main, tasks)
+    main.PERIOD_CACHE = "period_cache.sqlite"
+    cold, _ = _pass(main, tasks)
+    warm, lines = _pass(main, tasks)
+    info = period_cache.stats(main.PERIOD_CACHE)
+    print(f"без кэша {plain:.1f} с, холодный кэш {cold:.1f} с, теплый {warm:.2f} с "
+          f"({warm / n_stars * 1e3:.1f} мс/звезду); строки совпадают: {lines == reference}")
+    print(f"база: {info['entries']} записей, {info['mb']:.1f} МБ "
+          f"({info['mb'] * 1e3 / max(info['entries'], 1):.0f} КБ на звезду со спектром)")
+
+    # Параллельная запись в одну базу из процессов (как CPU-воркеры конвейера)
+    main.PERIOD_CACHE = "period_cache_parallel.sqlite"
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        parallel = list(pool.map(_analyze, tasks, chunksize=4))
+    info = period_cache.stats(main.PERIOD_CACHE)
+    print(f"4 процесса: {info['entries']} записей, строки совпадают: {parallel == reference}")
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    options = dict(a[2:].split('=', 1) for a in args if a.startswith('--') and '=' in a)
+    positional = [a for a in args if a.isdigit()]
+    run(int(positional[0]) if positional else N_STARS, int(options.get('points', N_POINTS)))
@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from _load import ROOT
+
+sys.path.append(os.path.join(ROOT, 'common'))
+import startable
+
+# CSV против типизированного Parquet (common/startable.py) на таблице вида stars_calculated.csv:
+# время чтения и память DataFrame — целиком и только ra/dec/rel_error, как в plot_errors.py.
+# Запуск: python benchmarks/bench_startable.py [число_строк]
+
+
+def make_stars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'source_id': rng.integers(1, 2 ** 62, n),
+        'name': np.char.add('Gaia DR3 ', rng.integers(1, 10 ** 12, n).astype(str)),
+        'ra': rng.uniform(0, 360, n),
+        'dec': np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+        'sp_type': rng.choice(['DCEP', 'T2CEP', 'RRAB', 'RRC', 'SR', 'M'], n),
+        'v_mag': rng.uniform(8, 20, n),
+        'parallax': rng.uniform(0.05, 5, n),
+        'dist_ref': 10 ** rng.uniform(2, 4.3, n),
+        'period': 10 ** rng.uniform(-0.6, 2, n),
+        'M_calc': rng.uniform(-6, 1, n).round(3),
+        'dist_pl': 10 ** rng.uniform(2, 4.3, n),
+        'abs_error': rng.normal(0, 500, n).round(2),
+        'rel_error': rng.normal(10, 40, n).round(2),
+    })
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def _mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def run(n=1_000_000):
+    df = make_stars(n)
+    print(f"Строк: {n:,}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stars_calculated.csv')
+        df.to_csv(path, index=False)
+        _, t_write = _timed(lambda: startable.write(df, path, keep_csv=False))
+        print(f"Размер: CSV {os.path.getsize(path) / 2 ** 20:.0f} МБ, "
+              f"Parquet {os.path.getsize(startable.parquet_path(path)) / 2 ** 20:.0f} МБ (запись {t_write:.2f} с)")
+
+        csv_full, t_csv = _timed(lambda: pd.read_csv(path))
+        pq_full, t_pq = _timed(lambda: startable.read(path))
+        print(f"Вся таблица:        CSV {t_csv:.2f} с / {_mb(csv_full):.0f} МБ, "
+              f"Parquet {t_pq:.2f} с / {_mb(pq_full):.0f} МБ (x{t_csv / t_pq:.1f} по времени, "
+              f"x{_mb(csv_full) / _mb(pq_full):.1f} по памяти)")
+
+        columns = ['ra', 'dec', 'rel_error']
+        csv_cols, t_csv = _timed(lambda: pd.read_csv(path, usecols=columns))
+        pq_cols, t_pq = _timed(lambda: startable.read(path, columns=columns))
+        print(f"ra/dec/rel_error:   CSV {t_csv:.2f} с / {_mb(csv_cols):.0f} МБ, "
+              f"Parquet {t_pq:.2f} с / {_mb(pq_cols):.0f} МБ (x{t_csv / t_pq:.1f} по времени)")
+
+        # Схема: точность координат не теряется, float32 — в пределах округления CSV
+        assert pq_full['ra'].dtype == np.float64 and np.array_equal(pq_full['ra'], df['ra'])
+        assert pq_full['source_id'].dtype == np.int64 and np.array_equal(pq_full['source_id'], df['source_id'])
+        assert isinstance(pq_full['sp_type'].dtype, pd.CategoricalDtype)
+        assert np.allclose(pq_full['rel_error'], csv_full['rel_error'], rtol=1e-6)
+
+        # Потоковая запись дает тот же файл, что и запись целиком
+        writer = startable.open_writer(path, keep_csv=False)
+        for start in range(0, n, 200_000):
+            startable.write_chunk(writer, df.iloc[start:start + 200_000])
+        startable.close_writer(writer)
+        chunked = startable.read(path)
+        assert chunked.astype({'sp_type': object}).equals(pq_full.astype({'sp_type': object}))
+        print("Схема и потоковая запись: OK")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,285 @@
+import os
+import io
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from _load import ROOT, load_module
+
+sys.path.append(os.path.join(ROOT, 'common'))
+
+# Набор бенчмарков по синтетическому каталогу (benchmarks/synthetic.py): время и пик памяти
+# каждой стадии расчета/карт на разных размерах, сравнение с сохраненными базовыми значениями.
+# Каждый случай запускается в отдельном свежем процессе, чтобы пик RSS не смешивался.
+# Запуск: python benchmarks/bench_suite.py [строк ...] [--case=имя] [--save]
+#   --save — записать результаты как новые базовые значения (BASELINE_FILE)
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+WALL_TOLERANCE = 1.5  # медленнее базового в 1.5 раза — регрессия
+RSS_TOLERANCE = 1.3
+GRID_RADIUS_PC = 5000.0
+SAMPLE_INTERVAL_S = 0.01
+
+
+def _rss_mb(pid=None):
+    """RSS процесса pid (по умолчанию текущего) вместе со всеми его потомками, МБ."""
+    pid = pid or os.getpid()
+    children, rss = {}, {}
+    page = os.sysconf('SC_PAGE_SIZE')
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Имя процесса в скобках может содержать пробелы — поля считаем после ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{entry}/statm') as f:
+                rss[int(entry)] = int(f.read().split()[1]) * page
+        except (OSError, IndexError, ValueError):
+            continue  # процесс успел завершиться
+        children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total / 2**20
+
+
+class _RssSampler:
+    """Фоновый поток: пик RSS (с потомками) только на время замера, а не с начала процесса."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while True:
+            self.peak = max(self.peak, _rss_mb())
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _maxrss_mb(who):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+# --- Случаи: setup(n) готовит данные (не входит в замер) и возвращает функцию для замера ---
+
+def case_calculate_errors(n):
+    import synthetic
+    calc = load_module('V4', 'calculate_errors')
+    df = synthetic.make_catalog(n, 'v4')
+    return lambda: calc.calculate_chunk(calc.drop_incomplete(df))
+
+
+def case_calculate_errors_streaming(n):
+    import synthetic
+    calc = load_module('V4', 'calculate_errors')
+    tmp = tempfile.mkdtemp()
+    src = os.path.join(tmp, 'stars_with_periods.csv')
+    synthetic.make_catalog(n, 'v4').to_csv(src, index=False)
+    return lambda: calc.process_calculations_streaming(src, os.path.join(tmp, 'stars_calculated.csv'))
+
+
+def case_calculate_distances(n):
+    import synthetic
+    calculator = load_module('V5', 'calculator')
+    df = synthetic.make_catalog(n, 'v5')
+    return lambda: calculator.calculate_distances(df)
+
+
+def case_galactic(n):
+    import synthetic
+    import galactic
+    df = synthetic.make_catalog(n, 'v5')
+    dist = 1000.0 / df['parallax'].to_numpy(dtype=float)
+
+    def run():
+        l, b = galactic.radec_to_galactic(df['ra'].to_numpy(), df['dec'].to_numpy())
+        return galactic.galactic_xyz(l, b, dist)
+    return run
+
+
+def case_error_map(n):
+    import synthetic
+    calc = load_module('V4', 'calculate_errors')
+    plot = load_module('V4', 'plot_errors')
+    df = calc.calculate_chunk(calc.drop_incomplete(synthetic.make_catalog(n, 'v4')))
+    return lambda: plot._map_chunk(df[['ra', 'dec', 'rel_error']])
+
+
+def case_lod(n):
+    import synthetic
+    import galactic
+    lod = load_module('V5', 'lod')
+    df = synthetic.make_catalog(n, 'v5')
+    l, b = galactic.radec_to_galactic(df['ra'].to_numpy(), df['dec'].to_numpy())
+    x, y, z = galactic.galactic_xyz(l, b, 1000.0 / df['parallax'].to_numpy(dtype=float))
+    value = df['v_mag'].to_numpy(dtype=float)
+    return lambda: lod.build_lod(x, y, z, value)
+
+
+def case_extinction_grid(n):
+    import synthetic
+    import galactic
+    import extinction_grid
+    df = synthetic.make_catalog(n, 'v5')
+    l, b = galactic.radec_to_galactic(df['ra'].to_numpy(), df['dec'].to_numpy())
+    x, y, z = galactic.galactic_xyz(l, b, 1000.0 / df['parallax'].to_numpy(dtype=float))
+    value = df['v_mag'].to_numpy(dtype=float)
+    # Синтетические параллаксы у шумового предела дают десятки кпк — сетку берем по окрестности
+    extent = ((-GRID_RADIUS_PC, GRID_RADIUS_PC),) * 3
+    return lambda: extinction_grid.build_grid(x, y, z, value, voxel_size=100.0, extent=extent, smooth_sigma=1.0)
+
+
+def _write_lightcurve_file(n, path):
+    import numpy as np
+    from stand_ins import write_lightcurve_fits
+    rng = np.random.default_rng(0)
+    t = 120.0 + np.arange(n) / 1440.0
+    flux = 1 + 0.05 * np.sin(2 * np.pi * t / 0.6) + rng.normal(0, 0.002, n)
+    flux[rng.uniform(size=n) < 0.001] += 0.5
+    write_lightcurve_fits(path, t, flux, 'Kepler')
+
+
+def _lightcurve_file(n):
+    # Длинная кривая Kepler (короткий каденс, 1 мин) в формате lc.fits со всеми колонками.
+    # Файл пишется в отдельном процессе — иначе его генерация задает пик RSS замера
+    path = os.path.join(tempfile.mkdtemp(), 'kplr_slc.fits')
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pool.submit(_write_lightcurve_file, n, path).result()
+    return path
+
+
+def case_lightcurve_read_lk(n):
+    # Как было: lk.read -> remove_nans().normalize().remove_outliers()
+    import lightkurve as lk
+    path = _lightcurve_file(n)
+    return lambda: lk.read(path).remove_nans().normalize().remove_outliers(sigma=5)
+
+
+def case_lightcurve_read_lean(n):
+    lc_fits = load_module('V1', 'lc_fits')
+    path = _lightcurve_file(n)
+    return lambda: lc_fits.load(path)
+
+
+CASES = {
+    'calculate_errors': case_calculate_errors,
+    'calculate_errors_streaming': case_calculate_errors_streaming,
+    'calculate_distances': case_calculate_distances,
+    'galactic': case_galactic,
+    'error_map': case_error_map,
+    'lod': case_lod,
+    'extinction_grid': case_extinction_grid,
+    'lightcurve_read_lk': case_lightcurve_read_lk,
+    'lightcurve_read_lean': case_lightcurve_read_lean,
+}
+
+
+def _measure(name, n):
+    # Выполняется в отдельном процессе. Пик — только за время run(): ru_maxrss процесса копится
+    # с самого старта и включал бы память setup, поэтому RSS опрашивается фоновым потоком.
+    # Если ru_maxrss вырос именно во время run(), это точный пик процесса — берем его тоже
+    # (короткие всплески между опросами иначе теряются)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run = CASES[name](n)
+        rss_before = _rss_mb()
+        self_before = _maxrss_mb(resource.RUSAGE_SELF)
+        children_before = _maxrss_mb(resource.RUSAGE_CHILDREN)
+        with _RssSampler() as sampler:
+            start = time.perf_counter()
+            run()
+            wall = time.perf_counter() - start
+        self_after = _maxrss_mb(resource.RUSAGE_SELF)
+        children_after = _maxrss_mb(resource.RUSAGE_CHILDREN)
+    peak = max(sampler.peak,
+               self_after if self_after > self_before else 0.0,
+               children_after if children_after > children_before else 0.0)
+    return {'wall_s': round(wall, 4), 'peak_rss_mb': round(peak, 1), 'extra_rss_mb': round(max(peak - rss_before, 0), 1)}
+
+
+def measure(name, n):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_measure, name, n).result()
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {'machine': {}, 'cases': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(result, base):
+    """Список претензий к результату относительно базового (пустой — все в норме)."""
+    problems = []
+    if base is None:
+        return problems
+    if result['wall_s'] > base['wall_s'] * WALL_TOLERANCE and result['wall_s'] - base['wall_s'] > 0.05:
+        problems.append(f"время x{result['wall_s'] / base['wall_s']:.2f}")
+    if result['extra_rss_mb'] > base['extra_rss_mb'] * RSS_TOLERANCE and result['extra_rss_mb'] - base['extra_rss_mb'] > 20:
+        problems.append(f"память +{result['extra_rss_mb'] - base['extra_rss_mb']:.0f} МБ")
+    return problems
+
+
+def run(rows=None, cases=None, save=False):
+    rows = rows or DEFAULT_ROWS
+    cases = cases or list(CASES)
+    baselines = load_baselines()
+    results = {}
+    regressions = 0
+
+    print(f"{'случай':<28}{'строк':>12}{'время, с':>11}{'пик, МБ':>10}{'+RSS, МБ':>10}  сравнение")
+    for name in cases:
+        for n in rows:
+            result = measure(name, n)
+            results.setdefault(name, {})[str(n)] = result
+            base = baselines['cases'].get(name, {}).get(str(n))
+            problems = compare(result, base)
+            regressions += bool(problems)
+            if base is None:
+                verdict = "нет базового"
+            elif problems:
+                verdict = "РЕГРЕССИЯ: " + ", ".join(problems)
+            else:
+                verdict = f"ok (база {base['wall_s']:.3f} с)"
+            print(f"{name:<28}{n:>12,}{result['wall_s']:>11.3f}{result['peak_rss_mb']:>10.0f}"
+                  f"{result['extra_rss_mb']:>10.0f}  {verdict}")
+
+    if save:
+        for name, by_rows in results.items():
+            baselines['cases'].setdefault(name, {}).update(by_rows)
+        baselines['machine'] = {'cpu_count': os.cpu_count(), 'platform': platform.platform(),
+                                'python': platform.python_version()}
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"Базовые значения сохранены в {BASELINE_FILE}")
+    return results, regressions
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    rows = [int(a) for a in args if a.isdigit()]
+    cases = [a.split('=', 1)[1] for a in args if a.startswith('--case=')]
+    _, n_regressions = run(rows, cases, save='--save' in args)
+    sys.exit(1 if n_regressions else 0)
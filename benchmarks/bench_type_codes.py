@@ -0,0 +1,76 @@
+import time
+import numpy as np
+import pandas as pd
+
+from _load import load_module
+
+# Сравнение: построчный df.apply(..., axis=1) против таблицы кодов типов.
+# Запуск: python benchmarks/bench_type_codes.py [число_строк]
+
+V2_V4_TYPES = ['CEP', 'RR', 'DCEP', 'RRAB', 'RRC', 'SR', 'M', 'C-N5', 'EA', 'ROT', None]
+V5_TYPES = ['DCEP', 'T2CEP', 'CW', 'ACEP', 'RRab', 'RRc', 'RRd', None]
+
+
+def _legacy_m_abs_v4(period, star_type):
+    # Копия старого calculate_absolute_magnitude из V2-V4/calculate_errors.py — эталон для сверки
+    if pd.isna(period) or period <= 0:
+        return np.nan
+    stype = str(star_type).upper()
+    if 'CEP' in stype or 'DCEP' in stype:
+        return -2.76 * np.log10(period) - 1.45
+    elif 'RR' in stype:
+        return -1.87 * np.log10(period) - 0.64
+    elif 'C-' in stype or 'SR' in stype or 'M' in stype:
+        return -2.0 * np.log10(period) + 1.0
+    return np.nan
+
+
+def _legacy_m_abs_v5(row):
+    # Копия старого get_m_abs из V5/calculator.py — эталон для сверки
+    p = row['period']
+    st = str(row['sub_type']).upper()
+    if 'DCEP' in st:
+        return -2.76 * np.log10(p) - 1.45
+    elif 'T2CEP' in st or 'CW' in st:
+        return -1.64 * np.log10(p) - 0.65
+    elif 'RR' in st:
+        return -1.87 * np.log10(p) - 0.64
+    return np.nan
+
+
+def make_rows(n, types, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'period': 10 ** rng.uniform(-0.6, 1.7, n),
+        'type': rng.choice(np.array(types, dtype=object), n),
+    })
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(n=1_000_000):
+    v4 = load_module('V4', 'calculate_errors')
+    v5 = load_module('V5', 'calculator')
+
+    print(f"Строк: {n:,}")
+
+    df = make_rows(n, V2_V4_TYPES)
+    old, t_old = _timed(lambda: df.apply(lambda row: _legacy_m_abs_v4(row['period'], row['type']), axis=1))
+    new, t_new = _timed(lambda: v4.absolute_magnitude_array(df['period'].to_numpy(), df['type'].to_numpy()))
+    assert np.allclose(old.to_numpy(dtype=float), new, equal_nan=True)
+    print(f"V2-V4 M по типу VSX:             apply {t_old:.2f} с, коды типов {t_new:.3f} с (x{t_old / t_new:.0f})")
+
+    df = make_rows(n, V5_TYPES, seed=1).rename(columns={'type': 'sub_type'})
+    old, t_old = _timed(lambda: df.apply(_legacy_m_abs_v5, axis=1))
+    new, t_new = _timed(lambda: v5.absolute_magnitude_array(df['period'].to_numpy(), df['sub_type'].to_numpy()))
+    assert np.allclose(old.to_numpy(dtype=float), new, equal_nan=True)
+    print(f"V5 get_m_abs:                    apply {t_old:.2f} с, коды типов {t_new:.3f} с (x{t_old / t_new:.0f})")
+
+
+if __name__ == "__main__":
+    import sys
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from _load import load_module, ROOT
+from stand_ins import SyntheticGaiaTap
+
+# Проверка параллельной закачки Gaia по частям на локальном заменителе TAP:
+# один диапазон неба падает (в обоих запросах) -> повторный запуск докачивает только его ->
+# итог совпадает с каталогом.
+
+
+def run():
+    import sys
+    sys.path.append(os.path.join(ROOT, 'common'))
+    import gaia_partitions
+    gaia_partitions.RETRY_DELAY = 0.0
+
+    fetcher = load_module('V5', 'data_fetcher')
+    parts = gaia_partitions.source_id_partitions(fetcher.N_PARTITIONS)
+    tap = SyntheticGaiaTap(broken_ranges={parts[5][0]}, latency=0.01)
+
+    os.chdir(tempfile.mkdtemp())
+    df = fetcher.fetch_gaia_data(service=tap)
+    assert df.empty, "при упавшей части результат не должен собираться"
+    calls_first = tap.calls
+
+    tap.broken = False
+    df = fetcher.fetch_gaia_data(service=tap)
+    resumed_calls = tap.calls - calls_first
+    expected = len(tap.catalogs['vari_cepheid']['source_id']) + len(tap.catalogs['vari_rrlyrae']['source_id'])
+
+    assert resumed_calls == 2, f"докачка должна запросить только упавшие части, запрошено {resumed_calls}"
+    assert len(df) == expected, (len(df), expected)
+    assert df['source_id'].is_unique
+    assert set(df.columns) >= {'source_id', 'ra', 'dec', 'v_mag', 'parallax', 'period', 'sub_type', 'main_type'}
+    print(f"OK: {len(df)} строк, при повторном запуске докачано 2 части из {2 * fetcher.N_PARTITIONS}")
+
+    # Повторный вызов с теми же запросами берется из кэша, с другими фильтрами — нет
+    calls = tap.calls
+    cached = fetcher.fetch_gaia_data(service=tap)
+    assert tap.calls == calls and len(cached) == len(df)
+    assert str(cached['sub_type'].dtype) == 'category' and cached['v_mag'].dtype == 'float32'
+    fetcher.fetch_gaia_data(service=tap, ruwe_max=1.2)
+    assert tap.calls == calls + 2 * fetcher.N_PARTITIONS
+    fetcher.fetch_gaia_data(service=tap, refresh=True)
+    assert tap.calls == calls + 4 * fetcher.N_PARTITIONS
+    print(f"OK: кэш по ключу запроса, записей: {len(fetcher.query_cache.list_entries())}")
+
+
+if __name__ == "__main__":
+    run()
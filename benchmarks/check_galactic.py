@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+from astropy.coordinates import SkyCoord
+import astropy.units as u
+
+from _load import ROOT
+
+sys.path.append(os.path.join(ROOT, 'common'))
+import galactic
+
+# Сверка матричного ICRS -> Galactic с astropy и проверка кэша l/b/X/Y/Z рядом с данными
+# (Parquet, а без pyarrow — .npz: --npz проверяет этот путь).
+# Запуск: python benchmarks/check_galactic.py [число_звезд]
+
+
+def run(n=1_000_000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'ra': rng.uniform(0, 360, n),
+        'dec': np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+        'dist': 10 ** rng.uniform(1, 4.5, n),
+    })
+    print(f"Звезд: {n:,}")
+
+    start = time.perf_counter()
+    coords = SkyCoord(ra=df['ra'].values * u.deg, dec=df['dec'].values * u.deg,
+                      distance=df['dist'].values * u.pc, frame='icrs').galactic
+    ref_l, ref_b = coords.l.degree, coords.b.degree
+    ref_xyz = coords.cartesian.xyz.value
+    t_astropy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gal = galactic.galactic_columns(df, dist_col='dist')
+    t_matrix = time.perf_counter() - start
+    print(f"SkyCoord.galactic: {t_astropy:.2f} с, матрица: {t_matrix:.2f} с")
+
+    sep = SkyCoord(gal['l'].values * u.deg, gal['b'].values * u.deg, frame='galactic').separation(
+        SkyCoord(ref_l * u.deg, ref_b * u.deg, frame='galactic')).to(u.mas).value
+    assert sep.max() < 1.0
+    rel_xyz = np.abs(gal[['X', 'Y', 'Z']].to_numpy().T - ref_xyz).max() / df['dist'].max()
+    assert rel_xyz < 1e-12
+    wrap = np.abs(galactic.wrap_l(gal['l']) - coords.l.wrap_at(180 * u.deg).degree).max() * 3.6e6
+    print(f"Макс. расхождение с astropy: {sep.max():.1e} mas, wrap_at(180): {wrap:.1e} mas, XYZ: {rel_xyz:.1e}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'stars.csv')
+        first = galactic.galactic_columns(df, dist_col='dist', cache_path=data_path)
+        start = time.perf_counter()
+        again = galactic.galactic_columns(df, dist_col='dist', cache_path=data_path)
+        t_hit = time.perf_counter() - start
+        assert np.array_equal(first.to_numpy(), again.to_numpy())
+        print(f"Кэш {os.path.basename(galactic.sidecar_path(data_path, dist_col='dist'))}: повторный вызов {t_hit:.2f} с "
+              f"(без кэша {t_matrix:.2f} с, SkyCoord {t_astropy:.2f} с)")
+
+        # Вызов с другим набором колонок (как plot_errors после visualizer3D) не затирает кэш
+        flat = galactic.galactic_columns(df, cache_path=data_path)
+        assert list(flat.columns) == ['l', 'b']
+        start = time.perf_counter()
+        again = galactic.galactic_columns(df, dist_col='dist', cache_path=data_path)
+        assert np.array_equal(first.to_numpy(), again.to_numpy())
+        print(f"Кэш с X/Y/Z после вызова без дистанции: {time.perf_counter() - start:.2f} с")
+
+        # Поменялись дистанции — кэш не подходит, считаем заново
+        moved = df.assign(dist=df['dist'] * 2)
+        fresh = galactic.galactic_columns(moved, dist_col='dist', cache_path=data_path)
+        assert np.allclose(fresh['X'], first['X'] * 2)
+        print("Изменение данных сбрасывает кэш: OK")
+
+
+if __name__ == "__main__":
+    if '--npz' in sys.argv[1:]:
+        galactic.pa = galactic.pq = None
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    run(int(args[0]) if args else 1_000_000)
@@ -0,0 +1,92 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from _load import load_module
+from stand_ins import SyntheticSimbadTap
+
+# Проверка пакетного SIMBAD (V1/simbad_meta.py) на локальном заменителе TAP:
+# один запрос на кусок вместо запроса на звезду, поиск по имени и по координатам,
+# кэш по имени (повторный запуск не ходит в сеть), get_star_metadata через тот же кэш,
+# повторный запрос устаревших ответов "не найдено".
+# Запуск: python benchmarks/check_simbad_bulk.py [число_звезд]
+
+
+def make_stars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ra = rng.uniform(0, 360, n)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    return [(f"V* SYN {i:06d}", float(ra[i]), float(dec[i])) for i in range(n)]
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is b
+    return all(np.isclose(a[k], b[k], equal_nan=True) for k in a)
+
+
+def run(n=20000):
+    os.chdir(tempfile.mkdtemp())
+    simbad_meta = load_module('V1', 'simbad_meta')
+    fetcher = load_module('V1', 'data_fetcher')
+
+    stars = make_stars(n)
+    tap = SyntheticSimbadTap(stars, latency=0.05)
+    candidates = [{'name': name, 'ra': ra, 'dec': dec} for name, ra, dec in stars]
+
+    start = time.perf_counter()
+    meta = simbad_meta.resolve(candidates, service=tap, chunk_size=5000)
+    elapsed = time.perf_counter() - start
+    n_chunks = -(-n // 5000)
+    assert tap.calls == 2 * n_chunks, f"ожидалось {2 * n_chunks} запросов, было {tap.calls}"
+    assert len(meta) == n
+
+    # Сверка с "небом" заменителя: найдены ровно известные SIMBAD звезды, с их величинами
+    known = {o['main_id']: o for o in tap.objects}
+    by_name = sum(1 for name, _, _ in stars if name in known)
+    found = [name for name, m in meta.items() if m is not None]
+    assert len(found) == len(tap.objects), (len(found), len(tap.objects))
+    for name in found[:200]:
+        obj = known.get(name)
+        if obj is not None:
+            assert np.isclose(meta[name]['v_mag'], obj['v_mag'])
+            assert np.isnan(meta[name]['k_mag']) == np.isnan(obj['k_mag'])
+    print(f"OK: {n} звезд за {elapsed:.2f} с, {tap.calls} запросов к TAP "
+          f"(по имени {by_name}, по координатам {len(found) - by_name}, не найдено {n - len(found)})")
+
+    # Повторный запуск и одиночный вызов — из кэша, без запросов
+    calls = tap.calls
+    again = simbad_meta.resolve(candidates, service=tap)
+    single = fetcher.get_star_metadata(stars[0][0], stars[0][1], stars[0][2], service=tap)
+    assert tap.calls == calls and again.keys() == meta.keys()
+    assert _same(single, meta[stars[0][0]])
+    print(f"OK: повторный запуск и get_star_metadata взяты из кэша ({simbad_meta.CACHE_FILE})")
+
+    # Новые звезды догружаются одним запросом, старые не переспрашиваются
+    extra = make_stars(50, seed=1)
+    extra = [(name.replace("SYN", "NEW"), ra, dec) for name, ra, dec in extra]
+    simbad_meta.resolve(candidates + [{'name': n_, 'ra': r, 'dec': d} for n_, r, d in extra],
+                        service=SyntheticSimbadTap(extra))
+    assert len(simbad_meta.load_cache()) == n + 50
+    print("OK: дозагрузка только новых звезд")
+
+    # Ответ "не найдено" старше NOT_FOUND_TTL_DAYS запрашивается снова, найденные — нет
+    cache = simbad_meta.load_cache()
+    not_found = cache['match'] == 'none'
+    cache.loc[not_found, 'fetched_at'] = '2000-01-01T00:00:00+00:00'
+    simbad_meta.save_cache(cache)
+    expired = int(not_found[not_found.index.str.contains('SYN')].sum())
+    tap.uploaded_rows = 0
+    simbad_meta.resolve(candidates, service=tap)
+    # Не найденные ни по имени, ни по координатам уходят в оба запроса
+    assert tap.uploaded_rows == 2 * expired, (tap.uploaded_rows, expired)
+    fetched_at = pd.to_datetime(simbad_meta.load_cache().loc[[name for name, _, _ in stars], 'fetched_at'], utc=True)
+    assert (fetched_at > pd.Timestamp('2001-01-01', tz='UTC')).all()
+    print(f"OK: {expired} устаревших \"не найдено\" запрошены снова")
+
+
+if __name__ == "__main__":
+    import sys
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,470 @@
+import re
+import zlib
+import time
+import threading
+import numpy as np
+import pandas as pd
+from astropy.table import Table
+
+# Локальные заменители внешних сервисов для проверок и бенчмарков (без сети)
+
+SOURCE_ID_MAX = 12 * 4 ** 12 * 2 ** 35
+
+
+class _Job:
+    def __init__(self, table):
+        self._table = table
+
+    def get_results(self):
+        return self._table
+
+
+def _select_columns(query):
+    """Разбор списка SELECT: [(выражение, псевдоним), ...]."""
+    body = re.search(r"SELECT\s+(.*?)\s+FROM\s", query, re.S | re.I).group(1)
+    body = re.sub(r"^TOP\s+\d+\s+", "", body.strip(), flags=re.I)
+    columns = []
+    for item in body.split(","):
+        item = item.strip()
+        match = re.match(r"(.+?)\s+AS\s+(\w+)$", item, re.I)
+        expr, alias = (match.group(1).strip(), match.group(2)) if match else (item, item.split(".")[-1])
+        columns.append((expr, alias))
+    return columns
+
+
+class SyntheticGaiaTap:
+    """
+    Заменитель astroquery.gaia.Gaia: launch_job_async(query) -> job.get_results().
+    Небо — фиксированный синтетический каталог Цефеид и RR Лир; запрос отдает строки
+    из диапазона 'source_id BETWEEN lo AND hi' и колонки из списка SELECT.
+    broken_ranges — множество lo, на которых сервис падает, пока broken=True.
+    """
+
+    def __init__(self, n_sources=20000, seed=0, latency=0.0, broken_ranges=()):
+        self.latency = latency
+        self.broken = True
+        self.broken_ranges = set(broken_ranges)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.catalogs = {
+            'vari_cepheid': self._make_catalog(n_sources // 10, seed, ['DCEP', 'T2CEP', 'ACEP'], (0.2, 1.8)),
+            'vari_rrlyrae': self._make_catalog(n_sources, seed + 1, ['RRab', 'RRc', 'RRd'], (-0.6, 0.0)),
+        }
+
+    @staticmethod
+    def _make_catalog(n, seed, types, log_period_range):
+        rng = np.random.default_rng(seed)
+        parallax = rng.lognormal(-0.5, 0.7, n)
+        return {
+            'source_id': np.sort(rng.integers(0, SOURCE_ID_MAX, n, dtype=np.int64)),
+            'ra': rng.uniform(0, 360, n),
+            'dec': np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+            'phot_g_mean_mag': rng.uniform(8, 20, n),
+            'parallax': parallax,
+            'parallax_error': parallax * rng.uniform(0.01, 0.1, n),
+            'ruwe': rng.uniform(0.8, 1.6, n),
+            'pf': 10 ** rng.uniform(*log_period_range, n),
+            'type_best_classification': rng.choice(types, n),
+        }
+
+    def launch_job_async(self, query, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        table_name = 'vari_cepheid' if 'vari_cepheid' in query else 'vari_rrlyrae'
+        catalog = self.catalogs[table_name]
+
+        mask = np.ones(len(catalog['source_id']), dtype=bool)
+        match = re.search(r"source_id\s+BETWEEN\s+(\d+)\s+AND\s+(\d+)", query, re.I)
+        if match:
+            lo, hi = int(match.group(1)), int(match.group(2))
+            if self.broken and lo in self.broken_ranges:
+                raise ConnectionError(f"synthetic TAP failure for range starting at {lo}")
+            mask = (catalog['source_id'] >= lo) & (catalog['source_id'] <= hi)
+
+        table = Table()
+        for expr, alias in _select_columns(query):
+            if expr.startswith("'"):
+                table[alias] = np.full(mask.sum(), expr.strip("'"))
+            else:
+                table[alias] = catalog[expr.split(".")[-1]][mask]
+        return _Job(table)
+
+
+class _SearchRow:
+    def __init__(self, archive, row):
+        self._archive = archive
+        self._row = row
+
+    def download(self, **kwargs):
+        return self._archive.download(self._row)
+
+
+class _SearchResult:
+    def __init__(self, archive, table):
+        self._archive = archive
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, i):
+        return _SearchRow(self._archive, self.table[i])
+
+
+class SyntheticMast:
+    """
+    Заменитель lightkurve для V1/data_fetcher.download_lightcurve(archive=...):
+    search_lightcurve(coord, radius, mission) и SearchResult(table), download() у строки результата.
+
+    У каждой точки неба своя синусоидальная кривая (период, амплитуда и судьба скачивания
+    выводятся из имени продукта, так что одни и те же звезды ведут себя одинаково в любом прогоне).
+    latency / search_latency — задержка скачивания и поиска в секундах, failure_rate — доля
+    скачиваний, падающих с ConnectionError, n_points — длина кривой, missions — где "есть" данные.
+    """
+
+    def __init__(self, latency=0.0, search_latency=None, failure_rate=0.0, n_points=15000,
+                 cadence_min=2.0, missions=('TESS',), seed=0):
+        self.latency = latency
+        self.search_latency = latency / 4 if search_latency is None else search_latency
+        self.failure_rate = failure_rate
+        self.n_points = n_points
+        self.cadence_min = cadence_min
+        self.missions = set(missions)
+        self.seed = seed
+        self.searches = 0
+        self.downloads = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def search_lightcurve(self, target, radius=None, mission=None, **kwargs):
+        self._count('searches')
+        if self.search_latency:
+            time.sleep(self.search_latency)
+        table = Table(names=('target_ra', 'target_dec', 'mission', 'productFilename', 'exptime'),
+                      dtype=(float, float, 'U16', 'U64', float))
+        if mission in self.missions:
+            ra, dec = float(target.ra.deg), float(target.dec.deg)
+            table.add_row((ra, dec, mission, f"synthetic_{mission}_{ra:.5f}_{dec:+.5f}.fits",
+                           self.cadence_min * 60))
+        return self.SearchResult(table)
+
+    def SearchResult(self, table):
+        return _SearchResult(self, table)
+
+    def _rng(self, product):
+        return np.random.default_rng([self.seed, zlib.crc32(product.encode('utf-8'))])
+
+    def download(self, row):
+        import lightkurve as lk
+        from astropy.time import Time
+
+        self._count('downloads')
+        if self.latency:
+            time.sleep(self.latency)
+        rng = self._rng(str(row['productFilename']))
+        if rng.uniform() < self.failure_rate:
+            self._count('failures')
+            raise ConnectionError(f"synthetic MAST failure for {row['productFilename']}")
+
+        n = self.n_points
+        t = 1400.0 + np.arange(n) * self.cadence_min / 1440.0
+        # Разрыв посередине сектора, как у TESS на передаче данных
+        t[n // 2:] += 1.0
+        period = 10 ** rng.uniform(-0.6, 1.4)
+        amplitude = rng.uniform(0.01, 0.3)
+        noise = rng.uniform(0.002, 0.02)
+        flux = 1 + amplitude * np.sin(2 * np.pi * t / period + rng.uniform(0, 2 * np.pi)) + rng.normal(0, noise, n)
+        flux[rng.uniform(size=n) < 0.01] = np.nan
+        return lk.LightCurve(time=Time(t, format='btjd', scale='tdb'), flux=flux,
+                             flux_err=np.full(n, noise))
+
+
+class _TapResult:
+    def __init__(self, table):
+        self._table = table
+
+    def to_table(self):
+        return self._table
+
+
+class SyntheticSimbadTap:
+    """
+    Заменитель SIMBAD TAP для V1/simbad_meta: run_sync(query, uploads={'stars': table}).
+    Понимает два запроса simbad_meta — соединение по ident (имя) и по CONTAINS/CIRCLE (координаты).
+    stars — список (имя, ra, dec) "неба"; доля by_name_fraction известна SIMBAD под тем же именем,
+    еще by_position_fraction — только под другим main_id (находится по координатам), остальные неизвестны.
+    У части звезд нет I/J/K и параллакса (NaN), как в реальном SIMBAD.
+    """
+
+    def __init__(self, stars, by_name_fraction=0.8, by_position_fraction=0.1, latency=0.0, seed=0):
+        self.latency = latency
+        self.calls = 0
+        self.uploaded_rows = 0
+        self._lock = threading.Lock()
+        rng = np.random.default_rng(seed)
+        self.objects = []
+        for name, ra, dec in stars:
+            u = rng.uniform()
+            if u >= by_name_fraction + by_position_fraction:
+                continue
+            v = rng.uniform(6, 14)
+            obj = {
+                'main_id': name if u < by_name_fraction else f"Gaia DR3 {rng.integers(10 ** 17, 10 ** 18)}",
+                # Смещение < 1 угл. сек. — в пределах радиуса поиска по координатам
+                'ra': ra + rng.normal(0, 0.2) / 3600 / max(np.cos(np.radians(dec)), 1e-3),
+                'dec': dec + rng.normal(0, 0.2) / 3600,
+                'v_mag': v,
+                'i_mag': v - 0.8 if rng.uniform() < 0.6 else np.nan,
+                'j_mag': v - 1.2 if rng.uniform() < 0.7 else np.nan,
+                'k_mag': v - 1.6 if rng.uniform() < 0.8 else np.nan,
+                'parallax_mas': rng.lognormal(0, 0.7) if rng.uniform() < 0.9 else np.nan,
+            }
+            self.objects.append(obj)
+        self._by_id = {o['main_id']: o for o in self.objects}
+        self._ra = np.array([o['ra'] for o in self.objects])
+        self._dec = np.array([o['dec'] for o in self.objects])
+
+    def run_sync(self, query, uploads=None, **kwargs):
+        upload = uploads['stars']
+        with self._lock:
+            self.calls += 1
+            self.uploaded_rows += len(upload)
+        if self.latency:
+            time.sleep(self.latency)
+
+        rows = []
+        if re.search(r"JOIN\s+ident", query, re.I):
+            for name in upload['name']:
+                obj = self._by_id.get(str(name))
+                if obj is not None:
+                    rows.append((str(name), obj, None))
+        else:
+            radius = float(re.search(r"CIRCLE\('ICRS',\s*u\.ra,\s*u\.dec,\s*([0-9.eE+-]+)\)", query).group(1))
+            for name, ra, dec in zip(upload['name'], upload['ra'], upload['dec']):
+                cos_d = np.cos(np.radians(dec))
+                dist = np.hypot((self._ra - ra) * cos_d, self._dec - dec)
+                for i in np.flatnonzero(dist <= radius):
+                    rows.append((str(name), self.objects[i], float(dist[i])))
+
+        table = Table()
+        table['name'] = [r[0] for r in rows] or np.array([], dtype='U1')
+        table['main_id'] = [r[1]['main_id'] for r in rows] or np.array([], dtype='U1')
+        table['parallax_mas'] = np.array([r[1]['parallax_mas'] for r in rows], dtype=float)
+        for col in ('v_mag', 'i_mag', 'j_mag', 'k_mag'):
+            table[col] = np.array([r[1][col] for r in rows], dtype=float)
+        if 'CONTAINS' in query:
+            table['dist'] = np.array([r[2] for r in rows], dtype=float)
+        return _TapResult(table)
+
+
+# Колонки официального файла кривой блеска SPOC/Kepler (lc.fits): 20 колонок, ~100 байт на точку
+_LC_COLUMNS = [('TIME', 'D'), ('TIMECORR', 'E'), ('CADENCENO', 'J'), ('SAP_FLUX', 'E'), ('SAP_FLUX_ERR', 'E'),
+               ('SAP_BKG', 'E'), ('SAP_BKG_ERR', 'E'), ('PDCSAP_FLUX', 'E'), ('PDCSAP_FLUX_ERR', 'E'),
+               ('QUALITY', 'J'), ('PSF_CENTR1', 'D'), ('PSF_CENTR1_ERR', 'E'), ('PSF_CENTR2', 'D'),
+               ('PSF_CENTR2_ERR', 'E'), ('MOM_CENTR1', 'D'), ('MOM_CENTR1_ERR', 'E'), ('MOM_CENTR2', 'D'),
+               ('MOM_CENTR2_ERR', 'E'), ('POS_CORR1', 'E'), ('POS_CORR2', 'E')]
+
+
+def write_lightcurve_fits(path, time, flux, telescope='TESS', bad_fraction=0.01, seed=0):
+    """
+    Пишет файл в формате SPOC (TESS) или Kepler lc.fits со всеми колонками, который lk.read
+    распознает как официальный продукт. bad_fraction точек получают флаг качества из маски
+    lightkurve "default" (и NaN в PDCSAP_FLUX у части из них, как в настоящих файлах).
+    """
+    from astropy.io import fits
+    rng = np.random.default_rng(seed)
+    n = len(time)
+    kepler = telescope.lower() == 'kepler'
+    quality = np.zeros(n, dtype=np.int32)
+    bad = rng.uniform(size=n) < bad_fraction
+    quality[bad] = 32                        # разгрузка маховиков: бит 32 в маске default у обеих миссий
+    pdc = np.asarray(flux, dtype=np.float32) * 1e4
+    pdc[bad & (rng.uniform(size=n) < 0.5)] = np.nan
+
+    values = {'TIME': np.asarray(time, dtype=np.float64), 'CADENCENO': np.arange(n),
+              'SAP_FLUX': pdc * 1.02, 'PDCSAP_FLUX': pdc, 'QUALITY': quality}
+    columns = []
+    for name, fmt in _LC_COLUMNS:
+        name = 'SAP_QUALITY' if kepler and name == 'QUALITY' else name
+        data = values.get(name if name != 'SAP_QUALITY' else 'QUALITY')
+        if data is None:
+            data = rng.normal(0, 1, n).astype(np.float64 if fmt == 'D' else np.float32)
+        columns.append(fits.Column(name=name, format=fmt, array=data))
+
+    primary = fits.PrimaryHDU()
+    primary.header['TELESCOP'] = 'Kepler' if kepler else 'TESS'
+    primary.header['CREATOR'] = 'FluxExporter2PipelineModule' if kepler else 'LightCurveExporterPipelineModule'
+    primary.header['ORIGIN'] = 'NASA/Ames'
+    primary.header['OBJECT'] = 'synthetic'
+    table = fits.BinTableHDU.from_columns(columns, name='LIGHTCURVE')
+    table.header['TIMEUNIT'] = 'd'
+    table.header['TIMESYS'] = 'TDB'
+    table.header['BJDREFI'] = 2454833 if kepler else 2457000
+    table.header['BJDREFF'] = 0.0
+    table.header['TUNIT1'] = 'BJD - 2454833' if kepler else 'BJD - 2457000, days'
+    fits.HDUList([primary, table]).writeto(path, overwrite=True)
+
+
+def _lc_bytes(n_points):
+    # Примерный размер FITS кривой блеска: заголовки + ~100 байт на точку (как у SPOC lc.fits)
+    return 20_000 + 100 * n_points
+
+
+class SyntheticMastArchive:
+    """
+    Заменитель MAST с фиксированным набором наблюдений для списка звезд stars [(имя, ra, dec), ...].
+    Два интерфейса над одними данными:
+      - как lightkurve: search_lightcurve(coord, radius, mission) и download() у строки результата
+        (для data_fetcher.download_lightcurve(archive=...));
+      - как astroquery.mast.Observations: query_criteria, get_product_list, download_file
+        (для V1/mast_bulk.py).
+    Раскладка как в настоящем MAST: у звезды 1-4 сектора TESS — QLP и TESS-SPOC по полным кадрам
+    лежат в obs_collection 'HLSP', SPOC 2 мин (иногда) — в 'TESS', все с project 'TESS' и типом
+    'timeseries'; изредка одно наблюдение Kepler (тип 'cube') с файлом на каждый квартал.
+    self.obs — по строке на файл кривой блеска. Счетчики: requests, bytes, downloads.
+    """
+
+    def __init__(self, stars, latency=0.0, kepler_fraction=0.1, seed=0):
+        self.latency = latency
+        self.requests = 0
+        self.downloads = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        rng = np.random.default_rng(seed)
+        rows = []
+        obsid = 10 ** 8
+        for name, ra, dec in stars:
+            for _ in range(rng.integers(1, 5)):
+                sector = int(rng.integers(1, 80))
+                t0 = 58325.0 + 27.4 * (sector - 1)
+                ffi = 1800.0 if sector <= 26 else (600.0 if sector <= 55 else 200.0)
+                products = [('QLP', ffi), ('TESS-SPOC', ffi)] if rng.uniform() < 0.5 else [('QLP', ffi)]
+                if rng.uniform() < 0.3:
+                    products.append(('SPOC', 120.0))
+                for author, exptime in products:
+                    collection = 'TESS' if author == 'SPOC' else 'HLSP'
+                    subgroup = 'LLC' if author == 'QLP' else 'LC'
+                    rows.append((name, ra, dec, collection, 'TESS', 'timeseries', author, sector,
+                                 t0, t0 + 27.0, exptime, obsid, f"Light curves - sector {sector}", subgroup))
+                    obsid += 1
+            if rng.uniform() < kepler_fraction:
+                for quarter in sorted(rng.choice(np.arange(1, 18), rng.integers(1, 4), replace=False)):
+                    t0 = 54953.0 + 93.0 * (quarter - 1)
+                    rows.append((name, ra, dec, 'Kepler', 'Kepler', 'cube', 'Kepler', int(quarter),
+                                 t0, t0 + 90.0, 1765.5, obsid, f"Lightcurve Long Cadence (CLC) - Q{quarter}", 'LLC'))
+                obsid += 1
+        obs = pd.DataFrame(rows, columns=['target_name', 's_ra', 's_dec', 'obs_collection', 'project',
+                                          'dataproduct_type', 'provenance_name', 'sequence_number',
+                                          't_min', 't_max', 't_exptime', 'obsid', 'description',
+                                          'productSubGroupDescription'])
+        obs['n_points'] = ((obs['t_max'] - obs['t_min']) * 86400 / obs['t_exptime']).astype(int)
+        obs['size'] = _lc_bytes(obs['n_points'])
+        obs['productFilename'] = [f"syn_{o}_{a.lower()}_{q:02d}_{int(e)}s_{g.lower()}.fits"
+                                  for o, a, q, e, g in zip(obs['obsid'], obs['provenance_name'], obs['sequence_number'],
+                                                           obs['t_exptime'], obs['productSubGroupDescription'])]
+        obs['dataURI'] = "mast:SYNTHETIC/" + obs['productFilename']
+        self.obs = obs
+        self._unit = np.column_stack([np.cos(np.radians(obs['s_dec'])) * np.cos(np.radians(obs['s_ra'])),
+                                      np.cos(np.radians(obs['s_dec'])) * np.sin(np.radians(obs['s_ra'])),
+                                      np.sin(np.radians(obs['s_dec']))])
+        self._by_uri = {uri: i for i, uri in enumerate(obs['dataURI'])}
+
+    def _request(self, n_bytes=0):
+        with self._lock:
+            self.requests += 1
+            self.bytes += n_bytes
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _cone(self, ra, dec, radius_deg):
+        ra, dec = np.radians(ra), np.radians(dec)
+        center = np.array([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)])
+        return np.flatnonzero(self._unit @ center >= np.cos(np.radians(radius_deg)))
+
+    def _series(self, i):
+        row = self.obs.iloc[i]
+        rng = np.random.default_rng([int(row['obsid']), int(row['sequence_number']),
+                                     zlib.crc32(str(row['target_name']).encode('utf-8'))])
+        n = int(row['n_points'])
+        t = row['t_min'] - 56999.5 + np.arange(n) * row['t_exptime'] / 86400.0
+        period = 10 ** (0.5 * np.sin(zlib.crc32(str(row['target_name']).encode('utf-8'))))
+        flux = 1 + 0.1 * np.sin(2 * np.pi * t / period) + rng.normal(0, 0.01, n)
+        return row, t, flux
+
+    def _lightcurve(self, i):
+        import lightkurve as lk
+        from astropy.time import Time
+        row, t, flux = self._series(i)
+        lc = lk.LightCurve(time=Time(t, format='btjd', scale='tdb'), flux=flux, flux_err=np.full(len(t), 0.01))
+        lc.meta['TELESCOP'] = row['project']
+        return lc
+
+    # --- интерфейс lightkurve ---
+    def search_lightcurve(self, target, radius=None, mission=None, **kwargs):
+        self._request()
+        idx = self._cone(float(target.ra.deg), float(target.dec.deg), float(radius or 10) / 3600)
+        rows = self.obs.iloc[idx]
+        rows = rows[rows['project'] == mission].sort_values(['sequence_number', 't_exptime'])
+        table = Table.from_pandas(rows[['obsid', 'target_name', 'provenance_name', 't_exptime',
+                                        'productFilename', 'dataURI']].reset_index(drop=True))
+        return _SearchResult(self, table)
+
+    def SearchResult(self, table):
+        return _SearchResult(self, table)
+
+    def download(self, row):
+        i = self._by_uri[str(row['dataURI'])]
+        with self._lock:
+            self.downloads += 1
+        self._request(int(self.obs['size'].iloc[i]))
+        return self._lightcurve(i)
+
+    # --- интерфейс astroquery.mast.Observations ---
+    def query_criteria(self, coordinates=None, radius=None, project=None, dataproduct_type=None, **criteria):
+        # Наблюдение — строка на obsid: у Kepler время от первого до последнего квартала
+        self._request()
+        idx = self._cone(float(coordinates.ra.deg), float(coordinates.dec.deg), float(radius.to('deg').value))
+        rows = self.obs.iloc[idx]
+        if project is not None:
+            rows = rows[rows['project'].isin(np.atleast_1d(project))]
+        if dataproduct_type is not None:
+            rows = rows[rows['dataproduct_type'].isin(np.atleast_1d(dataproduct_type))]
+        rows = rows.groupby('obsid', as_index=False, sort=False).agg(
+            obs_collection=('obs_collection', 'first'), project=('project', 'first'),
+            dataproduct_type=('dataproduct_type', 'first'), provenance_name=('provenance_name', 'first'),
+            target_name=('target_name', 'first'), s_ra=('s_ra', 'first'), s_dec=('s_dec', 'first'),
+            t_min=('t_min', 'min'), t_max=('t_max', 'max'), t_exptime=('t_exptime', 'first'))
+        return Table.from_pandas(rows.reset_index(drop=True))
+
+    def get_product_list(self, obsids):
+        self._request()
+        rows = self.obs[self.obs['obsid'].astype(str).isin([str(o) for o in obsids])]
+        products = pd.DataFrame({
+            'obsID': rows['obsid'].astype(str).to_numpy(),
+            'productFilename': rows['productFilename'].to_numpy(),
+            'dataURI': rows['dataURI'].to_numpy(),
+            'size': rows['size'].to_numpy(),
+            'description': rows['description'].to_numpy(),
+            'productSubGroupDescription': rows['productSubGroupDescription'].to_numpy(),
+        })
+        # У каждого наблюдения есть и "лишние" файлы (TPF, отчеты), которые качать не нужно
+        extra = products.assign(productFilename=products['productFilename'].str.replace('.fits', '_tp.fits'),
+                                dataURI=products['dataURI'].str.replace('.fits', '_tp.fits'),
+                                size=products['size'] * 20, productSubGroupDescription='TP')
+        return Table.from_pandas(pd.concat([products, extra], ignore_index=True))
+
+    def download_file(self, uri, local_path=None, cache=True, **kwargs):
+        i = self._by_uri[str(uri)]
+        with self._lock:
+            self.downloads += 1
+        self._request(int(self.obs['size'].iloc[i]))
+        row, t, flux = self._series(i)
+        write_lightcurve_fits(local_path, t, flux, row['project'], seed=int(row['obsid']))
+        return 'COMPLETE', None, None
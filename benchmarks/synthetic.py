@@ -0,0 +1,90 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from _load import ROOT
+
+sys.path.append(os.path.join(ROOT, 'common'))
+import galactic
+
+# Синтетический каталог Цефеид и RR Лир в раскладке колонок Gaia-фетчеров:
+#   'v4' — как V3/V4 BigDataFromGaia.py: name, ra, dec, v_mag, parallax, period, sp_type, dist_ref
+#   'v5' — как V5 data_fetcher.py:     source_id, ra, dec, v_mag, parallax, parallax_error, period,
+#                                      sub_type, main_type
+# Распределения грубо как в DR3: ~5% Цефеид (диск, 1-15 кпк), остальное RR Лиры (гало, до 30 кпк),
+# периоды — по подтипам, величины — по P-L зависимости + модуль расстояния + поглощение.
+
+# (подтип, основной тип, доля, log10 P: среднее и разброс, a, b для M = a*log10(P) + b, шкала |b| в град.)
+SUBTYPES = [
+    ('DCEP', 'CEP', 0.035, 0.70, 0.30, -2.76, -1.45, 5.0),
+    ('T2CEP', 'CEP', 0.010, 0.90, 0.40, -1.64, -0.65, 15.0),
+    ('ACEP', 'CEP', 0.005, 0.00, 0.15, -2.76, -1.45, 20.0),
+    ('RRab', 'RR', 0.700, -0.25, 0.07, -1.87, -0.64, 30.0),
+    ('RRc', 'RR', 0.230, -0.48, 0.06, -1.87, -0.64, 30.0),
+    ('RRd', 'RR', 0.020, -0.35, 0.05, -1.87, -0.64, 30.0),
+]
+
+
+def _galactic_to_icrs(l, b):
+    l, b = np.radians(l), np.radians(b)
+    xyz = np.stack([np.cos(b) * np.cos(l), np.cos(b) * np.sin(l), np.sin(b)])
+    x, y, z = galactic.ICRS_TO_GALACTIC.T @ xyz
+    return np.degrees(np.arctan2(y, x)) % 360.0, np.degrees(np.arcsin(np.clip(z, -1, 1)))
+
+
+def make_catalog(n, layout='v5', seed=0):
+    rng = np.random.default_rng(seed)
+    shares = np.array([s[2] for s in SUBTYPES])
+    kind = rng.choice(len(SUBTYPES), n, p=shares / shares.sum())
+    table = lambda i: np.array([s[i] for s in SUBTYPES])
+
+    is_cep = table(1)[kind] == 'CEP'
+    l = rng.uniform(0, 360, n)
+    # |b| — экспонента, обрезанная на 90 град. (обратная функция распределения), знак случайный
+    scale = table(7)[kind]
+    b_abs = -scale * np.log1p(-rng.uniform(0, 1, n) * -np.expm1(-90.0 / scale))
+    b = b_abs * rng.choice([-1, 1], n)
+    ra, dec = _galactic_to_icrs(l, b)
+
+    dist = np.where(is_cep, 10 ** rng.uniform(3.0, 4.2, n), 10 ** rng.uniform(2.7, 4.5, n))
+    period = 10 ** rng.normal(table(3)[kind], table(4)[kind])
+    m_abs = table(5)[kind] * np.log10(period) + table(6)[kind]
+    av = rng.exponential(0.3 + 1.5 * np.exp(-np.abs(b) / 5))
+    v_mag = m_abs + 5 * np.log10(dist) - 5 + av + rng.normal(0, 0.05, n)
+
+    parallax_error = 0.015 + 0.3 * 10 ** (0.2 * (v_mag - 20)) + rng.exponential(0.01, n)
+    parallax = 1000.0 / dist + rng.normal(0, parallax_error)
+    # Как в запросах: только положительные параллаксы
+    parallax = np.where(parallax > 0, parallax, parallax_error)
+
+    if layout == 'v4':
+        return pd.DataFrame({
+            'name': rng.integers(1, 2 ** 62, n),
+            'ra': ra,
+            'dec': dec,
+            'v_mag': v_mag,
+            'parallax': parallax,
+            'period': period,
+            'sp_type': np.where(is_cep, 'CEP', 'RR'),
+            'dist_ref': 1000.0 / parallax,
+        })
+    return pd.DataFrame({
+        'source_id': rng.integers(1, 2 ** 62, n),
+        'ra': ra,
+        'dec': dec,
+        'v_mag': v_mag.astype(np.float32),
+        'parallax': parallax.astype(np.float32),
+        'parallax_error': parallax_error.astype(np.float32),
+        'period': period.astype(np.float32),
+        'sub_type': pd.Categorical(table(0)[kind]),
+        'main_type': pd.Categorical(table(1)[kind]),
+    })
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    layout = sys.argv[2] if len(sys.argv) > 2 else 'v5'
+    out = sys.argv[3] if len(sys.argv) > 3 else f"synthetic_{layout}_{n}.csv"
+    make_catalog(n, layout).to_csv(out, index=False)
+    print(f"{n:,} звезд ({layout}) -> {out}")
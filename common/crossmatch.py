@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+# Локальный позиционный кросс-матч без сети: KD-дерево по единичным векторам на сфере.
+# Радиус в угловых секундах переводится в длину хорды: 2 * sin(theta / 2).
+
+
+def radec_to_unit(ra, dec):
+    """RA/Dec в градусах -> массив (n, 3) единичных векторов."""
+    ra = np.radians(np.asarray(ra, dtype=np.float64))
+    dec = np.radians(np.asarray(dec, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    return np.column_stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+def _chord(radius_arcsec):
+    return 2 * np.sin(np.radians(radius_arcsec / 3600.0) / 2)
+
+
+def _chord_to_arcsec(chord):
+    return np.degrees(2 * np.arcsin(np.clip(chord / 2, 0, 1))) * 3600.0
+
+
+def build_index(ref_ra, ref_dec):
+    """Пространственный индекс по опорному каталогу (строится один раз, дальше только запросы)."""
+    return cKDTree(radec_to_unit(ref_ra, ref_dec), balanced_tree=False, compact_nodes=False)
+
+
+def match_nearest(ra, dec, index, radius_arcsec):
+    """Ближайший сосед в пределах радиуса: (индекс в опорном каталоге или -1, расстояние в угл. сек.)."""
+    dist, idx = index.query(radec_to_unit(ra, dec), k=1, distance_upper_bound=_chord(radius_arcsec))
+    found = np.isfinite(dist)
+    return np.where(found, idx, -1), np.where(found, _chord_to_arcsec(dist), np.nan)
+
+
+def match_within(ra, dec, index, radius_arcsec):
+    """Все пары в пределах радиуса: (индексы источников, индексы опорного каталога, расстояния в угл. сек.)."""
+    pairs = cKDTree(radec_to_unit(ra, dec)).sparse_distance_matrix(
+        index, _chord(radius_arcsec), output_type='ndarray')
+    order = np.lexsort((pairs['v'], pairs['i']))
+    pairs = pairs[order]
+    return pairs['i'].astype(np.int64), pairs['j'].astype(np.int64), _chord_to_arcsec(pairs['v'])
+
+
+def crossmatch(df, ref, radius_arcsec, ra_col='ra', dec_col='dec', ref_ra_col='ra', ref_dec_col='dec',
+               ref_columns=None, keep='nearest', mag_col=None, index=None):
+    """
+    Кросс-матч таблицы df с опорным каталогом ref.
+
+    keep='nearest'   — для каждой строки df берется ближайший объект (как drop_duplicates после XMatch);
+    keep='brightest' — из всех объектов в радиусе берется самый яркий по mag_col
+                       (как sort_values('phot_g_mean_mag').drop_duplicates в GaiaAdd.py);
+    keep='all'       — все пары.
+    Возвращает DataFrame: строки df (индекс сохраняется) + колонки ref_columns + 'sep_arcsec'.
+    Звезды без пары в результат не попадают — для left join используйте merge по индексу.
+    """
+    if index is None:
+        index = build_index(ref[ref_ra_col].to_numpy(), ref[ref_dec_col].to_numpy())
+    ref_columns = list(ref_columns) if ref_columns is not None else [c for c in ref.columns
+                                                                      if c not in (ref_ra_col, ref_dec_col)]
+    ra = df[ra_col].to_numpy(dtype=np.float64)
+    dec = df[dec_col].to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(ra) & np.isfinite(dec))
+
+    if keep == 'nearest':
+        ref_idx, sep = match_nearest(ra[valid], dec[valid], index, radius_arcsec)
+        found = ref_idx >= 0
+        src_idx, ref_idx, sep = valid[found], ref_idx[found], sep[found]
+    else:
+        src_idx, ref_idx, sep = match_within(ra[valid], dec[valid], index, radius_arcsec)
+        src_idx = valid[src_idx]
+        if keep == 'brightest':
+            mag = ref[mag_col].to_numpy(dtype=np.float64)[ref_idx]
+            # NaN-величины уходят в конец; при равной яркости — ближайший
+            order = np.lexsort((sep, np.where(np.isnan(mag), np.inf, mag), src_idx))
+            src_idx, ref_idx, sep = src_idx[order], ref_idx[order], sep[order]
+            first = np.r_[True, src_idx[1:] != src_idx[:-1]]
+            src_idx, ref_idx, sep = src_idx[first], ref_idx[first], sep[first]
+        elif keep != 'all':
+            raise ValueError(f"keep должен быть 'nearest', 'brightest' или 'all', а не {keep!r}")
+
+    result = df.iloc[src_idx].copy()
+    for col in ref_columns:
+        result[col] = ref[col].to_numpy()[ref_idx]
+    result['sep_arcsec'] = sep
+    return result
+
+
+def load_reference(path, columns=None):
+    """Опорный каталог с диска: Parquet (с выбором колонок) или CSV."""
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
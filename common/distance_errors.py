@@ -0,0 +1,137 @@
+import zlib
+from functools import partial
+
+import montecarlo
+import pl_relations
+import startable
+import streaming
+
+# Расчет ошибок фотометрических расстояний для V2-V4 (calculate_errors.py в каждой версии —
+# только настройки и запуск): M по типу VSX (pl_relations.VSX_CLASSES), расстояние по закону
+# Левитта и отклонение от эталонного dist_ref. Обычный режим — вся таблица в памяти,
+# потоковый — кусками в пуле процессов (common/streaming.py).
+TYPE_CLASSES = pl_relations.VSX_CLASSES
+CHUNK_ROWS = streaming.CHUNK_ROWS
+
+# Режим неопределенностей: к результату добавляются перцентили (16/50/84) выведенных колонок
+# по n_samples выборкам на звезду. Ошибки параллакса берутся из parallax_error (или dist_ref_err),
+# для звездной величины и периода в таблицах ошибок нет — используются типичные значения ниже.
+MC_SAMPLES = montecarlo.N_SAMPLES
+V_MAG_ERR = 0.02
+PERIOD_REL_ERR = 1e-3
+
+
+def absolute_magnitude_array(period, star_type):
+    """M = a * log10(P) + b по типу VSX для целых колонок (NaN — тип не подходит)."""
+    return pl_relations.absolute_magnitude_array(period, star_type, TYPE_CLASSES)
+
+
+def drop_incomplete(df):
+    # Отбрасываем звезды, для которых мы не нашли период или у которых нет видимой величины (v_mag)
+    return df.dropna(subset=['period', 'v_mag', 'dist_ref'])
+
+
+def calculate_chunk(df):
+    """Шаги 2-4 для очищенной таблицы (или ее куска): M_calc, dist_pl, abs_error, rel_error."""
+    df = df.copy()
+    df['M_calc'] = absolute_magnitude_array(df['period'].to_numpy(), df['sp_type'].to_numpy())
+
+    # Убираем те, которые не подошли по типу (где M_calc = NaN)
+    df = df.dropna(subset=['M_calc'])
+
+    # Фотометрическое расстояние (dist_pl) в парсеках по закону Левитта
+    df['dist_pl'] = 10 ** ((df['v_mag'] - df['M_calc'] + 5) / 5)
+
+    # Абсолютная ошибка: Насколько парсек мы ошиблись
+    df['abs_error'] = df['dist_pl'] - df['dist_ref']
+
+    # Относительная ошибка: Процент ошибки от эталонного расстояния
+    df['rel_error'] = (df['abs_error'] / df['dist_ref']) * 100
+
+    # Округляем для красоты
+    df['M_calc'] = df['M_calc'].round(3)
+    df['dist_pl'] = df['dist_pl'].round(2)
+    df['abs_error'] = df['abs_error'].round(2)
+    df['rel_error'] = df['rel_error'].round(2)
+    return df
+
+
+def calculate_uncertainties(df, n_samples=MC_SAMPLES, n_workers=None, seed=0):
+    """Перцентили M_calc, dist_pl, dist_ref, abs_error, rel_error (колонки '<имя>_p16' ...) для строк df."""
+    a, b = pl_relations.coefficients(df['sp_type'].to_numpy(), TYPE_CLASSES)
+    inputs = montecarlo.distance_inputs(df, a, b, V_MAG_ERR, PERIOD_REL_ERR)
+    return montecarlo.propagate(df, montecarlo.distance_model, inputs, n_samples=n_samples,
+                                n_workers=n_workers, seed=seed)
+
+
+def process_calculations(input_file, output_file, uncertainty=False, n_samples=MC_SAMPLES):
+    print(f"1. Загружаем данные из {input_file}...")
+    df = startable.read(input_file)
+
+    initial_count = len(df)
+    df = drop_incomplete(df)
+    print(f"После удаления строк без периодов и базовых данных осталось: {len(df)} из {initial_count} звезд.")
+
+    # 2-4. Абсолютная величина (M), фотометрическое расстояние и погрешности
+    print("2. Вычисляем абсолютную звездную величину (M_calc), расстояния по закону Левитта и погрешности...")
+    df = calculate_chunk(df)
+    print(f"Звезд подходящих типов (Цефеиды, RR Лиры, C-типы) для расчетов: {len(df)}")
+
+    if uncertainty:
+        print(f"Монте-Карло: {n_samples} выборок на звезду...")
+        df = df.join(calculate_uncertainties(df, n_samples=n_samples))
+
+    # 5. Сохраняем результат (CSV + типизированный Parquet рядом)
+    startable.write(df, output_file)
+    print(f"5. Успех! Итоговые данные сохранены в '{output_file}'.")
+
+    # Выводим среднюю ошибку для понимания масштаба трагедии (или успеха)
+    mean_error = df['rel_error'].abs().mean()
+    print(f"Средняя относительная ошибка по всей выборке: {mean_error:.2f}%")
+
+
+def _stream_chunk(chunk, uncertainty=False, n_samples=MC_SAMPLES):
+    # Выполняется в воркере: (строк на входе, строк после очистки, готовый кусок)
+    clean = drop_incomplete(chunk)
+    df = calculate_chunk(clean)
+    if uncertainty:
+        # Воркер уже отдельный процесс; зерно — от содержимого куска, чтобы куски не повторяли друг друга
+        seed = zlib.crc32(df['period'].to_numpy().tobytes())
+        df = df.join(calculate_uncertainties(df, n_samples=n_samples, n_workers=1, seed=seed))
+    return len(chunk), len(clean), df
+
+
+def process_calculations_streaming(input_file, output_file, chunk_rows=CHUNK_ROWS, n_workers=None,
+                                   uncertainty=False, n_samples=MC_SAMPLES):
+    """
+    То же, что process_calculations, но кусками: результат дописывается в output_file,
+    средняя ошибка и число звезд по типам накапливаются на лету. Возвращает сводку.
+    """
+    print(f"1. Потоковая обработка {input_file} (кусками по {chunk_rows} строк)...")
+    initial_count = complete_count = suitable_count = 0
+    stats = streaming.new_stats()
+    type_counts = {}
+    writer = startable.open_writer(output_file)
+    chunks = startable.iter_chunks(input_file, chunk_rows)
+    work = partial(_stream_chunk, uncertainty=uncertainty, n_samples=n_samples)
+    for n_raw, n_clean, df in streaming.map_chunks(work, chunks, n_workers):
+        initial_count += n_raw
+        complete_count += n_clean
+        suitable_count += len(df)
+        startable.write_chunk(writer, df)
+        streaming.update_stats(stats, df['rel_error'])
+        streaming.update_counts(type_counts, df['sp_type'])
+    startable.close_writer(writer)
+
+    summary = streaming.summarize_stats(stats)
+    summary['initial'] = initial_count
+    summary['complete'] = complete_count
+    summary['suitable'] = suitable_count
+    summary['types'] = type_counts
+    print(f"После удаления строк без периодов и базовых данных осталось: {complete_count} из {initial_count} звезд.")
+    print(f"Звезд подходящих типов (Цефеиды, RR Лиры, C-типы) для расчетов: {suitable_count}")
+    for star_type, n in sorted(type_counts.items(), key=lambda item: -item[1])[:10]:
+        print(f"   {star_type}: {n}")
+    print(f"5. Успех! Итоговые данные сохранены в '{output_file}'.")
+    print(f"Средняя относительная ошибка по всей выборке: {summary['mean_abs']:.2f}%")
+    return summary
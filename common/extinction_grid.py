@@ -0,0 +1,182 @@
+import os
+import json
+from datetime import datetime, timezone
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+import galactic
+
+# 3D-сетка поглощения в галактических декартовых координатах (пк, Солнце в начале координат).
+# По каждому вокселю: число звезд, среднее значение (Dust_Av, rel_error ...) и устойчивый разброс
+# (1.4826 * MAD). Сетка хранится папкой с .npy (открывается через memmap) и meta.json.
+VOXEL_SIZE_PC = 100.0
+SMOOTH_SIGMA = 0.0  # в вокселях; 0 — без сглаживания
+MIN_COUNT = 1
+SMOOTH_MIN_WEIGHT = 0.01  # после сглаживания: меньше этого "эффективного числа звезд" — NaN
+CHUNK_SIZE = 1_000_000
+# Охват сетки по умолчанию: по каждой оси — перцентили EXTENT_PERCENTILE данных, но не дальше
+# MAX_DISTANCE_PC от Солнца. Иначе одна звезда с шумовым параллаксом (1000/parallax ~ 100 кпк)
+# раздувает сетку до гигабайт. Звезды за охватом в сетку не попадают и считаются в 'outside'.
+MAX_DISTANCE_PC = 5000.0
+EXTENT_PERCENTILE = 99.5
+FIELDS = ('count', 'mean', 'spread')
+
+
+def _group_medians(keys, values, n_groups):
+    """Медиана values внутри каждой группы keys (группы без значений -> NaN)."""
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    counts = np.bincount(keys, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    has = counts > 0
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    median = np.full(n_groups, np.nan)
+    median[has] = 0.5 * (values[lo[has]] + values[hi[has]])
+    return median
+
+
+def default_extent(x, y, z, max_distance=MAX_DISTANCE_PC, percentile=EXTENT_PERCENTILE):
+    """((xmin, xmax), (ymin, ymax), (zmin, zmax)) по данным: центральные percentile %, в пределах +-max_distance."""
+    extent = []
+    for c in (x, y, z):
+        lo, hi = np.percentile(c, [(100 - percentile) / 2, (100 + percentile) / 2])
+        extent.append((float(np.clip(lo, -max_distance, max_distance)), float(np.clip(hi, -max_distance, max_distance))))
+    return extent
+
+
+def build_grid(x, y, z, values, voxel_size=VOXEL_SIZE_PC, extent=None, smooth_sigma=SMOOTH_SIGMA,
+               min_count=MIN_COUNT):
+    """
+    Сетка по звездам (x, y, z в пк) и их значениям. extent — ((xmin, xmax), (ymin, ymax), (zmin, zmax)),
+    по умолчанию — default_extent; звезды вне охвата отбрасываются (их число — в grid['outside']). Сглаживание — гауссом с нормировкой на число звезд,
+    так что пустые воксели рядом с данными заполняются, а далекие остаются NaN.
+    Точки с NaN/inf отбрасываются; если не осталось ни одной и extent не задан — возвращает None.
+    """
+    x, y, z, values = (np.asarray(a, dtype=np.float64) for a in (x, y, z, values))
+    ok = np.isfinite(x) & np.isfinite(y) & np.isfinite(z) & np.isfinite(values)
+    x, y, z, values = x[ok], y[ok], z[ok], values[ok]
+    if extent is None and len(x) == 0:
+        return None
+    if extent is None:
+        extent = default_extent(x, y, z)
+    origin = np.array([np.floor(lo / voxel_size) * voxel_size for lo, _ in extent])
+    shape = tuple(int(np.floor((hi - o) / voxel_size)) + 1 for (_, hi), o in zip(extent, origin))
+
+    idx = [np.floor((c - o) / voxel_size).astype(np.int64) for c, o in zip((x, y, z), origin)]
+    inside = np.all([(i >= 0) & (i < n) for i, n in zip(idx, shape)], axis=0)
+    flat = np.ravel_multi_index([i[inside] for i in idx], shape)
+    values = values[inside]
+    n_cells = int(np.prod(shape))
+
+    count = np.bincount(flat, minlength=n_cells).astype(np.float64)
+    total = np.bincount(flat, weights=values, minlength=n_cells)
+    median = _group_medians(flat, values, n_cells)
+    mad = _group_medians(flat, np.abs(values - median[flat]), n_cells)
+    spread = 1.4826 * mad
+
+    if smooth_sigma > 0:
+        weight = gaussian_filter(count, smooth_sigma, mode='constant')
+        total = gaussian_filter(total, smooth_sigma, mode='constant')
+        spread = gaussian_filter(np.nan_to_num(spread) * count, smooth_sigma, mode='constant')
+        empty = weight < SMOOTH_MIN_WEIGHT
+    else:
+        weight = count
+        spread = spread * count
+        empty = count < min_count
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(empty, np.nan, total / weight)
+        spread = np.where(empty, np.nan, spread / weight)
+
+    return {
+        'count': count.reshape(shape).astype(np.int32),
+        'mean': mean.reshape(shape).astype(np.float32),
+        'spread': spread.reshape(shape).astype(np.float32),
+        'origin': origin,
+        'voxel_size': float(voxel_size),
+        'smooth_sigma': float(smooth_sigma),
+        'outside': int((~inside).sum()),
+    }
+
+
+def build_from_table(df, value_col, ra_col='ra', dec_col='dec', dist_col='dist', cache_path=None, **kwargs):
+    """Сетка по таблице звезд: RA/Dec/дистанция -> X/Y/Z (с кэшем common/galactic.py) -> build_grid (или None)."""
+    df = df[df[dist_col] > 0]
+    gal = galactic.galactic_columns(df, ra_col, dec_col, dist_col=dist_col, cache_path=cache_path)
+    return build_grid(gal['X'], gal['Y'], gal['Z'], df[value_col], **kwargs)
+
+
+def save_grid(grid, path, **meta):
+    """Папка path: count.npy, mean.npy, spread.npy и meta.json (начало сетки, шаг, время сборки)."""
+    os.makedirs(path, exist_ok=True)
+    for name in FIELDS:
+        tmp = os.path.join(path, name + ".tmp.npy")
+        np.save(tmp, grid[name])
+        os.replace(tmp, os.path.join(path, name + ".npy"))
+    info = {
+        'origin': [float(o) for o in grid['origin']],
+        'voxel_size': grid['voxel_size'],
+        'smooth_sigma': grid['smooth_sigma'],
+        'shape': list(grid['mean'].shape),
+        'stars': int(grid['count'].sum()),
+        'outside': int(grid.get('outside', 0)),
+        'built_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    info.update(meta)
+    with open(os.path.join(path, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+
+def load_grid(path, mmap_mode='r'):
+    """Сетка с диска; массивы открываются через memmap и читаются только в тех местах, куда пришел запрос."""
+    with open(os.path.join(path, "meta.json"), encoding='utf-8') as f:
+        info = json.load(f)
+    grid = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode) for name in FIELDS}
+    grid['origin'] = np.array(info['origin'])
+    grid['voxel_size'] = info['voxel_size']
+    grid['smooth_sigma'] = info['smooth_sigma']
+    grid['meta'] = info
+    return grid
+
+
+def _trilinear(cube, origin, voxel_size, x, y, z):
+    # Узлы — центры вокселей; пустые соседи (NaN) и выход за сетку не участвуют в сумме весов.
+    # Точки за границей сетки — NaN (иначе до полувокселя снаружи значение бралось бы с крайних узлов)
+    shape = cube.shape
+    cell = [(c - o) / voxel_size for c, o in zip((x, y, z), origin)]
+    outside = np.any([~((c >= 0) & (c < n)) for c, n in zip(cell, shape)], axis=0)
+    u = [c - 0.5 for c in cell]
+    i0 = [np.floor(c).astype(np.int64) for c in u]
+    t = [c - i for c, i in zip(u, i0)]
+    acc = np.zeros(len(x))
+    wsum = np.zeros(len(x))
+    for dx in (0, 1):
+        for dy in (0, 1):
+            for dz in (0, 1):
+                ii = [i0[0] + dx, i0[1] + dy, i0[2] + dz]
+                w = ((t[0] if dx else 1 - t[0]) * (t[1] if dy else 1 - t[1]) * (t[2] if dz else 1 - t[2]))
+                inside = np.all([(i >= 0) & (i < n) for i, n in zip(ii, shape)], axis=0)
+                v = np.full(len(x), np.nan)
+                v[inside] = cube[ii[0][inside], ii[1][inside], ii[2][inside]]
+                good = np.isfinite(v)
+                acc += np.where(good, w * v, 0.0)
+                wsum += np.where(good, w, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((wsum > 0) & ~outside, acc / wsum, np.nan)
+
+
+def query_xyz(grid, x, y, z, field='mean', chunk_size=CHUNK_SIZE):
+    """Значение сетки (трилинейная интерполяция) в точках X/Y/Z (пк); NaN вне сетки и в пустых областях."""
+    x, y, z = (np.asarray(a, dtype=np.float64) for a in (x, y, z))
+    cube = grid[field]
+    out = np.empty(len(x))
+    for start in range(0, len(x), chunk_size):
+        part = slice(start, start + chunk_size)
+        out[part] = _trilinear(cube, grid['origin'], grid['voxel_size'], x[part], y[part], z[part])
+    return out
+
+
+def query_lbd(grid, l, b, distance, field='mean', chunk_size=CHUNK_SIZE):
+    """То же для галактических l, b (град.) и расстояния (пк)."""
+    x, y, z = galactic.galactic_xyz(l, b, distance)
+    return query_xyz(grid, x, y, z, field=field, chunk_size=chunk_size)
@@ -0,0 +1,104 @@
+import os
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+# В Gaia DR3 source_id = HEALPix(уровень 12, NESTED) * 2^35 + номер источника в пикселе,
+# поэтому диапазон source_id — это кусок неба. По нему и режем большие запросы.
+SOURCE_ID_PER_PIXEL = 2 ** 35
+N_PIXELS_L12 = 12 * 4 ** 12
+
+# Повторы при сбое одной части (пауза растет: 5 с, 10 с, ...)
+RETRIES = 2
+RETRY_DELAY = 5.0
+
+
+def source_id_partitions(n_partitions):
+    """Список (lo, hi) включительно: n_partitions равных по площади неба диапазонов source_id."""
+    edges = np.linspace(0, N_PIXELS_L12, n_partitions + 1).astype(np.int64)
+    return [(int(edges[i]) * SOURCE_ID_PER_PIXEL, int(edges[i + 1]) * SOURCE_ID_PER_PIXEL - 1)
+            for i in range(n_partitions)]
+
+
+def partition_query(query, lo, hi, column="s.source_id"):
+    """Подставляет условие на диапазон source_id вместо {partition} в тексте ADQL."""
+    return query.replace("{partition}", f"{column} BETWEEN {lo} AND {hi}")
+
+
+def _default_service():
+    from astroquery.gaia import Gaia
+    Gaia.ROW_LIMIT = -1
+    return Gaia
+
+
+def _fetch_one(service, query, path, retries, retry_delay):
+    for attempt in range(retries + 1):
+        try:
+            job = service.launch_job_async(query)
+            df = job.get_results().to_pandas()
+            # Сначала во временный файл: оборванная запись не будет принята за готовую часть
+            tmp = path + ".tmp"
+            df.to_csv(tmp, index=False)
+            os.replace(tmp, path)
+            return len(df)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(retry_delay * (attempt + 1))
+
+
+def fetch_partitioned(query, name, out_dir="gaia_parts", n_partitions=32, max_workers=4,
+                      service=None, retries=None, retry_delay=None):
+    """
+    Запускает запрос кусками по диапазонам source_id, по max_workers одновременно.
+
+    query должен содержать {partition} в WHERE. Каждая часть сразу пишется в
+    out_dir/name/part_XXXX.csv; уже скачанные части при повторном запуске пропускаются,
+    так что после сбоя докачиваются только упавшие. Возвращает (пути готовых частей,
+    список упавших (номер, ошибка)).
+    """
+    service = service or _default_service()
+    retries = RETRIES if retries is None else retries
+    retry_delay = RETRY_DELAY if retry_delay is None else retry_delay
+    folder = os.path.join(out_dir, name)
+    os.makedirs(folder, exist_ok=True)
+
+    parts = source_id_partitions(n_partitions)
+    paths = [os.path.join(folder, f"part_{i:04d}.csv") for i in range(n_partitions)]
+    todo = [i for i in range(n_partitions) if not os.path.exists(paths[i])]
+    if len(todo) < n_partitions:
+        print(f"[{name}] Уже скачано частей: {n_partitions - len(todo)} из {n_partitions}")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_fetch_one, service, partition_query(query, *parts[i]), paths[i], retries, retry_delay): i
+            for i in todo
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                rows = future.result()
+                print(f"[{name}] Часть {i + 1}/{n_partitions}: {rows} строк ({done}/{len(todo)})")
+            except Exception as e:
+                failed.append((i, e))
+                print(f"[{name}] !!! Часть {i + 1}/{n_partitions} не скачалась: {e}")
+
+    ready = [p for p in paths if os.path.exists(p)]
+    return ready, failed
+
+
+def clear_partitions(name, out_dir="gaia_parts"):
+    """Удаляет скачанные части запроса name (для принудительной перезакачки)."""
+    shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+
+
+def load_partitions(paths):
+    """Склеивает скачанные части в один DataFrame."""
+    frames = [pd.read_csv(p) for p in paths]
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,137 @@
+import os
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # без pyarrow кэш пишется в .npz
+    pa = pq = None
+
+# ICRS -> Galactic одной матрицей поворота, без SkyCoord.
+# Матрица та же, что у astropy (ICRS -> FK5 J2000 -> Galactic), поэтому результат совпадает
+# с SkyCoord(...).galactic до долей миллисекунды дуги. Матрица Hipparcos отличается на ~20 mas.
+# По скорости поворот наравне с SkyCoord (1M звезд: ~0.3 с и там, и там; benchmarks/check_galactic.py) —
+# выигрыш дает кэш l, b, X, Y, Z рядом с данными: повторный запуск графиков не пересчитывает координаты.
+ICRS_TO_GALACTIC = np.array([
+    [-0.05487565771259163, -0.8734370519556159, -0.48383507361671546],
+    [0.4941094371927268, -0.4448297212232952, 0.7469821839866676],
+    [-0.8676661375596576, -0.19807633727300053, 0.4559838136873016],
+])
+
+CHUNK_SIZE = 1_000_000
+CACHE_SUFFIX = ".galactic.{columns}.parquet"
+NPZ_CACHE_SUFFIX = ".galactic.{columns}.npz"
+
+
+def _rotate(ra, dec):
+    ra = np.radians(ra)
+    dec = np.radians(dec)
+    cos_dec = np.cos(dec)
+    xyz = np.stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+    gx, gy, gz = ICRS_TO_GALACTIC @ xyz
+    l = np.degrees(np.arctan2(gy, gx)) % 360.0
+    b = np.degrees(np.arctan2(gz, np.hypot(gx, gy)))
+    return l, b
+
+
+def radec_to_galactic(ra, dec, chunk_size=CHUNK_SIZE):
+    """RA/Dec (град.) -> (l, b) в градусах, l в [0, 360). Большие таблицы считаются кусками."""
+    ra = np.asarray(ra, dtype=np.float64)
+    dec = np.asarray(dec, dtype=np.float64)
+    l = np.empty(len(ra))
+    b = np.empty(len(ra))
+    for start in range(0, len(ra), chunk_size):
+        part = slice(start, start + chunk_size)
+        l[part], b[part] = _rotate(ra[part], dec[part])
+    return l, b
+
+
+def wrap_l(l):
+    """Долгота в (-180, 180] — как l.wrap_at(180 * u.deg) у astropy."""
+    l = np.asarray(l, dtype=np.float64)
+    return l - 360.0 * (l > 180.0)
+
+
+def galactic_xyz(l, b, distance):
+    """Галактические декартовы X/Y/Z (в единицах distance) — как galactic.cartesian у astropy."""
+    l = np.radians(l)
+    b = np.radians(b)
+    d = np.asarray(distance, dtype=np.float64)
+    cos_b = np.cos(b)
+    return d * cos_b * np.cos(l), d * cos_b * np.sin(l), d * np.sin(b)
+
+
+def _fingerprint(*arrays):
+    h = hashlib.sha1()
+    for a in arrays:
+        h.update(np.ascontiguousarray(a, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def sidecar_path(cache_path, ra_col='ra', dec_col='dec', dist_col=None):
+    """
+    Файл кэша рядом с cache_path — свой для каждого набора колонок: графики ошибок (l, b по ra/dec)
+    и 3D-визуализация (еще и X, Y, Z) одного файла данных не затирают кэш друг друга.
+    """
+    columns = [ra_col, dec_col] + ([dist_col] if dist_col is not None else [])
+    tag = "-".join(re.sub(r'\W+', '_', str(c)) for c in columns)
+    suffix = CACHE_SUFFIX if pq is not None else NPZ_CACHE_SUFFIX
+    return cache_path + suffix.format(columns=tag)
+
+
+def _read_sidecar(path, fingerprint):
+    # Содержимое кэша (DataFrame) или None, если он от других входных данных
+    if pq is None:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['fingerprint']) != fingerprint:
+                return None
+            return pd.DataFrame({name: data[name] for name in data['columns']})
+    meta = pq.read_schema(path).metadata or {}
+    if meta.get(b'fingerprint', b'').decode() != fingerprint:
+        return None
+    return pd.read_parquet(path)
+
+
+def _write_sidecar(path, out, fingerprint):
+    tmp = path + ".tmp"
+    if pq is None:
+        with open(tmp, 'wb') as f:
+            np.savez(f, fingerprint=fingerprint, columns=np.array(list(out.columns), dtype=str),
+                     **{name: out[name].to_numpy() for name in out.columns})
+    else:
+        table = pa.Table.from_pandas(out, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'fingerprint': fingerprint.encode()})
+        pq.write_table(table, tmp, compression='zstd')
+    os.replace(tmp, path)
+
+
+def galactic_columns(df, ra_col='ra', dec_col='dec', dist_col=None, cache_path=None):
+    """
+    DataFrame с колонками l, b (и X, Y, Z, если задан dist_col) для строк df, индекс тот же.
+    Если задан cache_path (обычно путь к исходным данным), результат лежит рядом в
+    '<cache_path>.galactic.<колонки>.parquet' (.npz без pyarrow; sidecar_path) и пересчитывается только
+    при изменении координат/дистанций (в том числе набора строк df).
+    """
+    ra = df[ra_col].to_numpy(dtype=np.float64)
+    dec = df[dec_col].to_numpy(dtype=np.float64)
+    inputs = [ra, dec] if dist_col is None else [ra, dec, df[dist_col].to_numpy(dtype=np.float64)]
+
+    sidecar = sidecar_path(cache_path, ra_col, dec_col, dist_col) if cache_path else None
+    fingerprint = _fingerprint(*inputs) if sidecar else None
+    if sidecar and os.path.exists(sidecar):
+        out = _read_sidecar(sidecar, fingerprint)
+        if out is not None:
+            out.index = df.index
+            return out
+
+    l, b = radec_to_galactic(ra, dec)
+    out = pd.DataFrame({'l': l, 'b': b}, index=df.index)
+    if dist_col is not None:
+        out['X'], out['Y'], out['Z'] = galactic_xyz(l, b, inputs[2])
+
+    if sidecar:
+        _write_sidecar(sidecar, out, fingerprint)
+    return out
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+import streaming
+
+# Монте-Карло для неопределенностей расстояний: на каждую звезду N выборок входов
+# (параллакс, звездная величина, период), модель считается на выборках, а наружу идут
+# только перцентили. Звезды идут кусками по MAX_CELLS // N, поэтому полный куб
+# звезды x выборки в памяти не создается.
+N_SAMPLES = 1000
+PERCENTILES = (16, 50, 84)
+MAX_CELLS = 2 ** 22  # ячеек (звезда x выборка) в одном массиве куска: ~16 МБ во float32
+
+
+def _draw(rng, value, error, n_samples):
+    # Без ошибки — столбец (n, 1), он сам растянется при вычислениях
+    value = value.astype(np.float32)[:, None]
+    if error is None:
+        return value
+    error = np.nan_to_num(error.astype(np.float32), nan=0.0)[:, None]
+    return value + error * rng.standard_normal((len(value), n_samples), dtype=np.float32)
+
+
+def _percentiles(arr, percentiles):
+    # Полная сортировка строк (векторизована в numpy) заметно быстрее np.percentile с partition;
+    # интерполяция та же, что у np.percentile(method='linear'). Строка с NaN -> NaN, как там же.
+    ordered = np.sort(arr, axis=1)
+    pos = np.asarray(percentiles, dtype=np.float64) / 100 * (arr.shape[1] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, arr.shape[1] - 1)
+    frac = (pos - lo).astype(arr.dtype)
+    out = ordered[:, lo] * (1 - frac) + ordered[:, hi] * frac
+    out[np.isnan(ordered[:, -1])] = np.nan
+    return out
+
+
+def _run_chunk(job):
+    model, values, errors, n_samples, percentiles, seed = job
+    rng = np.random.default_rng(seed)
+    samples = {name: _draw(rng, v, errors.get(name), n_samples) for name, v in values.items()}
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        derived = model(samples)
+    n_stars = len(next(iter(values.values())))
+    return {name: _percentiles(np.broadcast_to(arr, (n_stars, arr.shape[1])), percentiles)
+            for name, arr in derived.items()}
+
+
+def _column(df, x):
+    if x is None:
+        return None
+    if isinstance(x, str):
+        return df[x].to_numpy(dtype=np.float64)
+    return np.broadcast_to(np.asarray(x, dtype=np.float64), (len(df),))
+
+
+def propagate(df, model, inputs, n_samples=N_SAMPLES, percentiles=PERCENTILES, n_workers=None,
+              seed=0, max_cells=MAX_CELLS):
+    """
+    inputs: {имя: (значение, ошибка)} — колонка df, массив или скаляр; ошибка None — без разброса.
+    model(samples) получает словарь массивов (звезды, выборки) и возвращает словарь выведенных
+    величин той же формы. Должна быть объявлена на уровне модуля (уходит в процессы).
+    Результат — DataFrame с колонками '<величина>_p<перцентиль>' и индексом df.
+    """
+    values = {name: _column(df, v) for name, (v, _) in inputs.items()}
+    errors = {name: _column(df, e) for name, (_, e) in inputs.items() if e is not None}
+    chunk_stars = max(1, max_cells // n_samples)
+
+    def jobs():
+        for i, start in enumerate(range(0, len(df), chunk_stars)):
+            part = slice(start, start + chunk_stars)
+            yield (model, {k: v[part] for k, v in values.items()}, {k: e[part] for k, e in errors.items()},
+                   n_samples, percentiles, [seed, i])
+
+    pieces = list(streaming.map_chunks(_run_chunk, jobs(), n_workers))
+    out = pd.DataFrame(index=df.index)
+    if not pieces:
+        return out
+    for name in pieces[0]:
+        stacked = np.concatenate([p[name] for p in pieces])
+        for j, q in enumerate(percentiles):
+            out[f"{name}_p{q:g}"] = stacked[:, j]
+    return out
+
+
+# --- Модель для P-L расстояний (V4 calculate_errors, V5 calculator) ---
+
+def distance_model(s):
+    """M = a*log10(P) + b, dist_pl по модулю расстояния, dist_ref = 1000/parallax (или готовый dist_ref)."""
+    m_calc = s['a'] * np.log10(s['period']) + s['b']
+    dist_pl = 10 ** ((s['v_mag'] - m_calc + 5) / 5)
+    dist_ref = 1000.0 / s['parallax'] if 'parallax' in s else s['dist_ref']
+    abs_error = dist_pl - dist_ref
+    return {
+        'M_calc': m_calc,
+        'dist_pl': dist_pl,
+        'dist_ref': dist_ref,
+        'abs_error': abs_error,
+        'rel_error': abs_error / dist_ref * 100,
+    }
+
+
+def distance_inputs(df, a, b, v_mag_err, period_rel_err):
+    """
+    Входы distance_model по таблице: параллакс с parallax_error, если он есть,
+    иначе dist_ref с dist_ref_err (V2), иначе dist_ref без разброса.
+    v_mag_err — колонка или скаляр (в таблицах ошибок звездной величины обычно нет).
+    """
+    inputs = {
+        'a': (a, None),
+        'b': (b, None),
+        'period': ('period', df['period'].to_numpy(dtype=np.float64) * period_rel_err),
+        'v_mag': ('v_mag', v_mag_err),
+    }
+    if 'parallax' in df.columns and 'parallax_error' in df.columns:
+        inputs['parallax'] = ('parallax', 'parallax_error')
+    elif 'dist_ref_err' in df.columns:
+        inputs['dist_ref'] = ('dist_ref', 'dist_ref_err')
+    else:
+        inputs['dist_ref'] = ('dist_ref', None)
+    return inputs
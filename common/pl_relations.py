@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# Зависимости период-светимость M = a * log10(P) + b по классам переменных звезд.
+# Таблица классов — [(класс, правило по типу в верхнем регистре, a, b), ...]; порядок важен —
+# первое совпадение побеждает. Правила проверяются только для уникальных типов колонки,
+# дальше коэффициенты берутся индексацией массивом — без построчного df.apply.
+
+# Типы VSX (колонка sp_type в V2-V4)
+VSX_CLASSES = [
+    # Классические Цефеиды (DCEP, CEP)
+    ('CEP', lambda stype: 'CEP' in stype or 'DCEP' in stype, -2.76, -1.45),
+    # RR Лиры (RR, RRAB, RRC)
+    ('RR', lambda stype: 'RR' in stype, -1.87, -0.64),
+    # Углеродные (C, C-N) и долгопериодические (M, SR, L) — грубая оценка, в V закон работает хуже
+    ('LPV', lambda stype: 'C-' in stype or 'SR' in stype or 'M' in stype, -2.0, 1.0),
+]
+
+# Подтипы Gaia DR3 (колонка sub_type в V5)
+GAIA_SUBTYPE_CLASSES = [
+    # Классические Цефеиды (DCEP)
+    ('DCEP', lambda st: 'DCEP' in st, -2.76, -1.45),
+    # Цефеиды II типа (W Vir, BL Her)
+    ('T2CEP', lambda st: 'T2CEP' in st or 'CW' in st, -1.64, -0.65),
+    # RR Лиры (в среднем для RRAB/RRC)
+    ('RR', lambda st: 'RR' in st, -1.87, -0.64),
+]
+
+# Многоцветные зависимости V1 (astrophysics.py): M = a * (log10(P) - pivot) + b
+# Цефеиды — по индексу Везенхайта W = m1 - R * (m2 - m1), RR Лиры — в полосе K.
+CEPHEID_WESENHEIT_JK = (-3.284, -5.588, 1.0)   # W = K - 0.69 * (J - K)
+CEPHEID_WESENHEIT_VI = (-3.31, -5.80, 1.0)     # W = I - 1.55 * (V - I)
+WESENHEIT_R_JK = 0.69
+WESENHEIT_R_VI = 1.55
+RR_LYRAE_K = (-2.33, -0.93, 0.0)
+# RR Лиры в V без зависимости от периода: модуль V - 0.6 - 0.5 (как в исходной формуле V1)
+RR_LYRAE_MV = 0.6
+RR_LYRAE_V_OFFSET = 0.5
+
+
+def pl_magnitude(period, relation):
+    """M = a * (log10(P) - pivot) + b для relation = (a, b, pivot); скаляр или массив."""
+    a, b, pivot = relation
+    return a * (np.log10(period) - pivot) + b
+
+
+def modulus_distance(m, M):
+    """Расстояние (пк) по видимой и абсолютной величине."""
+    return 10 ** ((m - M + 5) / 5)
+
+
+def classify_types(star_types, classes):
+    """
+    Колонка типов -> коды классов из classes (len(classes) — тип не подходит).
+    Строки проверяются один раз на уникальное значение, а не на каждую звезду.
+    """
+    codes, uniques = pd.factorize(pd.Series(star_types), use_na_sentinel=False)
+    unique_classes = np.full(len(uniques), len(classes), dtype=np.int8)
+    for i, value in enumerate(uniques):
+        stype = str(value).upper()
+        for cls, (_, rule, _, _) in enumerate(classes):
+            if rule(stype):
+                unique_classes[i] = cls
+                break
+    return unique_classes[codes]
+
+
+def coefficients(star_types, classes):
+    """Коэффициенты (a, b) зависимости для каждой звезды; NaN, если тип не подходит."""
+    cls = classify_types(star_types, classes)
+    a_table = np.array([c[2] for c in classes] + [np.nan])
+    b_table = np.array([c[3] for c in classes] + [np.nan])
+    return a_table[cls], b_table[cls]
+
+
+def absolute_magnitude_array(period, star_types, classes):
+    """M = a * log10(P) + b для целых колонок; NaN для неподходящих типов и P <= 0."""
+    a, b = coefficients(star_types, classes)
+    p = pd.to_numeric(pd.Series(period), errors='coerce').to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(p > 0, a * np.log10(p) + b, np.nan)
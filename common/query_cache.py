@@ -0,0 +1,90 @@
+import os
+import json
+import glob
+import hashlib
+from datetime import datetime, timezone
+import pandas as pd
+
+# Кэш результатов запросов к архивам: ключ — хэш текста ADQL и параметров фильтров,
+# данные — сжатый колоночный файл (Parquet) с явными типами, рядом JSON с метаданными.
+CACHE_DIR = "gaia_cache"
+
+
+def query_key(*queries, **params):
+    """Ключ записи: любой пробел/параметр в запросе меняет ключ, и старая запись не подхватится."""
+    text = json.dumps({
+        'queries': [" ".join(q.split()) for q in queries],
+        'params': params,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _paths(key, cache_dir):
+    base = os.path.join(cache_dir or CACHE_DIR, key)
+    return base + ".parquet", base + ".json"
+
+
+def apply_dtypes(df, dtypes):
+    """Приводит колонки к явным типам (float32, int64, category ...); отсутствующие колонки пропускает."""
+    for col, dtype in (dtypes or {}).items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def load(key, columns=None, cache_dir=None):
+    """DataFrame из кэша (только нужные колонки, если заданы) или None, если записи нет."""
+    data_path, meta_path = _paths(key, cache_dir)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+    return pd.read_parquet(data_path, columns=columns)
+
+
+def save(key, df, dtypes=None, cache_dir=None, **meta):
+    """Сохраняет DataFrame и метаданные (время загрузки, число строк, запросы/параметры из meta)."""
+    data_path, meta_path = _paths(key, cache_dir)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    df = apply_dtypes(df.copy(), dtypes)
+
+    tmp = data_path + ".tmp"
+    df.to_parquet(tmp, index=False, compression="zstd")
+    os.replace(tmp, data_path)
+
+    info = {
+        'key': key,
+        'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'rows': int(len(df)),
+        'columns': {col: str(dtype) for col, dtype in df.dtypes.items()},
+    }
+    info.update(meta)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2, default=str)
+    return df
+
+
+def metadata(key, cache_dir=None):
+    _, meta_path = _paths(key, cache_dir)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_entries(cache_dir=None):
+    """Таблица всех записей кэша: ключ, время загрузки, число строк."""
+    rows = []
+    for meta_path in sorted(glob.glob(os.path.join(cache_dir or CACHE_DIR, "*.json"))):
+        with open(meta_path, encoding='utf-8') as f:
+            info = json.load(f)
+        rows.append({k: info.get(k) for k in ('key', 'fetched_at', 'rows')})
+    return pd.DataFrame(rows, columns=['key', 'fetched_at', 'rows'])
+
+
+def invalidate(key, cache_dir=None):
+    """Удаляет одну запись кэша. Возвращает True, если было что удалять."""
+    removed = False
+    for path in _paths(key, cache_dir):
+        if os.path.exists(path):
+            os.remove(path)
+            removed = True
+    return removed
@@ -0,0 +1,220 @@
+import os
+import ast
+import json
+import time
+import hashlib
+import inspect
+import traceback
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import startable
+
+# Простой инкрементальный запуск цепочки скриптов: у каждой стадии объявлены входы, выходы,
+# параметры и файлы кода. Отпечаток (хэш содержимого входов + параметры + код, включая модули
+# common/ и соседние скрипты, которые код импортирует) хранится в STATE_FILE; если он не изменился
+# и выходы на месте — стадия пропускается. Стадия считается выполненной, только если она
+# заново записала свои выходы. Стадии, не зависящие друг от друга, выполняются параллельно.
+STATE_FILE = ".stages.json"
+HASH_BLOCK = 1 << 20
+MTIME_SLACK_NS = 2 * 10 ** 9     # запас на грубое время изменения файлов (FAT, сетевые диски)
+COMMON_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(COMMON_DIR)
+
+
+def stage(name, func, args=(), inputs=(), outputs=(), params=None, code=()):
+    """
+    Описание стадии. func(*args) делает работу; inputs/outputs — файлы (для '*.csv' учитывается
+    и Parquet-копия startable); params — все, что влияет на результат, кроме файлов;
+    code — файлы скриптов (по умолчанию — файл, где объявлена func).
+    """
+    if not code:
+        source = inspect.getsourcefile(func)
+        code = (source,) if source and os.path.exists(source) else ()
+    return {'name': name, 'func': func, 'args': tuple(args), 'inputs': list(inputs),
+            'outputs': list(outputs), 'params': params or {}, 'code': list(code)}
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return {'stages': {}, 'files': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_state(state, path):
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _file_hash(path, memo):
+    # Большие файлы не перечитываем, если размер и время изменения те же, что в прошлый раз
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    cached = memo.get(path)
+    if cached and cached['stamp'] == stamp:
+        return cached['sha1']
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    memo[path] = {'stamp': stamp, 'sha1': h.hexdigest()}
+    return memo[path]['sha1']
+
+
+def _companions(path):
+    files = [path]
+    if path.endswith('.csv'):
+        files.append(startable.parquet_path(path))
+    return [os.path.abspath(p) for p in files if os.path.exists(p)]
+
+
+def _local_imports(path):
+    # Модули, которые файл импортирует из своей папки или из common/ (остальное — библиотеки)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+    found = []
+    for name in sorted(names):
+        for folder in (os.path.dirname(path), COMMON_DIR):
+            candidate = os.path.join(folder, name + '.py')
+            if os.path.exists(candidate):
+                found.append(candidate)
+                break
+    return found
+
+
+def code_files(paths):
+    """Файлы кода стадии вместе со всеми локальными модулями, которые они импортируют (рекурсивно)."""
+    seen = []
+    todo = [os.path.abspath(p) for p in paths]
+    while todo:
+        path = todo.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        try:
+            todo += [os.path.abspath(p) for p in _local_imports(path)]
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            pass
+    return sorted(seen)
+
+
+def fingerprint(st, memo):
+    """Отпечаток стадии или None, если какого-то входа нет."""
+    parts = {'params': st['params'], 'args': [str(a) for a in st['args']], 'inputs': {}, 'code': {}}
+    for path in st['inputs']:
+        files = _companions(path)
+        if not files:
+            return None
+        parts['inputs'][path] = [_file_hash(p, memo) for p in files]
+    for path in code_files(st['code']):
+        parts['code'][os.path.relpath(path, ROOT_DIR)] = _file_hash(path, memo)
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _outputs_ready(st, since_ns=None):
+    """Все выходы на месте; с since_ns — еще и записаны не раньше этого момента (time.time_ns())."""
+    for path in st['outputs']:
+        files = _companions(path)
+        if not files:
+            return False
+        if since_ns is not None and max(os.stat(p).st_mtime_ns for p in files) < since_ns - MTIME_SLACK_NS:
+            return False
+    return True
+
+
+def _dependencies(stages):
+    # Стадия зависит от той, что производит любой из ее входов
+    producer = {path: st['name'] for st in stages for path in st['outputs']}
+    return {st['name']: {producer[p] for p in st['inputs'] if p in producer and producer[p] != st['name']}
+            for st in stages}
+
+
+def run_stages(stages, force=(), max_workers=2, state_file=STATE_FILE):
+    """
+    Выполняет стадии в порядке зависимостей. force — имена стадий, которые надо пересчитать
+    в любом случае ('all' — все). Возвращает {имя: 'skipped' | 'done' | 'failed' | 'blocked'}.
+    """
+    state = _load_state(state_file)
+    deps = _dependencies(stages)
+    by_name = {st['name']: st for st in stages}
+    status = {}
+    pending = [st['name'] for st in stages]
+
+    # execute может идти в рабочем потоке: state он не трогает — читает снимок хэшей файлов,
+    # новые хэши пишет в верхний слой memo, а в state они попадают в finish, в главном потоке,
+    # там же, где state сохраняется
+    def execute(name, memo, previous):
+        st = by_name[name]
+        fp = fingerprint(st, memo)
+        if fp is None:
+            missing = [p for p in st['inputs'] if not _companions(p)]
+            print(f"[{name}] нет входных файлов: {', '.join(missing)}")
+            return name, 'failed', None, memo
+        forced = 'all' in force or name in force
+        if not forced and previous == fp and _outputs_ready(st):
+            print(f"[{name}] без изменений — пропуск")
+            return name, 'skipped', fp, memo
+        print(f"[{name}] запуск...")
+        started = time.time_ns()
+        try:
+            st['func'](*st['args'])
+        except Exception:
+            traceback.print_exc()
+            return name, 'failed', None, memo
+        # Скрипты цепочки часто ловят свои ошибки и просто печатают их: тогда выходы остаются старыми
+        if not _outputs_ready(st, since_ns=started):
+            print(f"[{name}] стадия не создала или не обновила выходы: {', '.join(st['outputs'])}")
+            return name, 'failed', None, memo
+        return name, 'done', fp, memo
+
+    def submit_args(name):
+        return name, ChainMap({}, dict(state['files'])), state['stages'].get(name)
+
+    def finish(result):
+        name, result_status, fp, memo = result
+        status[name] = result_status
+        state['files'].update(memo.maps[0])
+        if fp is not None:
+            state['stages'][name] = fp
+        else:
+            state['stages'].pop(name, None)
+        _save_state(state, state_file)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                if any(status.get(d) in ('failed', 'blocked') for d in deps[name]):
+                    status[name] = 'blocked'
+                    pending.remove(name)
+                    print(f"[{name}] пропуск: не выполнена предыдущая стадия")
+            ready = [n for n in pending if all(status.get(d) in ('done', 'skipped') for d in deps[n])]
+            if not running and len(ready) == 1:
+                # Одна готовая стадия — выполняем в главном потоке (matplotlib и т.п. любят главный поток)
+                pending.remove(ready[0])
+                finish(execute(*submit_args(ready[0])))
+                continue
+            for name in ready:
+                pending.remove(name)
+                running[pool.submit(execute, *submit_args(name))] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                finish(future.result())
+
+    # Стадии, которые так и не стали готовы (например, из-за цикла зависимостей)
+    for name in pending:
+        status[name] = 'blocked'
+    return status
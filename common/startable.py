@@ -0,0 +1,151 @@
+import os
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # без pyarrow остается только CSV
+    pa = pq = None
+
+# Общий формат таблиц звезд для V1-V5: Parquet с явной схемой колонок.
+# Рядом с 'stars_calculated.csv' лежит 'stars_calculated.parquet'; читатели берут Parquet,
+# если он не старше CSV, иначе — CSV с теми же типами. KEEP_CSV оставляет CSV для глаз и Excel.
+KEEP_CSV = True
+
+# Координаты остаются float64: float32 на RA ~ 360° дает шаг ~0.1", для кросс-матча это грубо
+FLOAT64_COLUMNS = ['ra', 'dec', 'RA', 'Dec']
+FLOAT32_COLUMNS = [
+    'v_mag', 'i_mag', 'j_mag', 'k_mag', 'V', 'I', 'J', 'K', 'phot_g_mean_mag',
+    'parallax', 'parallax_error', 'parallax_mas', 'plx_error', 'gaia_parallax', 'gaia_plx_error',
+    'period', 'Period', 'M_calc', 'dist_ref', 'dist_ref_err', 'dist_pl', 'abs_error', 'rel_error',
+    'Gaia_Dist', 'Calc_Dist', 'Calc_Dist_Err', 'Gaia_Dist_Calc', 'Dust_Av',
+]
+CATEGORY_COLUMNS = ['sp_type', 'sub_type', 'main_type', 'Status', 'Method', 'Type']
+INT64_COLUMNS = ['source_id']
+
+SCHEMA = {col: 'float64' for col in FLOAT64_COLUMNS}
+SCHEMA.update({col: 'float32' for col in FLOAT32_COLUMNS})
+SCHEMA.update({col: 'category' for col in CATEGORY_COLUMNS})
+SCHEMA.update({col: 'int64' for col in INT64_COLUMNS})
+
+
+def parquet_path(path):
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def apply_schema(df):
+    """Приводит известные колонки к типам SCHEMA; нечисловой мусор в числовых колонках -> NaN."""
+    for col in df.columns:
+        dtype = SCHEMA.get(col)
+        if dtype is None or df[col].dtype == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+        else:
+            values = pd.to_numeric(df[col], errors='coerce')
+            # source_id с пропусками — nullable Int64, а не float
+            df[col] = values.astype('Int64' if dtype == 'int64' and values.isna().any() else dtype)
+    return df
+
+
+def _fresh_parquet(path):
+    # Parquet-версия таблицы, если она есть и не старше CSV
+    if pq is None:
+        return None
+    pq_path = parquet_path(path)
+    if not os.path.exists(pq_path):
+        return None
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(pq_path):
+        return None
+    return pq_path
+
+
+def exists(path):
+    return os.path.exists(path) or _fresh_parquet(path) is not None
+
+
+def _category_columns(pq_path, columns):
+    names = pq.read_schema(pq_path).names
+    return [c for c in CATEGORY_COLUMNS if c in names and (columns is None or c in columns)]
+
+
+def read(path, columns=None):
+    """
+    Таблица по пути '*.csv': из Parquet (если свежий), иначе из CSV.
+    columns — только нужные колонки (в Parquet остальные даже не читаются с диска).
+    """
+    pq_path = _fresh_parquet(path)
+    if pq_path is not None:
+        table = pq.read_table(pq_path, columns=columns, read_dictionary=_category_columns(pq_path, columns))
+        return table.to_pandas()
+    return apply_schema(pd.read_csv(path, usecols=columns))
+
+
+def iter_chunks(path, chunk_rows, columns=None):
+    """То же, что read, но кусками по chunk_rows строк."""
+    pq_path = _fresh_parquet(path)
+    if pq_path is not None:
+        parquet = pq.ParquetFile(pq_path, read_dictionary=_category_columns(pq_path, columns))
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+        return
+    with pd.read_csv(path, chunksize=chunk_rows, usecols=columns) as reader:
+        for chunk in reader:
+            yield apply_schema(chunk)
+
+
+def _to_arrow(df):
+    # Категории в файле — обычные строки: словарь у каждого куска свой, а схема файла одна
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Колонка целиком из пропусков получает тип null — фиксируем строковый, чтобы схема кусков совпадала
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table
+
+
+def write(df, path, keep_csv=KEEP_CSV):
+    """Пишет таблицу со схемой: '<имя>.parquet' (zstd) и, если keep_csv, '<имя>.csv'."""
+    df = apply_schema(df.copy())
+    if keep_csv or pq is None:
+        df.to_csv(path, index=False)
+    if pq is not None:
+        pq_path = parquet_path(path)
+        tmp = pq_path + ".tmp"
+        pq.write_table(_to_arrow(df), tmp, compression='zstd')
+        os.replace(tmp, pq_path)
+    return df
+
+
+def open_writer(path, keep_csv=KEEP_CSV):
+    """Запись по кускам (потоковый режим): open_writer -> write_chunk ... -> close_writer."""
+    return {'path': path, 'keep_csv': keep_csv or pq is None, 'parquet': None, 'schema': None, 'rows': 0}
+
+
+def write_chunk(writer, df):
+    df = apply_schema(df.copy())
+    if writer['keep_csv']:
+        first = writer['rows'] == 0
+        df.to_csv(writer['path'], mode='w' if first else 'a', header=first, index=False)
+    if pq is not None:
+        table = _to_arrow(df)
+        if writer['parquet'] is None:
+            writer['schema'] = table.schema.remove_metadata()
+            writer['tmp'] = parquet_path(writer['path']) + ".tmp"
+            writer['parquet'] = pq.ParquetWriter(writer['tmp'], writer['schema'], compression='zstd')
+        writer['parquet'].write_table(table.replace_schema_metadata(None).cast(writer['schema']))
+    writer['rows'] += len(df)
+
+
+def close_writer(writer):
+    if writer['parquet'] is not None:
+        writer['parquet'].close()
+        os.replace(writer['tmp'], parquet_path(writer['path']))
+    elif pq is not None and os.path.exists(parquet_path(writer['path'])):
+        # Ни одного куска — старый Parquet больше не соответствует таблице
+        os.remove(parquet_path(writer['path']))
@@ -0,0 +1,126 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Потоковая обработка больших CSV: файл читается кусками фиксированного размера,
+# куски считаются в пуле процессов, а в памяти одновременно живет не больше
+# 2 * n_workers кусков — пик памяти не зависит от числа строк во входном файле.
+CHUNK_ROWS = 200_000
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS, usecols=None):
+    """Куски CSV по chunk_rows строк (pd.read_csv(chunksize=...))."""
+    with pd.read_csv(path, chunksize=chunk_rows, usecols=usecols) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def map_chunks(func, chunks, n_workers=None):
+    """
+    func(chunk) для каждого куска, результаты — в исходном порядке.
+    n_workers=1 — без процессов (удобно для отладки); иначе func должна быть
+    объявлена на уровне модуля, чтобы ее можно было передать воркеру (pickle).
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1:
+        for chunk in chunks:
+            yield func(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            # Не читаем файл дальше, пока воркеры не разобрали очередь
+            if len(pending) >= 2 * n_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# --- Накопители статистики: словари, которые обновляются по кускам и складываются между собой ---
+
+def new_stats():
+    return {'n': 0, 'sum': 0.0, 'sum_abs': 0.0, 'sum_sq': 0.0, 'min': np.inf, 'max': -np.inf}
+
+
+def update_stats(stats, values):
+    """Добавляет значения куска (NaN пропускаются)."""
+    v = np.asarray(values, dtype=np.float64)
+    v = v[np.isfinite(v)]
+    if len(v) == 0:
+        return stats
+    stats['n'] += len(v)
+    stats['sum'] += v.sum()
+    stats['sum_abs'] += np.abs(v).sum()
+    stats['sum_sq'] += np.square(v).sum()
+    stats['min'] = min(stats['min'], v.min())
+    stats['max'] = max(stats['max'], v.max())
+    return stats
+
+
+def merge_stats(stats, other):
+    for key in ('n', 'sum', 'sum_abs', 'sum_sq'):
+        stats[key] += other[key]
+    stats['min'] = min(stats['min'], other['min'])
+    stats['max'] = max(stats['max'], other['max'])
+    return stats
+
+
+def summarize_stats(stats):
+    """Итог: n, mean, mean_abs, std, min, max (NaN, если значений не было)."""
+    n = stats['n']
+    if n == 0:
+        return {'n': 0, 'mean': np.nan, 'mean_abs': np.nan, 'std': np.nan, 'min': np.nan, 'max': np.nan}
+    mean = stats['sum'] / n
+    return {
+        'n': n,
+        'mean': mean,
+        'mean_abs': stats['sum_abs'] / n,
+        'std': np.sqrt(max(stats['sum_sq'] / n - mean * mean, 0.0)),
+        'min': stats['min'],
+        'max': stats['max'],
+    }
+
+
+def update_counts(counts, values):
+    """Счетчик по категориям (например, по типам звезд): словарь значение -> число."""
+    for key, n in pd.Series(values).value_counts(dropna=False).items():
+        counts[key] = counts.get(key, 0) + int(n)
+    return counts
+
+
+def new_histogram(edges):
+    return {'edges': np.asarray(edges, dtype=np.float64), 'count': np.zeros(len(edges) - 1, dtype=np.int64)}
+
+
+def update_histogram(hist, values):
+    hist['count'] += np.histogram(np.asarray(values, dtype=np.float64), bins=hist['edges'])[0]
+    return hist
+
+
+def new_map(x_edges, y_edges):
+    """Карта на сетке (x, y): сумма и число значений в ячейке — из них строится средний цвет ячейки."""
+    shape = (len(x_edges) - 1, len(y_edges) - 1)
+    return {'x_edges': np.asarray(x_edges, dtype=np.float64), 'y_edges': np.asarray(y_edges, dtype=np.float64),
+            'sum': np.zeros(shape), 'count': np.zeros(shape, dtype=np.int64)}
+
+
+def update_map(grid, x, y, values):
+    edges = (grid['x_edges'], grid['y_edges'])
+    grid['sum'] += np.histogram2d(x, y, bins=edges, weights=values)[0]
+    grid['count'] += np.histogram2d(x, y, bins=edges)[0].astype(np.int64)
+    return grid
+
+
+def merge_map(grid, other):
+    grid['sum'] += other['sum']
+    grid['count'] += other['count']
+    return grid
+
+
+def map_mean(grid):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(grid['count'] > 0, grid['sum'] / grid['count'], np.nan)